@@ -2,14 +2,25 @@
 CoinGecko API Client - Complete Implementation
 All FREE tier endpoints included
 """
-import requests
+import abc
 from config import API_URLS, API_KEYS
+from api_clients.http_transport import get_transport, AsyncHttpTransport
+from data_handlers.raw_payload import RawPayload
 
 
-class CoinGeckoClient:
-    def __init__(self, api_key=None):
+class BaseCoinGeckoClient(abc.ABC):
+    """
+    CoinGecko endpoints and request building, shared by
+    CoinGeckoClient (sync) and AsyncCoinGeckoClient (asyncio).
+    """
+
+    PROVIDER = 'COINGECKO'
+
+    def __init__(self, api_key=None, raw=False):
         self.api_key = api_key or API_KEYS.get('COINGECKO_API_KEY')
         self.base_url = API_URLS['COINGECKO']
+        self.raw = raw  # Return RawPayload (undecoded bytes) instead of parsed JSON
+        self.last_headers = {}
 
     def _get_headers(self):
         headers = {}
@@ -17,11 +28,35 @@ class CoinGeckoClient:
             headers['x-cg-pro-api-key'] = self.api_key
         return headers
 
-    def _make_request(self, endpoint, params=None):
-        url = f"{self.base_url}{endpoint}"
-        response = requests.get(url, headers=self._get_headers(), params=params)
-        self.last_headers = response.headers
-        response.raise_for_status()
+    def _build_request(self, endpoint, params=None):
+        """Build GET request kwargs for the transport (None params dropped)"""
+        if params:
+            params = {k: v for k, v in params.items() if v is not None}
+        return {
+            'method': 'GET',
+            'url': f"{self.base_url}{endpoint}",
+            'headers': self._get_headers(),
+            'params': params or None,
+        }
+
+    def _make_request(self, endpoint, params=None, conditional=False):
+        """
+        Make GET request (returns a coroutine on the async client).
+        conditional=True revalidates with ETag/Last-Modified (for large, rarely-changing payloads).
+        """
+        request = self._build_request(endpoint, params)
+        if conditional:
+            request['conditional'] = True
+        return self._send(request)
+
+    @abc.abstractmethod
+    def _send(self, request):
+        """Execute a built request (sync: decoded payload, async: coroutine)"""
+
+    def _decode(self, response):
+        """Decoded JSON, or the undecoded body as a RawPayload in raw mode"""
+        if self.raw:
+            return RawPayload(response.content, response.headers.get('content-type'))
         return response.json()
 
     # ==================== PING & STATUS ====================
@@ -65,7 +100,7 @@ class CoinGeckoClient:
     def get_coins_list(self, include_platform=False):
         """List all coins with id, name, symbol"""
         params = {'include_platform': str(include_platform).lower()}
-        return self._make_request("/coins/list", params)
+        return self._make_request("/coins/list", params, conditional=True)
 
     def get_coins_markets(self, vs_currency='usd', ids=None, category=None,
                           order='market_cap_desc', per_page=100, page=1, sparkline=False):
@@ -257,7 +292,7 @@ class CoinGeckoClient:
         params = {}
         if filter_type:
             params['filter'] = filter_type
-        return self._make_request("/asset_platforms", params)
+        return self._make_request("/asset_platforms", params, conditional=True)
 
     def get_exchange_rates(self):
         """Get BTC exchange rates"""
@@ -398,3 +433,38 @@ class CoinGeckoClient:
         if network:
             params['network'] = network
         return self._make_request("/onchain/tokens/info_recently_updated", params)
+
+
+class CoinGeckoClient(BaseCoinGeckoClient):
+    def __init__(self, api_key=None, transport=None, raw=False):
+        super().__init__(api_key, raw)
+        self.transport = transport or get_transport()
+
+    def _send(self, request):
+        response = self.transport.request(provider=self.PROVIDER, **request)
+        self.last_headers = response.headers
+        response.raise_for_status()
+        return self._decode(response)
+
+
+class AsyncCoinGeckoClient(BaseCoinGeckoClient):
+    """asyncio CoinGecko client - same methods as CoinGeckoClient, awaitable"""
+
+    def __init__(self, api_key=None, transport=None, raw=False):
+        super().__init__(api_key, raw)
+        self.transport = transport or AsyncHttpTransport()
+
+    async def _send(self, request):
+        response = await self.transport.request(provider=self.PROVIDER, **request)
+        self.last_headers = response.headers
+        response.raise_for_status()
+        return self._decode(response)
+
+    async def close(self):
+        await self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -1,16 +1,23 @@
-import requests
+import abc
 import os
+from api_clients.http_transport import get_transport, AsyncHttpTransport
+from data_handlers.raw_payload import RawPayload
 
-class DefiLlamaClient:
+
+class BaseDefiLlamaClient(abc.ABC):
     """
-    DefiLlama API Client
-    Supports both free and pro endpoints.
+    DefiLlama API endpoints and request building.
+    Shared by DefiLlamaClient (sync) and AsyncDefiLlamaClient (asyncio),
+    which only differ in how _send() executes a built request.
     Pro endpoints require API key set in DEFILLAMA_API_KEY environment variable.
     """
 
-    def __init__(self, api_key=None):
+    PROVIDER = 'DEFILLAMA'
+
+    def __init__(self, api_key=None, raw=False):
         # Try to get API key from parameter, env, or config
         self.api_key = api_key or os.getenv('DEFILLAMA_API_KEY')
+        self.raw = raw  # Return RawPayload (undecoded bytes) instead of parsed JSON
 
         # Base URLs
         self.base_url = "https://api.llama.fi"
@@ -21,10 +28,30 @@ class DefiLlamaClient:
 
         self.timeout = 30
 
-    def _get(self, url, params=None):
-        """Make GET request with error handling"""
-        response = requests.get(url, params=params, timeout=self.timeout)
-        response.raise_for_status()
+    def _build_request(self, url, params=None):
+        """Build GET request kwargs for the transport (None params dropped)"""
+        if params:
+            params = {k: v for k, v in params.items() if v is not None}
+        return {'method': 'GET', 'url': url, 'params': params or None, 'timeout': self.timeout}
+
+    def _get(self, url, params=None, conditional=False):
+        """
+        Make GET request (returns a coroutine on the async client).
+        conditional=True revalidates with ETag/Last-Modified (for large, rarely-changing payloads).
+        """
+        request = self._build_request(url, params)
+        if conditional:
+            request['conditional'] = True
+        return self._send(request)
+
+    @abc.abstractmethod
+    def _send(self, request):
+        """Execute a built request (sync: decoded payload, async: coroutine)"""
+
+    def _decode(self, response):
+        """Decoded JSON, or the undecoded body as a RawPayload in raw mode"""
+        if self.raw:
+            return RawPayload(response.content, response.headers.get('content-type'))
         return response.json()
 
     def _pro_url(self, path):
@@ -39,7 +66,7 @@ class DefiLlamaClient:
 
     def get_all_protocols(self):
         """List all protocols with TVL"""
-        return self._get(f"{self.base_url}/protocols")
+        return self._get(f"{self.base_url}/protocols", conditional=True)
 
     def get_protocol(self, protocol: str):
         """Get historical TVL of a protocol
@@ -68,7 +95,7 @@ class DefiLlamaClient:
 
     def get_all_chains(self):
         """Get current TVL of all chains"""
-        return self._get(f"{self.base_url}/v2/chains")
+        return self._get(f"{self.base_url}/v2/chains", conditional=True)
 
     # ========================
     # TVL Endpoints (Pro)
@@ -245,7 +272,7 @@ class DefiLlamaClient:
 
     def get_yield_pools(self):
         """Get all yield pools"""
-        return self._get(f"{self.yields_url}/pools")
+        return self._get(f"{self.yields_url}/pools", conditional=True)
 
     def get_pool_chart(self, pool_id: str):
         """Get pool APY history
@@ -471,11 +498,11 @@ class DefiLlamaClient:
 
     def get_hacks(self):
         """Get hack incidents (Pro)"""
-        return self._get(self._pro_url("/api/hacks"))
+        return self._get(self._pro_url("/api/hacks"), conditional=True)
 
     def get_raises(self):
         """Get funding raises (Pro)"""
-        return self._get(self._pro_url("/api/raises"))
+        return self._get(self._pro_url("/api/raises"), conditional=True)
 
     def get_treasuries(self):
         """Get protocol treasuries (Pro)"""
@@ -510,3 +537,51 @@ class DefiLlamaClient:
     def get_api_usage(self):
         """Get API usage stats (Pro)"""
         return self._get(self._pro_url("/usage/APIKEY"))
+
+
+class DefiLlamaClient(BaseDefiLlamaClient):
+    """
+    DefiLlama API Client
+    Supports both free and pro endpoints.
+    Pro endpoints require API key set in DEFILLAMA_API_KEY environment variable.
+    """
+
+    def __init__(self, api_key=None, transport=None, raw=False):
+        super().__init__(api_key, raw)
+        self.transport = transport or get_transport()
+
+    def _send(self, request):
+        """Execute request with error handling"""
+        response = self.transport.request(provider=self.PROVIDER, **request)
+        response.raise_for_status()
+        return self._decode(response)
+
+
+class AsyncDefiLlamaClient(BaseDefiLlamaClient):
+    """
+    asyncio DefiLlama API Client - same methods as DefiLlamaClient, awaitable.
+
+    Usage:
+        async with AsyncDefiLlamaClient() as client:
+            protocols, chains = await asyncio.gather(
+                client.get_all_protocols(), client.get_all_chains())
+    """
+
+    def __init__(self, api_key=None, transport=None, raw=False):
+        super().__init__(api_key, raw)
+        self.transport = transport or AsyncHttpTransport()
+
+    async def _send(self, request):
+        """Execute request with error handling"""
+        response = await self.transport.request(provider=self.PROVIDER, **request)
+        response.raise_for_status()
+        return self._decode(response)
+
+    async def close(self):
+        await self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -3,21 +3,30 @@ Dune Analytics API Client
 Uses official dune-client SDK for raw SQL execution
 """
 import logging
+import time
 from dune_client.client import DuneClient as OfficialDuneClient
+from dune_client.models import ExecutionState, QueryFailedError
 from config import API_KEYS
+from api_clients.rate_limiter import get_rate_limiter
 
 # Suppress verbose dune_client logs
 logging.getLogger('dune_client').setLevel(logging.WARNING)
 
 
 class DuneClient:
+    POLL_INTERVAL = 3  # Seconds between execution status checks
+
     def __init__(self, api_key=None):
         self.api_key = api_key or API_KEYS.get('DUNE_API_KEY')
         self.client = OfficialDuneClient(self.api_key)
+        # Shared DUNE bucket (the SDK makes its own HTTP calls, so acquire per method)
+        self.limiter = get_rate_limiter('DUNE')
 
     def run_sql(self, query_sql, timeout=300):
         """
         Execute raw SQL and return results.
+        Submit, status polls and result pages are separate SDK calls, each taking
+        a DUNE token (the SDK's own run_sql polls every second past the limiter).
 
         Args:
             query_sql: Raw SQL to execute
@@ -25,9 +34,29 @@ class DuneClient:
 
         Returns:
             dict with 'rows' and 'metadata'
+
+        Raises:
+            QueryFailedError: The execution failed
+            TimeoutError: Still running after timeout (the execution is cancelled)
         """
-        # Use official SDK's run_sql method
-        result = self.client.run_sql(query_sql)
+        self.limiter.acquire()
+        execution_id = self.client.execute_sql(query_sql).execution_id
+        deadline = time.monotonic() + timeout
+
+        status = self.get_execution_status(execution_id)
+        while status.state not in ExecutionState.terminal_states():
+            if time.monotonic() + self.POLL_INTERVAL > deadline:
+                self.limiter.acquire()
+                self.client.cancel_execution(execution_id)
+                raise TimeoutError(f"Dune execution {execution_id} still running after {timeout}s")
+            time.sleep(self.POLL_INTERVAL)
+            status = self.get_execution_status(execution_id)
+        if status.state == ExecutionState.FAILED:
+            raise QueryFailedError(status.error.message if status.error else "Query execution failed")
+
+        result = self.get_execution_results(execution_id)
+        while result.next_offset is not None:
+            result += self.get_execution_results(execution_id, offset=result.next_offset)
 
         # Extract rows and metadata from result
         rows = []
@@ -58,22 +87,26 @@ class DuneClient:
         query = QueryBase(query_id=query_id)
         if params:
             query.params = params
+        self.limiter.acquire()
         return self.client.execute_query(query)
 
     def get_latest_result(self, query_id):
         """
         Get latest cached result for a query
         """
+        self.limiter.acquire()
         return self.client.get_latest_result(query_id)
 
     def get_execution_status(self, execution_id):
         """
         Get execution status
         """
+        self.limiter.acquire()
         return self.client.get_execution_status(execution_id)
 
-    def get_execution_results(self, execution_id):
+    def get_execution_results(self, execution_id, offset=None):
         """
-        Get execution results
+        Get execution results (one page, from offset)
         """
-        return self.client.get_execution_results(execution_id)
+        self.limiter.acquire()
+        return self.client.get_execution_results(execution_id, offset=offset)
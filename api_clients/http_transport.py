@@ -0,0 +1,257 @@
+"""
+Shared HTTP transport for all API clients
+Keeps one pooled keep-alive Session per host, reused process-wide.
+AsyncHttpTransport is the aiohttp counterpart used by the Async*Client classes.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from config import HTTP_POOL_SIZES, REQUEST_TIMEOUT
+from api_clients.rate_limiter import get_rate_limiter
+from api_clients.retry import (
+    CircuitOpenError, evaluate_attempt, get_circuit_breaker, get_retry_policy,
+    record_breaker_rejection, record_request
+)
+from api_clients.validator_cache import get_validator_cache
+
+logger = logging.getLogger('http_transport')
+
+# Process-wide transport (module globals survive Streamlit reruns and sessions)
+_transport = None
+_transport_lock = threading.Lock()
+
+
+class HttpTransport:
+    """
+    Pool of keep-alive requests.Session objects, one per host.
+    Pool size per host comes from the provider that owns it (HTTP_POOL_SIZES).
+    """
+
+    def __init__(self, pool_sizes=None, timeout=REQUEST_TIMEOUT, retry_policy=None):
+        self.pool_sizes = pool_sizes or HTTP_POOL_SIZES
+        self.timeout = timeout
+        self.retry_policy = retry_policy or get_retry_policy()
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _create_session(self, provider):
+        """Create a Session whose adapter keeps up to pool_size connections alive"""
+        pool_size = self.pool_sizes.get(provider, self.pool_sizes.get('DEFAULT', 4))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        logger.info(f"HTTP: New session for {provider} (pool_maxsize={pool_size})")
+        return session
+
+    def get_session(self, url, provider='DEFAULT'):
+        """Get (or lazily create) the pooled Session for the host of url"""
+        host = urlsplit(url).netloc
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    session = self._create_session(provider)
+                    self._sessions[host] = session
+        return session
+
+    def request(self, method, url, provider='DEFAULT', conditional=False, **kwargs):
+        """
+        Send a request over the pooled Session for the url's host.
+        Rate limited per provider, retried with jittered backoff on 429/5xx and
+        connection errors, and failed fast while the host's circuit breaker is open.
+        conditional=True revalidates against the on-disk validator cache (ETag/Last-Modified).
+        """
+        if conditional:
+            validator = get_validator_cache()
+            key, kwargs['headers'] = validator.prepare(method, url, kwargs.get('params'),
+                                                       kwargs.get('headers'))
+            response = self.request(method, url, provider, **kwargs)
+            return validator.resolve(key, response, HttpResponse)
+
+        kwargs.setdefault('timeout', self.timeout)
+        session = self.get_session(url, provider)
+        limiter = get_rate_limiter(provider)
+        breaker = get_circuit_breaker(urlsplit(url).netloc)
+        record_request()
+
+        attempt = 0
+        while True:
+            attempt += 1
+            if not breaker.allow():
+                record_breaker_rejection(breaker)
+                raise CircuitOpenError(f"Circuit open for {breaker.host}")
+            recorded = False
+            try:
+                if limiter:
+                    limiter.acquire()
+                try:
+                    response = session.request(method, url, **kwargs)
+                except requests.RequestException:
+                    recorded = True
+                    delay = evaluate_attempt(self.retry_policy, breaker, attempt)
+                    if delay is None:
+                        raise
+                    time.sleep(delay)
+                    continue
+                if limiter:
+                    limiter.update_from_response(response.headers, response.status_code)
+                recorded = True
+                delay = evaluate_attempt(self.retry_policy, breaker, attempt, response)
+            finally:
+                if not recorded:
+                    # Raised before the breaker saw an outcome: don't keep the host's probe slot
+                    breaker.release()
+            if delay is None:
+                return response
+            logger.info(f"HTTP: {response.status_code} from {breaker.host}, "
+                        f"retry {attempt} in {delay:.1f}s")
+            time.sleep(delay)
+
+    def close(self):
+        """Close all pooled sessions"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+def get_transport():
+    """Get the process-wide HttpTransport (lazy init)"""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = HttpTransport()
+    return _transport
+
+
+class HttpResponse:
+    """Fully-read HTTP response with the subset of the requests.Response API clients use"""
+
+    def __init__(self, status_code, headers, content, url, reason=''):
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.url = url
+        self.reason = reason
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        """Raise requests.HTTPError for 4xx/5xx, like requests.Response"""
+        if 400 <= self.status_code < 600:
+            kind = 'Client' if self.status_code < 500 else 'Server'
+            raise requests.HTTPError(
+                f"{self.status_code} {kind} Error: {self.reason} for url: {self.url}",
+                response=self
+            )
+
+
+class AsyncHttpTransport:
+    """
+    aiohttp counterpart of HttpTransport: one ClientSession per host.
+    Sessions are bound to the event loop they were created on, so use one
+    AsyncHttpTransport per loop and close() it when done.
+    Errors are raised as requests exceptions so callers handle both APIs alike.
+    """
+
+    def __init__(self, pool_sizes=None, timeout=REQUEST_TIMEOUT, retry_policy=None):
+        self.pool_sizes = pool_sizes or HTTP_POOL_SIZES
+        self.timeout = timeout
+        self.retry_policy = retry_policy or get_retry_policy()
+        self._sessions = {}
+
+    def _get_session(self, url, provider):
+        import aiohttp
+
+        host = urlsplit(url).netloc
+        session = self._sessions.get(host)
+        if session is None or session.closed:
+            pool_size = self.pool_sizes.get(provider, self.pool_sizes.get('DEFAULT', 4))
+            connector = aiohttp.TCPConnector(limit=pool_size)
+            session = aiohttp.ClientSession(connector=connector)
+            self._sessions[host] = session
+            logger.info(f"HTTP: New async session for {provider} (limit={pool_size})")
+        return session
+
+    async def _send_once(self, session, method, url, client_timeout, **kwargs):
+        import aiohttp
+
+        try:
+            async with session.request(method, url, timeout=client_timeout, **kwargs) as resp:
+                content = await resp.read()
+                return HttpResponse(resp.status, resp.headers, content, str(resp.url), resp.reason)
+        except asyncio.TimeoutError as e:
+            raise requests.Timeout(f"Request to {url} timed out") from e
+        except aiohttp.ClientError as e:
+            raise requests.ConnectionError(str(e)) from e
+
+    async def request(self, method, url, provider='DEFAULT', params=None, headers=None,
+                      data=None, timeout=None, conditional=False):
+        """Send a request and return a fully-read HttpResponse (same policies as HttpTransport)"""
+        import aiohttp
+
+        if conditional:
+            validator = get_validator_cache()
+            key, headers = validator.prepare(method, url, params, headers)
+            response = await self.request(method, url, provider, params, headers, data, timeout)
+            return validator.resolve(key, response, HttpResponse)
+
+        session = self._get_session(url, provider)
+        client_timeout = aiohttp.ClientTimeout(total=timeout or self.timeout)
+        limiter = get_rate_limiter(provider)
+        breaker = get_circuit_breaker(urlsplit(url).netloc)
+        record_request()
+
+        attempt = 0
+        while True:
+            attempt += 1
+            if not breaker.allow():
+                record_breaker_rejection(breaker)
+                raise CircuitOpenError(f"Circuit open for {breaker.host}")
+            recorded = False
+            try:
+                if limiter:
+                    await limiter.acquire_async()
+                try:
+                    response = await self._send_once(session, method, url, client_timeout,
+                                                     params=params, headers=headers, data=data)
+                except requests.RequestException:
+                    recorded = True
+                    delay = evaluate_attempt(self.retry_policy, breaker, attempt)
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
+                    continue
+                if limiter:
+                    limiter.update_from_response(response.headers, response.status_code)
+                recorded = True
+                delay = evaluate_attempt(self.retry_policy, breaker, attempt, response)
+            finally:
+                if not recorded:
+                    # Raised before the breaker saw an outcome (e.g. task cancelled): free the probe slot
+                    breaker.release()
+            if delay is None:
+                return response
+            await asyncio.sleep(delay)
+
+    async def close(self):
+        """Close all sessions"""
+        for session in self._sessions.values():
+            await session.close()
+        self._sessions.clear()
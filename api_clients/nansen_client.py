@@ -2,27 +2,63 @@
 Nansen API Client - Complete Implementation
 All available endpoints included
 """
+import abc
+import asyncio
 import json
-import requests
 from config import API_URLS, API_KEYS
+from api_clients.http_transport import get_transport, AsyncHttpTransport
+from data_handlers.raw_payload import RawPayload, decode_payload
 
 
-class NansenClient:
-    def __init__(self, api_key=None):
+class BaseNansenClient(abc.ABC):
+    """
+    Nansen endpoints and request building, shared by
+    NansenClient (sync) and AsyncNansenClient (asyncio).
+    """
+
+    PROVIDER = 'NANSEN'
+    FLOW_TIMEFRAMES = ["5m", "1h", "6h", "12h", "1d", "7d"]
+
+    def __init__(self, api_key=None, raw=False):
         self.api_key = api_key or API_KEYS.get('NANSEN_API_KEY')
         self.base_url = API_URLS['NANSEN']
+        self.raw = raw  # Return RawPayload (undecoded bytes) instead of parsed JSON
+        self.last_headers = {}
+
+    def _build_request(self, endpoint, data):
+        """Build POST request kwargs for the transport"""
+        return {
+            'method': 'POST',
+            'url': f"{self.base_url}{endpoint}",
+            'headers': {
+                'apiKey': self.api_key,
+                'Content-Type': 'application/json'
+            },
+            'data': json.dumps(data),
+        }
 
     def _make_request(self, endpoint, data):
-        url = f"{self.base_url}{endpoint}"
-        headers = {
-            'apiKey': self.api_key,
-            'Content-Type': 'application/json'
-        }
-        response = requests.post(url, headers=headers, data=json.dumps(data))
-        self.last_headers = response.headers
-        response.raise_for_status()
+        """Make POST request (returns a coroutine on the async client)"""
+        return self._send(self._build_request(endpoint, data))
+
+    @abc.abstractmethod
+    def _send(self, request):
+        """Execute a built request (sync: decoded payload, async: coroutine)"""
+
+    def _decode(self, response):
+        """Decoded JSON, or the undecoded body as a RawPayload in raw mode"""
+        if self.raw:
+            return RawPayload(response.content, response.headers.get('content-type'))
         return response.json()
 
+    def _flow_intelligence_payload(self, address, chain, timeframe):
+        return {
+            "chain": chain,
+            "token_address": address,
+            "timeframe": timeframe,
+            "filters": {}
+        }
+
     # ==================== SMART MONEY ====================
 
     def get_smart_money_netflow(self, chains, labels=None, include_stablecoins=False,
@@ -244,18 +280,12 @@ class NansenClient:
 
     def get_token_flow_intelligence(self, address, chain):
         """Get token flows summary for multiple timeframes"""
-        timeframes = ["5m", "1h", "6h", "12h", "1d", "7d"]
         results = {}
-        for tf in timeframes:
+        for tf in self.FLOW_TIMEFRAMES:
             try:
-                data = {
-                    "chain": chain,
-                    "token_address": address,
-                    "timeframe": tf,
-                    "filters": {}
-                }
+                data = self._flow_intelligence_payload(address, chain, tf)
                 response = self._make_request('/tgm/flow-intelligence', data)
-                results[tf] = response
+                results[tf] = decode_payload(response)
             except Exception as e:
                 results[tf] = {"error": str(e)}
         return results
@@ -371,3 +401,60 @@ class NansenClient:
             "wallet_address": wallet_address
         }
         return self._make_request('/portfolio/defi-holdings', data)
+
+
+class NansenClient(BaseNansenClient):
+    def __init__(self, api_key=None, transport=None, raw=False):
+        super().__init__(api_key, raw)
+        self.transport = transport or get_transport()
+
+    def _send(self, request):
+        response = self.transport.request(provider=self.PROVIDER, **request)
+        self.last_headers = response.headers
+        response.raise_for_status()
+        return self._decode(response)
+
+
+class AsyncNansenClient(BaseNansenClient):
+    """asyncio Nansen client - same methods as NansenClient, awaitable"""
+
+    def __init__(self, api_key=None, transport=None, raw=False):
+        super().__init__(api_key, raw)
+        self.transport = transport or AsyncHttpTransport()
+
+    async def _send(self, request):
+        response = await self.transport.request(provider=self.PROVIDER, **request)
+        self.last_headers = response.headers
+        response.raise_for_status()
+        return self._decode(response)
+
+    async def _flow_intelligence(self, address, chain, tf):
+        """One timeframe of get_token_flow_intelligence; errors become {"error": ...} like the sync client"""
+        try:
+            data = self._flow_intelligence_payload(address, chain, tf)
+            response = await self._make_request('/tgm/flow-intelligence', data)
+            return decode_payload(response)
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def get_token_flow_intelligence(self, address, chain):
+        """Get token flows summary for multiple timeframes (fetched concurrently)"""
+        # Sibling timeframes keep their results when one fails or is cancelled on its own;
+        # cancelling this call cancels them all and propagates
+        results = await asyncio.gather(
+            *(self._flow_intelligence(address, chain, tf) for tf in self.FLOW_TIMEFRAMES),
+            return_exceptions=True
+        )
+        return {
+            tf: {"error": str(r) or type(r).__name__} if isinstance(r, BaseException) else r
+            for tf, r in zip(self.FLOW_TIMEFRAMES, results)
+        }
+
+    async def close(self):
+        await self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -0,0 +1,160 @@
+"""
+Process-wide adaptive rate limiter, one token bucket per provider.
+
+Buckets start from config.RATE_LIMITS (requests per minute) and adjust live:
+- X-RateLimit-* / RateLimit-* headers pace the remaining budget until reset
+- 429 responses block the bucket for Retry-After and halve the rate
+- successful responses slowly restore the rate toward the configured value
+"""
+import asyncio
+import email.utils
+import logging
+import threading
+import time
+
+from requests.structures import CaseInsensitiveDict
+
+from config import RATE_LIMITS, RATE_LIMIT_BURST_SECONDS
+
+logger = logging.getLogger('rate_limiter')
+
+# Shared by every client, fetcher and tab in the process
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+# Header windows longer than this are quotas (e.g. monthly credits), not rate limits
+MAX_PACING_WINDOW = 300
+DEFAULT_RETRY_AFTER = 5.0
+
+
+def _first_number(value):
+    """Parse '30', '30.5' or '30, 30;w=60' -> 30.0 (None if absent/invalid)"""
+    if value is None:
+        return None
+    try:
+        return float(str(value).split(',')[0].split(';')[0].strip())
+    except ValueError:
+        return None
+
+
+def _header(headers, *names):
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+def parse_retry_after(value, now=None):
+    """Retry-After as seconds (delta-seconds or HTTP-date), None if absent"""
+    if value is None:
+        return None
+    seconds = _first_number(value)
+    if seconds is not None:
+        return max(0.0, seconds)
+    try:
+        when = email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when - (now or time.time()))
+
+
+class TokenBucket:
+    """Thread-safe token bucket whose refill rate adapts to provider feedback."""
+
+    def __init__(self, provider, rate_per_minute, burst_seconds=RATE_LIMIT_BURST_SECONDS):
+        self.provider = provider
+        self.base_rate = rate_per_minute / 60.0  # tokens per second
+        self.rate = self.base_rate
+        self.capacity = max(1.0, self.base_rate * burst_seconds)
+        self.tokens = self.capacity
+        self.blocked_until = 0.0
+        self.last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def reserve(self) -> float:
+        """Take one token and return how many seconds the caller must wait first"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(0.0, self.blocked_until - now)
+            self.tokens -= 1
+            if self.tokens < 0:
+                wait = max(wait, -self.tokens / self.rate)
+            return wait
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Await until a request may be sent (does not block the event loop)"""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def update_from_response(self, headers, status_code):
+        """Adjust pacing from rate-limit headers and status code"""
+        headers = CaseInsensitiveDict(headers or {})
+        remaining = _first_number(_header(headers, 'x-ratelimit-remaining', 'ratelimit-remaining'))
+        reset = _first_number(_header(headers, 'x-ratelimit-reset', 'ratelimit-reset'))
+        if reset is not None and reset > 1e9:  # epoch seconds -> delta
+            reset = reset - time.time()
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            if status_code == 429:
+                retry_after = parse_retry_after(headers.get('retry-after'))
+                if retry_after is None:
+                    retry_after = reset if reset and reset > 0 else DEFAULT_RETRY_AFTER
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+                self.rate = max(self.base_rate * 0.1, self.rate * 0.5)
+                self.tokens = min(self.tokens, 0.0)
+                logger.warning(f"{self.provider}: 429, pausing {retry_after:.1f}s, "
+                               f"rate -> {self.rate * 60:.1f}/min")
+                return
+
+            if remaining is not None and reset is not None and 0 < reset <= MAX_PACING_WINDOW:
+                # Never believe we hold more tokens than the server says we have left
+                self.tokens = min(self.tokens, remaining)
+                if remaining <= 0:
+                    self.blocked_until = max(self.blocked_until, now + reset)
+                # Spread what is left evenly over the rest of the window
+                self.rate = min(self.base_rate, max(self.base_rate * 0.1, remaining / reset))
+            elif self.rate < self.base_rate:
+                # Additive recovery after a slowdown
+                self.rate = min(self.base_rate, self.rate + self.base_rate * 0.05)
+
+    def snapshot(self) -> dict:
+        """Current state (for display/debugging)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                'provider': self.provider,
+                'rate_per_minute': round(self.rate * 60, 1),
+                'base_rate_per_minute': round(self.base_rate * 60, 1),
+                'tokens': round(self.tokens, 2),
+                'blocked_for': round(max(0.0, self.blocked_until - time.monotonic()), 2),
+            }
+
+
+def get_rate_limiter(provider):
+    """Get the process-wide bucket for a provider (None if it has no RATE_LIMITS entry)"""
+    if provider not in RATE_LIMITS:
+        return None
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(provider)
+            if limiter is None:
+                limiter = TokenBucket(provider, RATE_LIMITS[provider])
+                _limiters[provider] = limiter
+    return limiter
@@ -0,0 +1,200 @@
+"""
+Retry policy and per-host circuit breaker for the HTTP transports.
+
+RetryPolicy: exponential backoff with full jitter, honouring Retry-After.
+CircuitBreaker: after repeated connection errors / 5xx from a host, fail the
+remaining calls to that host fast (CircuitOpenError) until a cool-down probe
+succeeds.
+"""
+import contextvars
+import random
+import threading
+import time
+
+import requests
+
+from config import RETRY_CONFIG, CIRCUIT_BREAKER_CONFIG
+from api_clients.rate_limiter import parse_retry_after
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Breaker states
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+# Per-task request stats (attempts, breaker state), read by BaseFetcher for the status table
+_call_stats = contextvars.ContextVar('call_stats', default=None)
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised without sending a request because the host's circuit breaker is open"""
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter"""
+
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=20.0,
+                 retry_statuses=RETRY_STATUSES):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_statuses = set(retry_statuses)
+
+    def backoff(self, attempt, retry_after=None):
+        """
+        Seconds to wait before the next attempt (None = don't retry).
+
+        Args:
+            attempt: Number of the attempt that just failed (1-based)
+            retry_after: Server-provided Retry-After in seconds, if any
+        """
+        if attempt >= self.max_attempts:
+            return None
+        jitter = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if retry_after is None:
+            return jitter
+        if retry_after > self.max_delay:
+            return None  # Server wants us gone for longer than we are willing to wait
+        return max(retry_after, jitter)
+
+
+class CircuitBreaker:
+    """Closed -> open after failure_threshold consecutive failures -> half-open after reset_timeout"""
+
+    def __init__(self, host, failure_threshold=5, reset_timeout=30.0):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self._state = CLOSED
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now (half-open lets one probe through)"""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def release(self):
+        """Free the half-open probe slot of a request that ended without an outcome (e.g. cancelled)"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._state = CLOSED
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self._state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._state = OPEN
+                self.opened_at = time.monotonic()
+
+
+def get_retry_policy():
+    return RetryPolicy(**RETRY_CONFIG)
+
+
+def get_circuit_breaker(host):
+    """Get the process-wide breaker for a host"""
+    breaker = _breakers.get(host)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(host, **CIRCUIT_BREAKER_CONFIG)
+                _breakers[host] = breaker
+    return breaker
+
+
+def get_breaker_states() -> dict:
+    """host -> breaker state for every host contacted so far"""
+    return {host: breaker.state for host, breaker in list(_breakers.items())}
+
+
+def evaluate_attempt(policy, breaker, attempt, response=None):
+    """
+    Feed one attempt's outcome to the breaker and decide whether to retry.
+
+    Args:
+        policy: RetryPolicy
+        breaker: CircuitBreaker of the host
+        attempt: 1-based attempt number
+        response: Response, or None if the attempt raised a connection error/timeout
+
+    Returns:
+        Seconds to sleep before retrying, or None to stop
+    """
+    if response is None or response.status_code >= 500:
+        breaker.record_failure()
+    else:
+        # Host answered (2xx-4xx, including 429 which the rate limiter handles)
+        breaker.record_success()
+    record_attempt(breaker)
+
+    if breaker.state == OPEN:
+        return None  # No point waiting to hit a host we just tripped the breaker on
+    if response is None:
+        return policy.backoff(attempt)
+    if response.status_code not in policy.retry_statuses:
+        return None
+    return policy.backoff(attempt, parse_retry_after(response.headers.get('retry-after')))
+
+
+def reset_call_stats():
+    """Start collecting request stats for the current thread/task"""
+    _call_stats.set({'requests': 0, 'attempts': 0, 'breaker': CLOSED})
+
+
+def get_call_stats():
+    """Stats collected since reset_call_stats() (None if never reset)"""
+    return _call_stats.get()
+
+
+def record_attempt(breaker):
+    """Count one attempt against the current stats, keeping the worst breaker state seen"""
+    stats = _call_stats.get()
+    if stats is None:
+        return
+    stats['attempts'] += 1
+    state = breaker.state
+    if state != CLOSED:
+        stats['breaker'] = state
+
+
+def record_request():
+    stats = _call_stats.get()
+    if stats is not None:
+        stats['requests'] += 1
+
+
+def record_breaker_rejection(breaker):
+    stats = _call_stats.get()
+    if stats is not None:
+        stats['breaker'] = breaker.state
@@ -0,0 +1,145 @@
+"""
+On-disk HTTP validator cache (conditional GET).
+Stores the body and ETag/Last-Modified of large, rarely-changing responses
+(DefiLlama /protocols, /pools, ...; CoinGecko /coins/list, ...), sends
+If-None-Match/If-Modified-Since on the next request and serves the stored
+body when the server answers 304 Not Modified.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlencode
+
+from requests.structures import CaseInsensitiveDict
+
+from config import HTTP_CACHE_DIR
+
+logger = logging.getLogger('validator_cache')
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+class ValidatorCache:
+    """ETag/Last-Modified cache keyed by method + url + params, with hit/miss counters."""
+
+    def __init__(self, cache_dir=HTTP_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.bytes_downloaded = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _key(self, method, url, params):
+        # Hashed so pro URLs (API key in path) never land on disk in clear text
+        query = urlencode(sorted((params or {}).items()))
+        return hashlib.sha256(f"{method} {url}?{query}".encode()).hexdigest()
+
+    def _path(self, key):
+        # One file per entry: a JSON line of validators, then the body
+        return os.path.join(self.cache_dir, key + '.entry')
+
+    def _read(self, key, body=True):
+        """(meta, body) of a stored response (body None unless requested), None if absent"""
+        try:
+            with open(self._path(key), 'rb') as f:
+                meta = json.loads(f.readline())
+                return meta, f.read() if body else None
+        except (OSError, ValueError):
+            return None
+
+    def prepare(self, method, url, params=None, headers=None):
+        """
+        Add conditional headers for a stored response.
+
+        Returns:
+            (key, headers) - pass key to resolve() with the response
+        """
+        key = self._key(method, url, params)
+        headers = dict(headers or {})
+        entry = self._read(key, body=False)
+        if entry:
+            meta = entry[0]
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        return key, headers
+
+    def resolve(self, key, response, response_class):
+        """
+        Turn a 304 into a 200 carrying the stored body; store validators of a fresh 200.
+
+        Args:
+            key: From prepare()
+            response: Transport response (requests.Response or HttpResponse)
+            response_class: HttpResponse, used to build the response served from disk
+        """
+        if response.status_code == 304:
+            entry = self._read(key)
+            if entry is None:
+                return response  # Entry evicted under us; caller sees a non-JSON 304
+            content = entry[1]
+            with self._lock:
+                self.hits += 1
+                self.bytes_saved += len(content)
+            headers = CaseInsensitiveDict(response.headers)
+            headers['X-Validator-Cache'] = 'hit'
+            return response_class(200, headers, content, response.url, 'OK (not modified)')
+
+        if response.status_code == 200:
+            with self._lock:
+                self.misses += 1
+                self.bytes_downloaded += len(response.content)
+            etag = response.headers.get('etag')
+            last_modified = response.headers.get('last-modified')
+            if etag or last_modified:
+                self._store(key, response.content,
+                            {'etag': etag, 'last_modified': last_modified,
+                             'stored_at': time.time(), 'size': len(response.content)})
+        return response
+
+    def _store(self, key, content, meta):
+        """
+        Write validators and body as one file, atomically: concurrent writers of the
+        same key replace whole entries, so an ETag is never paired with another body
+        """
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(json.dumps(meta).encode() + b'\n')
+                f.write(content)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Validator cache write failed: {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        """Hit/miss counters and bytes saved since process start"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'bytes_saved': self.bytes_saved,
+                'bytes_downloaded': self.bytes_downloaded,
+            }
+
+
+def get_validator_cache():
+    """Get the process-wide ValidatorCache (lazy init)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ValidatorCache()
+    return _cache
@@ -5,12 +5,13 @@ Main Streamlit Application
 
 import streamlit as st
 
-from config import SUPPORTED_CHAINS
+from config import RETENTION_ENABLED, SUPPORTED_CHAINS
 from components import (
     cdc_tracker, tracking_log, token_tracker,
     profiler, dune_export, social_listening
 )
 from services import fetch_all_data
+from data_handlers.retention import start_retention_scheduler
 
 # Page configuration
 st.set_page_config(
@@ -95,6 +96,8 @@ if 'fetched_data' not in st.session_state:
     st.session_state.fetched_data = {}
 if 'endpoint_status' not in st.session_state:
     st.session_state.endpoint_status = {}
+if 'endpoint_meta' not in st.session_state:
+    st.session_state.endpoint_meta = {}
 if 'preview_endpoint' not in st.session_state:
     st.session_state.preview_endpoint = None
 if 'current_user' not in st.session_state:
@@ -103,6 +106,10 @@ if 'current_user' not in st.session_state:
 # CDC Tracker Session State
 cdc_tracker.init_session_state()
 
+# Snapshot retention / compaction (one background thread per process)
+if RETENTION_ENABLED:
+    start_retention_scheduler()
+
 
 # Main UI
 st.title("Token Tracker Metrics")
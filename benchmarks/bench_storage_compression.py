@@ -0,0 +1,88 @@
+"""
+Benchmark: snapshot size vs write/read time for each STORAGE_COMPRESSION codec.
+
+Usage:
+    python benchmarks/bench_storage_compression.py                  # synthetic payloads
+    python benchmarks/bench_storage_compression.py data/.../yield_pools_*.json.gz ...
+
+Each payload is written the way save_json stores it (legacy indent=4 JSON for
+'none', compact JSON + codec otherwise) and read back the way load_latest_json
+does (decompress + json.loads).
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_handlers.compression import EXTENSIONS, compress, decompress, resolve_codec  # noqa: E402
+
+ROUNDS = 5
+
+
+def synthetic_payloads():
+    """Shapes similar to yield_pools / coins_list / price charts"""
+    rng = random.Random(42)
+    pools = {'status': 'success', 'data': [
+        {'chain': rng.choice(['Ethereum', 'Solana', 'Arbitrum', 'Base']),
+         'project': f"project-{rng.randint(0, 500)}", 'symbol': f"TKN{i}-USDC",
+         'tvlUsd': rng.random() * 1e8, 'apy': rng.random() * 40, 'apyBase': rng.random() * 10,
+         'pool': f"{rng.getrandbits(128):032x}", 'stablecoin': rng.random() < 0.2,
+         'ilRisk': 'no', 'exposure': 'multi', 'underlyingTokens': [f"0x{rng.getrandbits(160):040x}"]}
+        for i in range(20000)]}
+    coins = [{'id': f"coin-{i}", 'symbol': f"c{i}", 'name': f"Coin {i}",
+              'platforms': {'ethereum': f"0x{rng.getrandbits(160):040x}"}} for i in range(15000)]
+    chart = {'prices': [[1700000000000 + i * 3600000, 1000 + rng.random()] for i in range(8760)]}
+    return {'yield_pools (synthetic)': pools, 'coins_list (synthetic)': coins,
+            'price_chart (synthetic)': chart}
+
+
+def file_payloads(paths):
+    payloads = {}
+    for path in paths:
+        with open(path, 'rb') as f:
+            payloads[os.path.basename(path)] = json.loads(decompress(f.read()))
+    return payloads
+
+
+def bench(name, data, tmpdir):
+    print(f"\n{name}")
+    print(f"{'codec':<6} {'size':>12} {'ratio':>7} {'write ms':>10} {'read ms':>10}")
+    baseline = None
+    for codec in ('none', 'gzip', 'zstd'):
+        resolved = resolve_codec(codec)
+        if resolved != codec:
+            print(f"{codec:<6} {'(not installed)':>12}")
+            continue
+        path = os.path.join(tmpdir, f"bench{EXTENSIONS[codec]}")
+
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            raw = json.dumps(data, indent=4 if codec == 'none' else None).encode('utf-8')
+            with open(path, 'wb') as f:
+                f.write(compress(raw, codec))
+        write_ms = (time.perf_counter() - start) / ROUNDS * 1000
+
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            with open(path, 'rb') as f:
+                json.loads(decompress(f.read()))
+        read_ms = (time.perf_counter() - start) / ROUNDS * 1000
+
+        size = os.path.getsize(path)
+        baseline = baseline or size
+        print(f"{codec:<6} {size:>12,} {size / baseline:>6.1%} {write_ms:>10.1f} {read_ms:>10.1f}")
+
+
+def main():
+    payloads = file_payloads(sys.argv[1:]) if len(sys.argv) > 1 else synthetic_payloads()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, data in payloads.items():
+            bench(name, data, tmpdir)
+
+
+if __name__ == '__main__':
+    main()
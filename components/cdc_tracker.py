@@ -3,14 +3,28 @@ CDC Tracker Component - Orderbook CVD Dashboard
 Real-time orderbook and CVD tracking across multiple exchanges.
 """
 
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import ccxt
+import pandas as pd
 import streamlit as st
 import plotly.graph_objects as go
 from datetime import datetime
 from collections import deque
 
 from streamlit_elements import elements, mui, html, nivo, dashboard
+from config import CDC_CANDLE_RETENTION_DAYS, CDC_CANDLE_SAVE_INTERVAL
+from data_handlers.timeseries import get_timeseries_store
 from orderbook_sync import OrderbookEngineSync
 
+# Share of the refresh interval the exchange polls may take (the rest: candles + render)
+POLL_DEADLINE_SHARE = 0.6
+
+_candle_saver = None
+_candle_saver_lock = threading.Lock()
+
 
 def init_session_state():
     """Initialize CDC-related session state variables."""
@@ -40,6 +54,8 @@ def _create_empty_history():
 def init_engine_if_needed(target_symbol):
     """Initialize the engine only if the symbol has changed or engine is missing."""
     if st.session_state.cdc_engine is None or st.session_state.cdc_engine.symbol != target_symbol:
+        if st.session_state.cdc_engine is not None:
+            st.session_state.cdc_engine.close()
         with st.spinner(f"Initializing exchanges for {target_symbol}..."):
             engine = OrderbookEngineSync(
                 ['binance', 'coinbase', 'bybit', 'hyperliquid'],
@@ -52,13 +68,16 @@ def init_engine_if_needed(target_symbol):
 
 
 def update_chart_history(data):
-    """Append new data point to chart history."""
+    """Append new data point to chart history (live rows only: stale and timeout / error rows are skipped)."""
     history = st.session_state.cdc_chart_history
     now = datetime.now().strftime("%H:%M:%S")
     history['timestamps'].append(now)
 
     for r in data:
         ex_id = r['id']
+        if r.get('stale') or r.get('status') != 'live':
+            # Venue without a fresh poll (stale repeat of its last row, timeout / error row)
+            continue
 
         # Initialize deques if not present
         if ex_id not in history['prices']:
@@ -77,6 +96,85 @@ def update_chart_history(data):
         history['cvd_24h'][ex_id].append(r['cvd_24h'] if r['id'] != 'hyperliquid' else 0)
 
 
+class CandleSaver:
+    """
+    Appends closed candles to the time-series store (series 'ohlcv', source 'cdc')
+    on a background thread, at most once per interval per (exchange, symbol).
+    Only candles newer than the stored last timestamp are written; the still
+    open candle is left out, so a stored candle never changes afterwards.
+    """
+
+    def __init__(self, interval=CDC_CANDLE_SAVE_INTERVAL, retention_days=CDC_CANDLE_RETENTION_DAYS,
+                 get_store=get_timeseries_store):
+        self.interval = interval
+        self.retention_days = retention_days
+        self.get_store = get_store
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cdc-candles')
+        self._last_submit = {}  # (exchange, symbol) -> monotonic time of the last submitted save
+        self._running = {}      # (exchange, symbol) -> Future of the save in flight
+        self._lock = threading.Lock()
+
+    def submit(self, symbol, ohlcv_data):
+        """Queue a save unless one ran within the interval or is still running (Future or None)"""
+        if not ohlcv_data or not ohlcv_data.get('data'):
+            return None
+        key = (ohlcv_data['exchange'], symbol)
+        now = time.monotonic()
+        with self._lock:
+            running = self._running.get(key)
+            if running is not None and not running.done():
+                return None
+            if now - self._last_submit.get(key, float('-inf')) < self.interval:
+                return None
+            self._last_submit[key] = now
+            future = self._pool.submit(self._save_logged, symbol, ohlcv_data)
+            self._running[key] = future
+        return future
+
+    def _save_logged(self, symbol, ohlcv_data):
+        try:
+            return self.save(symbol, ohlcv_data)
+        except Exception as e:
+            print(f"Error saving candles: {e}")
+            return 0
+
+    def save(self, symbol, ohlcv_data, now=None) -> int:
+        """
+        Append the closed candles newer than the stored ones (no write if there are none).
+
+        Returns:
+            Number of candles appended
+        """
+        store = self.get_store()
+        exchange = ohlcv_data['exchange']
+        now_ms = (time.time() if now is None else now) * 1000
+        timeframe_ms = ccxt.Exchange.parse_timeframe(ohlcv_data.get('timeframe', '1m')) * 1000
+        last = store.last_timestamp('ohlcv', 'cdc', exchange, symbol)
+        last_ms = None if last is None else last.timestamp() * 1000
+        candles = [c for c in ohlcv_data['data']
+                   if c[0] + timeframe_ms <= now_ms and (last_ms is None or c[0] > last_ms)]
+        if not candles:
+            return 0
+        retain_from = pd.Timestamp(now_ms, unit='ms', tz='UTC') - pd.Timedelta(days=self.retention_days)
+        store.append('ohlcv', 'cdc', exchange, symbol, candles, retain_from=retain_from)
+        return len(candles)
+
+
+def get_candle_saver():
+    """Get the process-wide CandleSaver"""
+    global _candle_saver
+    if _candle_saver is None:
+        with _candle_saver_lock:
+            if _candle_saver is None:
+                _candle_saver = CandleSaver()
+    return _candle_saver
+
+
+def save_candle_history(symbol, ohlcv_data):
+    """Queue fetched candles for the time-series store (throttled, written off the render path)."""
+    get_candle_saver().submit(symbol, ohlcv_data)
+
+
 def build_chart_data(cvd_key):
     """Build Nivo line chart data for a specific CVD window."""
     history = st.session_state.cdc_chart_history
@@ -116,7 +214,14 @@ def _render_market_overview(data):
         imbal_hist = list(st.session_state.cdc_chart_history['imbalance'].get(ex_id, []))
 
         c = st.columns([1.2, 1, 1.2, 3, 1.2, 1.2])
-        c[0].write(ex_id.upper())
+        if 'price' not in r:
+            # No data yet: poll still running past the deadline, or failed
+            c[0].write(f"{ex_id.upper()} ({'waiting' if r['status'] == 'timeout' else 'error'})")
+            for col in c[1:]:
+                col.write("-")
+            continue
+        # Venue missed the poll deadline: last good snapshot
+        c[0].write(f"{ex_id.upper()} (stale)" if r.get('stale') else ex_id.upper())
         c[1].write(f"{r['price']:.4f}")
         c[2].write(f"{r['imbalance']:.2f}")
 
@@ -182,6 +287,9 @@ def render_dashboard(data, ohlcv_data=None):
     _render_market_overview(data)
     st.divider()
 
+    # Orderbook panels: venues that have returned data
+    books = [r for r in data if 'price' in r]
+
     # Dashboard Grid
     with elements("dashboard"):
         layout = [
@@ -193,7 +301,7 @@ def render_dashboard(data, ohlcv_data=None):
             dashboard.Item("price_chart", 0, 14, 12, 4, isDraggable=True, isResizable=True),
         ]
 
-        for i, r in enumerate(data):
+        for i, r in enumerate(books):
             layout.append(dashboard.Item(
                 f"ob_{r['id']}", 6 + (i % 2) * 3, 8 + (i // 2) * 3, 3, 3,
                 isDraggable=False, isResizable=False
@@ -240,7 +348,7 @@ def render_dashboard(data, ohlcv_data=None):
                               sx={"color": "#eaecef", "marginBottom": 1})
 
                 agg_bids, agg_asks = {}, {}
-                for r in data:
+                for r in books:
                     for b in r['bids'][:15]:
                         agg_bids[b[0]] = agg_bids.get(b[0], 0) + b[1]
                     for a in r['asks'][:15]:
@@ -279,7 +387,7 @@ def render_dashboard(data, ohlcv_data=None):
                             html.span(f"{price * vol:.2f}")
 
             # Individual Exchange Orderbooks
-            for r in data:
+            for r in books:
                 with mui.Paper(key=f"ob_{r['id']}", sx={"padding": 1, "overflow": "auto",
                                                         "backgroundColor": "#0b0e11"}):
                     mui.Typography(f"{r['id'].upper()}", variant="subtitle2",
@@ -363,8 +471,12 @@ def render_tab():
         @st.fragment(run_every=cdc_refresh)
         def dashboard_container():
             if st.session_state.cdc_engine:
-                data = st.session_state.cdc_engine.fetch_all()
-                ohlcv_data = st.session_state.cdc_engine.fetch_candle_history()
+                engine = st.session_state.cdc_engine
+                # Candles are polled on the engine pool next to the venues, within the same deadline
+                engine.fetch_candles(deadline=0)
+                data = engine.fetch_all(deadline=cdc_refresh * POLL_DEADLINE_SHARE)
+                ohlcv_data = engine.fetch_candles(deadline=0)
+                save_candle_history(st.session_state.cdc_active_symbol, ohlcv_data)
                 render_dashboard(data, ohlcv_data)
 
         dashboard_container()
@@ -11,6 +11,21 @@ from api_clients.dune_client import DuneClient
 from data_handlers.storage import save_dune_to_bigquery
 
 
+# Share of the progress bar per save stage: (start, width)
+SAVE_STAGES = {
+    'schema': (0.0, 0.3, "Inferring schema"),
+    'serialize': (0.3, 0.4, "Serializing rows"),
+    'load': (0.7, 0.3, "BigQuery load job"),
+}
+
+
+def _show_save_progress(progress_bar, stage, done, total):
+    """Update the save progress bar from save_dune_to_bigquery's progress callback"""
+    start, width, label = SAVE_STAGES[stage]
+    fraction = done / total if total else 1.0
+    progress_bar.progress(min(start + width * fraction, 1.0), text=f"{label}: {done:,}/{total:,} rows")
+
+
 def render_tab(current_user: str):
     """
     Render the Dune Export tab.
@@ -103,12 +118,16 @@ LIMIT 100"""
                         with st.spinner("Saving to BigQuery..."):
                             rows_data = results.get('rows', [])
                             export_name_clean = dune_export_name.strip().replace(' ', '_')
+                            progress_bar = st.progress(0.0, text="Preparing BigQuery load...")
 
                             bq_result = save_dune_to_bigquery(
                                 rows_data,
                                 export_name=export_name_clean,
-                                user_id=current_user
+                                user_id=current_user,
+                                progress=lambda stage, done, total: _show_save_progress(
+                                    progress_bar, stage, done, total)
                             )
+                            progress_bar.empty()
 
                             if bq_result and isinstance(bq_result, str):
                                 st.success(f"✅ BigQuery: {bq_result} ({len(rows_data)} rows)")
@@ -8,7 +8,8 @@ from datetime import datetime, timedelta
 
 from config import SUPPORTED_CHAINS
 from api_clients.nansen_client import NansenClient
-from data_handlers.storage import save_json
+from data_handlers.storage import flush_storage, save_json
+from data_handlers.write_batch import WriteBatch
 
 
 def render_tab(current_user: str):
@@ -63,6 +64,8 @@ def render_tab(current_user: str):
             nansen_chain = SUPPORTED_CHAINS.get(profiler_chain, {}).get('nansen', 'ethereum')
 
             with st.spinner("Fetching wallet data from Nansen..."):
+                # BigQuery rows of this analysis are loaded before the page reports success
+                batch = WriteBatch()
                 try:
                     nansen = NansenClient()
 
@@ -74,7 +77,7 @@ def render_tab(current_user: str):
                             st.dataframe(balance_data['data'], use_container_width=True)
                         else:
                             st.json(balance_data)
-                        save_json(balance_data, 'nansen', profiler_chain, profiler_address, 'profiler_current_balance', current_user)
+                        save_json(balance_data, 'nansen', profiler_chain, profiler_address, 'profiler_current_balance', current_user, batch=batch)
                     except Exception as e:
                         st.error(f"Current Balance error: {e}")
 
@@ -88,7 +91,7 @@ def render_tab(current_user: str):
                             st.dataframe(hist_balance_data['data'], use_container_width=True)
                         else:
                             st.json(hist_balance_data)
-                        save_json(hist_balance_data, 'nansen', profiler_chain, profiler_address, 'profiler_historical_balances', current_user)
+                        save_json(hist_balance_data, 'nansen', profiler_chain, profiler_address, 'profiler_historical_balances', current_user, batch=batch)
                     except Exception as e:
                         st.error(f"Historical Balances error: {e}")
 
@@ -102,7 +105,7 @@ def render_tab(current_user: str):
                             st.dataframe(tx_data['data'], use_container_width=True)
                         else:
                             st.json(tx_data)
-                        save_json(tx_data, 'nansen', profiler_chain, profiler_address, 'profiler_transactions', current_user)
+                        save_json(tx_data, 'nansen', profiler_chain, profiler_address, 'profiler_transactions', current_user, batch=batch)
                     except Exception as e:
                         st.error(f"Transactions error: {e}")
 
@@ -116,7 +119,7 @@ def render_tab(current_user: str):
                             st.dataframe(counter_data['data'], use_container_width=True)
                         else:
                             st.json(counter_data)
-                        save_json(counter_data, 'nansen', profiler_chain, profiler_address, 'profiler_counterparties', current_user)
+                        save_json(counter_data, 'nansen', profiler_chain, profiler_address, 'profiler_counterparties', current_user, batch=batch)
                     except Exception as e:
                         st.error(f"Counterparties error: {e}")
 
@@ -130,7 +133,7 @@ def render_tab(current_user: str):
                             st.dataframe(related_data['data'], use_container_width=True)
                         else:
                             st.json(related_data)
-                        save_json(related_data, 'nansen', profiler_chain, profiler_address, 'profiler_related_wallets', current_user)
+                        save_json(related_data, 'nansen', profiler_chain, profiler_address, 'profiler_related_wallets', current_user, batch=batch)
                     except Exception as e:
                         st.error(f"Related Wallets error: {e}")
 
@@ -144,7 +147,7 @@ def render_tab(current_user: str):
                             st.dataframe(pnl_data['data'], use_container_width=True)
                         else:
                             st.json(pnl_data)
-                        save_json(pnl_data, 'nansen', profiler_chain, profiler_address, 'profiler_pnl', current_user)
+                        save_json(pnl_data, 'nansen', profiler_chain, profiler_address, 'profiler_pnl', current_user, batch=batch)
                     except Exception as e:
                         st.error(f"PnL error: {e}")
 
@@ -161,7 +164,7 @@ def render_tab(current_user: str):
                                 st.json(labels_data)
                             else:
                                 st.info("No labels found")
-                            save_json(labels_data, 'nansen', profiler_chain, profiler_address, 'profiler_labels', current_user)
+                            save_json(labels_data, 'nansen', profiler_chain, profiler_address, 'profiler_labels', current_user, batch=batch)
                         except Exception as e:
                             st.warning(f"Labels: {e}")
                         st.markdown("---")
@@ -177,7 +180,7 @@ def render_tab(current_user: str):
                             st.json(perp_pos_data)
                         else:
                             st.info("No perp positions found")
-                        save_json(perp_pos_data, 'nansen', profiler_chain, profiler_address, 'profiler_perp_positions', current_user)
+                        save_json(perp_pos_data, 'nansen', profiler_chain, profiler_address, 'profiler_perp_positions', current_user, batch=batch)
                     except Exception as e:
                         st.warning(f"Perp Positions: {e}")
 
@@ -194,7 +197,7 @@ def render_tab(current_user: str):
                             st.json(perp_trades_data)
                         else:
                             st.info("No perp trades found")
-                        save_json(perp_trades_data, 'nansen', profiler_chain, profiler_address, 'profiler_perp_trades', current_user)
+                        save_json(perp_trades_data, 'nansen', profiler_chain, profiler_address, 'profiler_perp_trades', current_user, batch=batch)
                     except Exception as e:
                         st.warning(f"Perp Trades: {e}")
 
@@ -224,10 +227,14 @@ def render_tab(current_user: str):
                                 st.info("No active DeFi positions found")
                         else:
                             st.info("No DeFi holdings data")
-                        save_json(portfolio_data, 'nansen', profiler_chain, profiler_address, 'profiler_portfolio', current_user)
+                        save_json(portfolio_data, 'nansen', profiler_chain, profiler_address, 'profiler_portfolio', current_user, batch=batch)
                     except Exception as e:
                         st.warning(f"Portfolio: {e}")
 
+                    loads = flush_storage(batch=batch)['bigquery']
+                    failed = [table for table, result in loads.items() if isinstance(result, dict)]
+                    if failed:
+                        st.warning(f"BigQuery load failed for: {', '.join(failed)}")
                     st.success("Wallet analysis complete!")
 
                 except Exception as e:
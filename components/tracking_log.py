@@ -5,23 +5,56 @@ Displays endpoint fetch status and log monitoring.
 
 import streamlit as st
 import pandas as pd
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
-from config import SUPPORTED_CHAINS, SOURCE_ICONS
+from config import FETCH_PERIOD_DAYS, SUPPORTED_CHAINS, SOURCE_ICONS
 from constants.endpoints import ENDPOINT_MAPPING, SOURCE_DISPLAY_MAP
-from data_handlers.storage import load_latest_json
+from data_handlers.storage import get_latest_snapshot, load_latest_json
+from data_handlers.timeseries import get_timeseries_store, is_timeseries
 from utils.validators import validate_contract_address
 
 
+def format_tries(meta):
+    """Attempts / breaker column, e.g. '3', '2 ⛔ open' or 'cache' (empty before first fetch)"""
+    if not meta:
+        return ""
+    if meta.get('cached'):
+        return "cache"
+    tries = str(meta.get('attempts', 0))
+    breaker = meta.get('breaker', 'closed')
+    if breaker != 'closed':
+        tries += f" ⛔ {breaker.replace('_', '-')}"
+    return tries
+
+
+def load_preview_series(source, key, chain, contract_address, user_id, period):
+    """
+    Chart endpoint rows from the time-series store, limited to what this user fetched:
+    the selected period, up to the user's latest snapshot (the store is shared by all users).
+    None if the user has no snapshot of the endpoint.
+    """
+    snapshot = get_latest_snapshot(source, chain, contract_address, key, user_id)
+    if snapshot is None:
+        return None
+    # Catalog timestamps are local time, the store is UTC
+    end = datetime.strptime(snapshot['timestamp'], '%Y-%m-%dT%H:%M:%S').astimezone(timezone.utc)
+    days = FETCH_PERIOD_DAYS.get(period)
+    start = end - timedelta(days=days) if days else None
+    return get_timeseries_store().read(key, source, chain, contract_address, start=start, end=end)
+
+
 def get_endpoint_list():
     """Get the endpoint status list with sorting - auto-generated from ENDPOINT_MAPPING"""
     endpoints = []
+    endpoint_meta = st.session_state.get('endpoint_meta', {})
     for name, (source, key) in ENDPOINT_MAPPING.items():
         source_display = SOURCE_DISPLAY_MAP.get(source, source.title())
         endpoints.append({
             "Endpoint": name,
             "Source": source_display,
-            "Fetch Success": st.session_state.endpoint_status.get(key, "pending")
+            "Fetch Success": st.session_state.endpoint_status.get(key, "pending"),
+            "Tries": format_tries(endpoint_meta.get(key))
         })
 
     def get_sort_key(ep):
@@ -103,15 +136,16 @@ def render_tab(fetch_callback, current_user: str, theme: str = "Dark"):
             endpoints = get_endpoint_list()
 
             # Header
-            c1, c2, c3, c4 = st.columns([1, 0.5, 0.5, 1])
+            c1, c2, c3, c_tries, c4 = st.columns([1, 0.5, 0.5, 0.4, 1])
             c1.markdown("**Endpoint**")
             c2.markdown("**Source**")
             c3.markdown("**Status**")
+            c_tries.markdown("**Tries**")
             c4.markdown("**Action**")
             st.markdown('<hr style="margin: 0.1em 0; border-color: #333;">', unsafe_allow_html=True)
 
             for ep in endpoints:
-                c1, c2, c3, c4 = st.columns([1, 0.5, 0.5, 1])
+                c1, c2, c3, c_tries, c4 = st.columns([1, 0.5, 0.5, 0.4, 1])
                 c1.markdown(f"<div style='padding-top: 5px; font-size: 14px;'>{ep['Endpoint']}</div>", unsafe_allow_html=True)
 
                 # Source Icon
@@ -127,6 +161,7 @@ def render_tab(fetch_callback, current_user: str, theme: str = "Dark"):
                     c2.markdown(f"<div style='padding-top: 5px; font-size: 12px;'>{source_name}</div>", unsafe_allow_html=True)
 
                 c3.markdown(f"<div style='padding-top: 5px; font-size: 14px;'>{ep['Fetch Success']}</div>", unsafe_allow_html=True)
+                c_tries.markdown(f"<div style='padding-top: 5px; font-size: 12px;'>{ep['Tries']}</div>", unsafe_allow_html=True)
 
                 if c4.button(":green[preview]", key=f"btn_{ep['Endpoint']}", use_container_width=True):
                     st.session_state.preview_endpoint = ep["Endpoint"]
@@ -155,20 +190,29 @@ def render_tab(fetch_callback, current_user: str, theme: str = "Dark"):
                     source, key = ENDPOINT_MAPPING[endpoint_name]
                     st.subheader(f"Preview: {endpoint_name}")
 
-                    data = load_latest_json(source, chain, contract_address, key, current_user)
-                    if data:
-                        if isinstance(data, dict) and "data" in data and isinstance(data["data"], list):
-                            st.dataframe(data["data"], use_container_width=True)
-                        elif isinstance(data, dict) and "prices" in data and isinstance(data["prices"], list):
-                            df = pd.DataFrame(data["prices"], columns=["Timestamp", "Price"])
-                            df["Date"] = pd.to_datetime(df["Timestamp"], unit='ms')
-                            st.dataframe(df[["Date", "Price"]], use_container_width=True)
-                        elif isinstance(data, list):
-                            st.dataframe(data, use_container_width=True)
-                        else:
-                            st.json(data)
+                    # Chart endpoints: typed rows from the time-series store, no JSON re-parse
+                    series_df = None
+                    if is_timeseries(key):
+                        series_df = load_preview_series(source, key, chain, contract_address,
+                                                        current_user, period)
+
+                    if series_df is not None and not series_df.empty:
+                        st.dataframe(series_df, use_container_width=True)
                     else:
-                        st.warning("No data found to preview.")
+                        data = load_latest_json(source, chain, contract_address, key, current_user)
+                        if data:
+                            if isinstance(data, dict) and "data" in data and isinstance(data["data"], list):
+                                st.dataframe(data["data"], use_container_width=True)
+                            elif isinstance(data, dict) and "prices" in data and isinstance(data["prices"], list):
+                                df = pd.DataFrame(data["prices"], columns=["Timestamp", "Price"])
+                                df["Date"] = pd.to_datetime(df["Timestamp"], unit='ms')
+                                st.dataframe(df[["Date", "Price"]], use_container_width=True)
+                            elif isinstance(data, list):
+                                st.dataframe(data, use_container_width=True)
+                            else:
+                                st.json(data)
+                        else:
+                            st.warning("No data found to preview.")
 
                     if st.button("Close Preview"):
                         st.session_state.preview_endpoint = None
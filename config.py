@@ -67,6 +67,105 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 CACHE_DURATION = 300  # 5 minutes in seconds
 
+# Snapshot compression for local/GCS writes: 'none', 'gzip' or 'zstd' (needs `pip install zstandard`)
+STORAGE_COMPRESSION = 'gzip'
+
+# Skip writing a payload identical to the endpoint's latest snapshot (catalog records a reference)
+STORAGE_DEDUPE = True
+
+# Parallel background GCS uploads (worker threads)
+GCS_UPLOAD_WORKERS = 8
+
+# Fetch period -> days of history ('All' = full history)
+FETCH_PERIOD_DAYS = {"3 months": 90, "6 months": 180, "1 year": 365}
+
+# Write-behind snapshot queue: writer threads, max snapshots held in memory (more are journaled
+# to the spill dir), journal / replay dir, seconds to keep writing at exit before journaling the rest
+STORAGE_WRITE_WORKERS = 4
+STORAGE_WRITE_QUEUE_SIZE = 64
+STORAGE_SPILL_DIR = os.path.join(DATA_DIR, '.spill')
+STORAGE_SHUTDOWN_WAIT = 5
+
+# BigQuery snapshot rows are buffered and written by load jobs; a table is flushed early at this size
+BIGQUERY_BATCH_MAX_ROWS = 500
+# Buffered rows no Fetch flushes (e.g. Wallet Profiler saves) are loaded at least this often (seconds)
+BIGQUERY_FLUSH_INTERVAL = 60
+# Rows kept per table while its loads keep failing (oldest dropped beyond this, catalog keeps no bq_table)
+BIGQUERY_MAX_RETAINED_ROWS = 5000
+
+# Dune exports: rows per chunk for schema inference and NDJSON serialization (bounds memory)
+DUNE_LOAD_CHUNK_ROWS = 50000
+
+# Parquet time-series store (chart endpoints normalised, partitioned by source/chain/address)
+TIMESERIES_DIR = os.path.join(DATA_DIR, 'timeseries')
+# CDC Tracker 1m candles: closed candles are appended at most every CDC_CANDLE_SAVE_INTERVAL seconds
+# (off the dashboard refresh), candles older than CDC_CANDLE_RETENTION_DAYS are dropped from the store
+CDC_CANDLE_SAVE_INTERVAL = 60
+CDC_CANDLE_RETENTION_DAYS = 30
+
+# SQLite catalog of stored snapshots (locations, size, content hash)
+CATALOG_PATH = os.path.join(DATA_DIR, 'catalog.sqlite')
+
+# Snapshot retention for local DATA_DIR and GCS (BigQuery rows are not touched), per endpoint key
+# ('default' for the rest): every snapshot for keep_all_days, then the newest per day up to daily_days,
+# then the newest per ISO week up to weekly_days (None = forever). Kept snapshots older than
+# keep_all_days are compacted into monthly zip segments. Report: python -m data_handlers.retention
+RETENTION_POLICIES = {
+    'default': {'keep_all_days': 7, 'daily_days': 90, 'weekly_days': None},
+    # Large shared payloads
+    'yield_pools': {'keep_all_days': 3, 'daily_days': 30, 'weekly_days': 365},
+    'coins_list': {'keep_all_days': 3, 'daily_days': 30, 'weekly_days': 365},
+}
+# Background retention (applies the policies every RETENTION_INTERVAL_HOURS while the app runs)
+RETENTION_ENABLED = False
+RETENTION_INTERVAL_HOURS = 24
+
+# Local (chain, contract) -> provider IDs index, built from CoinGecko coins list
+COIN_INDEX_PATH = os.path.join(DATA_DIR, 'coin_index.sqlite')
+
+# On-disk ETag/Last-Modified cache for large static payloads (conditional GET)
+HTTP_CACHE_DIR = os.path.join(DATA_DIR, 'http_cache')
+
+# Token-independent endpoints served from the shared response cache: endpoint key -> TTL (seconds)
+SHARED_ENDPOINT_TTLS = {
+    # DefiLlama
+    'all_protocols': 600,
+    'all_chains': 600,
+    'stablecoins': 600,
+    'stablecoin_chains': 600,
+    'yield_pools': 600,
+    'dex_overview': CACHE_DURATION,
+    'fees_overview': CACHE_DURATION,
+    'bridges': 600,
+    'open_interest': CACHE_DURATION,
+    'hacks': 3600,
+    'raises': 3600,
+    # CoinGecko
+    'coins_list': 3600,
+    'coins_markets': CACHE_DURATION,
+    'categories_list': 3600,
+    'categories': 600,
+    'exchanges': 600,
+    'exchanges_list': 3600,
+    'derivatives': CACHE_DURATION,
+    'derivatives_exchanges': 600,
+    'asset_platforms': 3600,
+    'exchange_rates': CACHE_DURATION,
+    'trending': CACHE_DURATION,
+    'global': CACHE_DURATION,
+    'global_defi': CACHE_DURATION,
+    'onchain_networks': 3600,
+    'onchain_trending_pools': CACHE_DURATION,
+    'onchain_new_pools': CACHE_DURATION,
+    # Nansen (per chain)
+    'sm_netflow': CACHE_DURATION,
+    'sm_holdings': CACHE_DURATION,
+    'sm_dex_trades': CACHE_DURATION,
+    'token_screener': CACHE_DURATION,
+    'perp_screener': CACHE_DURATION,
+    'perp_pnl_leaderboard': CACHE_DURATION,
+}
+
 
 # Try to load GCP_CONFIG from local settings
 logger.info("=== GCP CONFIG ===")
@@ -173,6 +272,22 @@ SUPPORTED_CHAINS = {
 # Default request timeout (seconds)
 REQUEST_TIMEOUT = 30
 
+# Keep-alive connection pool size per host, by provider
+HTTP_POOL_SIZES = {
+    'DEFILLAMA': 8,
+    'COINGECKO': 8,
+    'NANSEN': 4,
+    'DEFAULT': 4
+}
+
+# Max concurrent endpoint fetches per provider during a Fetch (<= pool size)
+FETCH_CONCURRENCY = {
+    'DEFILLAMA': 6,
+    'COINGECKO': 4,
+    'NANSEN': 3,
+    'DEFAULT': 2
+}
+
 # Rate limiting (requests per minute)
 RATE_LIMITS = {
     'DEFILLAMA': 60,
@@ -180,3 +295,18 @@ RATE_LIMITS = {
     'COINGECKO': 50,
     'DUNE': 20
 }
+# Burst allowance of each rate-limit bucket, in seconds of quota
+RATE_LIMIT_BURST_SECONDS = 10
+
+# Retry policy for transient failures (429/5xx, connection errors)
+RETRY_CONFIG = {
+    'max_attempts': 3,
+    'base_delay': 0.5,   # seconds, doubled per attempt (full jitter)
+    'max_delay': 20.0    # longest backoff / Retry-After we are willing to wait
+}
+
+# Per-host circuit breaker: open after N consecutive failures, probe again after reset_timeout
+CIRCUIT_BREAKER_CONFIG = {
+    'failure_threshold': 5,
+    'reset_timeout': 30.0
+}
@@ -0,0 +1,66 @@
+"""
+Archive segments for compacted snapshots.
+Retention packs old snapshots of one endpoint into a zip per month:
+
+    {dir}/_archive/{endpoint_name}_{YYYYmm}.zip     (local)
+    {prefix}_archive/{endpoint_name}_{YYYYmm}.zip   (GCS)
+
+Members keep their snapshot filename; the catalog addresses them as
+"{segment}::{member}", which storage loaders resolve like a plain path/URI.
+"""
+
+import io
+import zipfile
+
+ARCHIVE_DIR = '_archive'
+ARCHIVE_SEP = '::'
+
+
+def is_archived(location):
+    return bool(location) and ARCHIVE_SEP in location
+
+
+def split_location(location):
+    """'{segment}::{member}' -> (segment, member); plain locations -> (location, None)"""
+    if is_archived(location):
+        segment, member = location.split(ARCHIVE_SEP, 1)
+        return segment, member
+    return location, None
+
+
+def segment_name(endpoint_name, timestamp):
+    """Segment filename for a snapshot taken at timestamp ('YYYY-mm-ddTHH:MM:SS')"""
+    return f"{endpoint_name}_{timestamp[:4]}{timestamp[5:7]}.zip"
+
+
+def read_member(segment, member) -> bytes:
+    """Stored bytes of a member; segment is a path or the segment's bytes"""
+    source = io.BytesIO(segment) if isinstance(segment, bytes) else segment
+    with zipfile.ZipFile(source) as archive:
+        return archive.read(member)
+
+
+def segment_members(segment) -> list:
+    """Member names of a segment (path or bytes)"""
+    source = io.BytesIO(segment) if isinstance(segment, bytes) else segment
+    with zipfile.ZipFile(source) as archive:
+        return archive.namelist()
+
+
+def build_segment(existing, members, drop=()) -> bytes:
+    """
+    Segment bytes with members added and the names in drop removed
+    (existing: bytes of the current segment or None).
+    Already-compressed snapshots are stored as-is, plain JSON is deflated.
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as out:
+        if existing:
+            with zipfile.ZipFile(io.BytesIO(existing)) as current:
+                for info in current.infolist():
+                    if info.filename not in members and info.filename not in drop:
+                        out.writestr(info, current.read(info.filename))
+        for name, content in members.items():
+            compression = zipfile.ZIP_DEFLATED if name.endswith('.json') else zipfile.ZIP_STORED
+            out.writestr(name, content, compress_type=compression)
+    return buffer.getvalue()
@@ -0,0 +1,322 @@
+"""
+Batched BigQuery writer for snapshot rows.
+save_json buffers one row per snapshot; flush() creates missing datasets/tables
+(existence cached per process) and loads each table's rows with one load job
+instead of one streaming insert per row.
+Snapshot tables are partitioned by day on timestamp and clustered on chain, address.
+"""
+
+import logging
+import threading
+from concurrent.futures import Future
+
+from config import BIGQUERY_BATCH_MAX_ROWS, BIGQUERY_FLUSH_INTERVAL, BIGQUERY_MAX_RETAINED_ROWS
+
+logger = logging.getLogger('storage')
+
+BQ_LOCATION = 'asia-southeast1'
+
+SNAPSHOT_PARTITION_FIELD = 'timestamp'
+SNAPSHOT_CLUSTER_FIELDS = ['chain', 'address']
+
+
+def snapshot_schema():
+    """Schema of the per-endpoint snapshot tables ({source}_{endpoint_name})"""
+    from google.cloud import bigquery
+    return [
+        bigquery.SchemaField('id', 'STRING', mode='REQUIRED'),
+        bigquery.SchemaField('chain', 'STRING'),
+        bigquery.SchemaField('address', 'STRING'),
+        bigquery.SchemaField('timestamp', 'TIMESTAMP'),
+        bigquery.SchemaField('fetched_at', 'TIMESTAMP'),
+        bigquery.SchemaField('raw_data', 'STRING'),
+    ]
+
+
+def snapshot_table(table_ref):
+    """Snapshot table definition: day partitions on timestamp, clustered on chain, address"""
+    from google.cloud import bigquery
+    table = bigquery.Table(table_ref, schema=snapshot_schema())
+    table.time_partitioning = bigquery.TimePartitioning(
+        type_=bigquery.TimePartitioningType.DAY, field=SNAPSHOT_PARTITION_FIELD)
+    table.clustering_fields = SNAPSHOT_CLUSTER_FIELDS
+    return table
+
+
+def is_partitioned_snapshot_table(table):
+    """Whether an existing table already has the snapshot partitioning and clustering"""
+    partitioning = table.time_partitioning
+    return (partitioning is not None and partitioning.field == SNAPSHOT_PARTITION_FIELD
+            and list(table.clustering_fields or []) == SNAPSHOT_CLUSTER_FIELDS)
+
+
+def _count_rows(client, table_ref):
+    return next(iter(client.query(f"SELECT COUNT(*) AS n FROM `{table_ref}`").result()))['n']
+
+
+def _rename_table(client, table_ref, new_table_id):
+    client.query(f"ALTER TABLE `{table_ref}` RENAME TO `{new_table_id}`").result()
+
+
+def migrate_snapshot_table(client, table_ref):
+    """
+    Rewrite an unpartitioned snapshot table as partitioned + clustered.
+    Rows are copied to a new table {table}__partitioned and its row count is
+    checked against the original before anything is renamed. The swap renames
+    the original to {table}__unpartitioned and the copy to {table}; the original
+    is only dropped when it still has the row count of the table that replaced it
+    (rows loaded during the migration keep it as a backup).
+
+    Returns:
+        'migrated' or 'already partitioned'
+
+    Raises:
+        RuntimeError: The copy's row count differs (the original is left untouched)
+    """
+    table = client.get_table(table_ref)
+    if is_partitioned_snapshot_table(table):
+        return 'already partitioned'
+
+    table_id = table_ref.rsplit('.', 1)[-1]
+    dataset_ref = table_ref.rsplit('.', 1)[0]
+    staging_ref = f"{table_ref}__partitioned"
+    backup_id = f"{table_id}__unpartitioned"
+    backup_ref = f"{dataset_ref}.{backup_id}"
+
+    # BigQuery cannot change the partitioning of an existing table in place
+    client.query(
+        f"CREATE OR REPLACE TABLE `{staging_ref}` "
+        f"PARTITION BY DATE({SNAPSHOT_PARTITION_FIELD}) "
+        f"CLUSTER BY {', '.join(SNAPSHOT_CLUSTER_FIELDS)} "
+        f"AS SELECT * FROM `{table_ref}`"
+    ).result()
+    copied, original = _count_rows(client, staging_ref), _count_rows(client, table_ref)
+    if copied != original:
+        client.delete_table(staging_ref, not_found_ok=True)
+        raise RuntimeError(f"partitioned copy has {copied} rows, {table_ref} has {original}")
+
+    _rename_table(client, table_ref, backup_id)
+    try:
+        _rename_table(client, staging_ref, table_id)
+    except Exception:
+        _rename_table(client, backup_ref, table_id)
+        raise
+
+    if _count_rows(client, backup_ref) == copied:
+        client.delete_table(backup_ref)
+    else:
+        logger.warning(f"BigQuery: {table_ref} got rows during the migration, keeping {backup_ref}")
+    logger.info(f"BigQuery: partitioned {table_ref} ({copied} rows)")
+    return 'migrated'
+
+
+class BigQueryBatchWriter:
+    """
+    Buffers rows per table and writes them with load jobs.
+    Tables are flushed independently: a failed table keeps up to max_retained
+    of its newest rows for the next flush() and does not affect the others.
+    on_loaded(table_ref, keys) is called with the keys of rows once they are
+    loaded, on_dropped(table_ref, keys) for rows discarded over max_retained
+    (save_json passes catalog snapshot ids). add() returns a Future per row
+    so one fetch can report only its own rows (flush_rows).
+    Rows nobody flushes (e.g. saves outside a Fetch) are loaded by a daemon
+    thread every flush_interval seconds, and by close() at exit.
+    """
+
+    def __init__(self, get_client, max_rows=BIGQUERY_BATCH_MAX_ROWS, on_loaded=None,
+                 max_retained=BIGQUERY_MAX_RETAINED_ROWS, on_dropped=None,
+                 flush_interval=BIGQUERY_FLUSH_INTERVAL):
+        self.get_client = get_client
+        self.max_rows = max_rows
+        self.max_retained = max_retained
+        self.on_loaded = on_loaded
+        self.on_dropped = on_dropped
+        self.flush_interval = flush_interval
+        self._timer = None  # periodic flush thread, started on the first add()
+        self._closed = threading.Event()
+        self._datasets = set()  # dataset refs known to exist
+        self._tables = set()    # table refs known to exist
+        self._buffers = {}      # table_ref -> [(row, key, Future), ...]
+        self._failed = {}       # table_ref -> error of its last load (retried on flush(), not on add())
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def ensure_dataset(self, dataset_ref):
+        """Create the dataset if missing (checked once per process)"""
+        if dataset_ref in self._datasets:
+            return
+        from google.cloud import bigquery
+        dataset = bigquery.Dataset(dataset_ref)
+        dataset.location = BQ_LOCATION
+        self.get_client().create_dataset(dataset, exists_ok=True)
+        self._datasets.add(dataset_ref)
+
+    def ensure_table(self, table):
+        """Create the table (and its dataset) if missing (checked once per process)"""
+        table_ref = f"{table.project}.{table.dataset_id}.{table.table_id}"
+        if table_ref in self._tables:
+            return
+        self.ensure_dataset(f"{table.project}.{table.dataset_id}")
+        self.get_client().create_table(table, exists_ok=True)
+        self._tables.add(table_ref)
+
+    def forget_table(self, table_ref):
+        """Drop a cached existence entry (e.g. after the table was deleted)"""
+        self._tables.discard(table_ref)
+
+    def add(self, table_ref, row, key=None) -> Future:
+        """
+        Buffer a snapshot row for table_ref.
+        A table whose buffer reaches max_rows is flushed right away.
+
+        Args:
+            key: Identifies the row in on_loaded (e.g. catalog snapshot id)
+
+        Returns:
+            Future resolving to table_ref once the row is loaded (raises if it
+            was dropped; stays pending while the table's loads fail)
+        """
+        future = Future()
+        with self._lock:
+            if self._timer is None and self.flush_interval:
+                self._timer = threading.Thread(target=self._flush_periodically, name='bigquery-flush',
+                                               daemon=True)
+                self._timer.start()
+            rows = self._buffers.setdefault(table_ref, [])
+            rows.append((row, key, future))
+            full = len(rows) >= self.max_rows and table_ref not in self._failed
+            dropped = self._trim(table_ref)
+        self._report_dropped(table_ref, dropped)
+        if full:
+            self.flush(tables=[table_ref])
+        return future
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            if self.pending():
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.error(f"BigQuery periodic flush error: {e}")
+
+    def close(self) -> dict:
+        """Stop the periodic flush and load what is still buffered (registered atexit)"""
+        self._closed.set()
+        if not self.pending():
+            return {}
+        return self.flush()
+
+    def _trim(self, table_ref):
+        """Drop the oldest rows of a table beyond max_retained (caller holds _lock)"""
+        rows = self._buffers.get(table_ref, [])
+        excess = len(rows) - self.max_retained
+        if excess <= 0:
+            return []
+        self._buffers[table_ref] = rows[excess:]
+        return rows[:excess]
+
+    def _report_dropped(self, table_ref, dropped):
+        if not dropped:
+            return
+        message = (f"dropped {len(dropped)} unloaded rows of {table_ref} "
+                   f"(over {self.max_retained} retained after failed loads)")
+        logger.error(f"BigQuery: {message}")
+        for _, _, future in dropped:
+            future.set_exception(RuntimeError(message))
+        if self.on_dropped is not None:
+            try:
+                self.on_dropped(table_ref, [key for _, key, _ in dropped if key is not None])
+            except Exception as e:
+                logger.error(f"BigQuery drop callback error: {table_ref}: {e}")
+
+    def pending(self) -> int:
+        """Number of buffered rows"""
+        with self._lock:
+            return sum(len(rows) for rows in self._buffers.values())
+
+    def _load(self, table_ref, rows):
+        from google.cloud import bigquery
+        table = snapshot_table(table_ref)
+        self.ensure_table(table)
+        job_config = bigquery.LoadJobConfig(
+            schema=table.schema,
+            source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+            write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+        )
+        job = self.get_client().load_table_from_json(rows, table_ref, job_config=job_config)
+        job.result()
+        if job.errors:
+            raise RuntimeError(str(job.errors))
+
+    def flush(self, tables=None) -> dict:
+        """
+        Load buffered rows, one load job per table.
+
+        Args:
+            tables: Only flush these table refs (default: all)
+
+        Returns:
+            {table_ref: rows loaded | {'error': message}}
+        """
+        with self._flush_lock:
+            with self._lock:
+                refs = [t for t in (tables or list(self._buffers)) if self._buffers.get(t)]
+                batches = {ref: self._buffers.pop(ref) for ref in refs}
+
+            results = {}
+            for table_ref, rows in batches.items():
+                try:
+                    self._load(table_ref, [row for row, _, _ in rows])
+                    results[table_ref] = len(rows)
+                    self._failed.pop(table_ref, None)
+                except Exception as e:
+                    logger.error(f"BigQuery load error: {table_ref}: {e}")
+                    self.forget_table(table_ref)
+                    self._failed[table_ref] = str(e)
+                    with self._lock:
+                        # Keep the rows (ahead of newer ones) for the next flush, bounded
+                        self._buffers[table_ref] = rows + self._buffers.get(table_ref, [])
+                        dropped = self._trim(table_ref)
+                    self._report_dropped(table_ref, dropped)
+                    results[table_ref] = {'error': str(e)}
+                    continue
+                if self.on_loaded is not None:
+                    try:
+                        self.on_loaded(table_ref, [key for _, key, _ in rows if key is not None])
+                    except Exception as e:
+                        logger.error(f"BigQuery load callback error: {table_ref}: {e}")
+                for _, _, future in rows:
+                    future.set_result(table_ref)
+
+        if results:
+            failed = sum(1 for r in results.values() if isinstance(r, dict))
+            loaded = sum(r for r in results.values() if isinstance(r, int))
+            logger.info(f"BigQuery: loaded {loaded} rows into {len(results) - failed} tables ({failed} failed)")
+        return results
+
+    def flush_rows(self, rows) -> dict:
+        """
+        Flush the tables holding some rows and report only those rows.
+        A row loaded meanwhile by another caller's flush() counts as loaded.
+
+        Args:
+            rows: [(table_ref, Future from add()), ...] (e.g. one fetch's WriteBatch.rows)
+
+        Returns:
+            {table_ref: rows loaded | {'error': message}}
+        """
+        tables = {}
+        for table_ref, future in rows:
+            tables.setdefault(table_ref, []).append(future)
+        self.flush(tables=list(tables))
+
+        results = {}
+        for table_ref, futures in tables.items():
+            errors = [f.exception() for f in futures if f.done() and f.exception() is not None]
+            if errors:
+                results[table_ref] = {'error': str(errors[0])}
+            elif not all(f.done() for f in futures):
+                results[table_ref] = {'error': self._failed.get(table_ref, 'not loaded')}
+            else:
+                results[table_ref] = len(futures)
+        return results
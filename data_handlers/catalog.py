@@ -0,0 +1,306 @@
+"""
+SQLite catalog of stored snapshots.
+One row per save_json call: where the snapshot went (local path, GCS URI,
+BigQuery table), its size and content hashes. Listing, stats, latest and
+time-range lookups are indexed queries instead of filesystem/bucket scans.
+An unchanged payload gets a reference row (ref_id = the row holding the body)
+instead of a new stored copy.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from config import CATALOG_PATH, DATA_DIR
+
+logger = logging.getLogger('storage')
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source TEXT NOT NULL,
+    chain TEXT NOT NULL,
+    address TEXT NOT NULL,
+    user_id TEXT NOT NULL DEFAULT '',
+    endpoint TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    bytes INTEGER,
+    content_hash TEXT,
+    local_path TEXT,
+    gcs_uri TEXT,
+    bq_table TEXT,
+    ref_id INTEGER,
+    raw_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_lookup
+    ON snapshots (source, chain, address, user_id, endpoint, timestamp);
+CREATE INDEX IF NOT EXISTS idx_snapshots_timestamp ON snapshots (timestamp);
+CREATE INDEX IF NOT EXISTS idx_snapshots_content ON snapshots (source, endpoint, content_hash);
+CREATE INDEX IF NOT EXISTS idx_snapshots_raw ON snapshots (source, endpoint, raw_hash);
+"""
+
+COLUMNS = ('id', 'source', 'chain', 'address', 'user_id', 'endpoint', 'timestamp',
+           'bytes', 'content_hash', 'local_path', 'gcs_uri', 'bq_table', 'ref_id', 'raw_hash')
+
+
+def to_catalog_timestamp(value):
+    """'20241226_143022' / datetime / ISO string -> sortable ISO 'YYYY-mm-ddTHH:MM:SS'"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%dT%H:%M:%S')
+    if len(value) == 15 and value[8] == '_':
+        return datetime.strptime(value, '%Y%m%d_%H%M%S').strftime('%Y-%m-%dT%H:%M:%S')
+    return value
+
+
+class SnapshotCatalog:
+    """Thread-safe snapshot catalog (one WAL-mode connection per process)."""
+
+    def __init__(self, path=CATALOG_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(snapshots)")}
+        if columns and 'ref_id' not in columns:
+            # Catalogs created before unchanged-snapshot references
+            self._conn.execute("ALTER TABLE snapshots ADD COLUMN ref_id INTEGER")
+        if columns and 'raw_hash' not in columns:
+            # Catalogs created before raw-bytes hashes
+            self._conn.execute("ALTER TABLE snapshots ADD COLUMN raw_hash TEXT")
+        self._conn.executescript(SCHEMA)
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _rows(self, sql, params=()):
+        return [dict(zip(COLUMNS, row)) for row in self._query(sql, params)]
+
+    def record(self, source, chain, address, endpoint, timestamp, user_id=None,
+               size=None, content_hash=None, local_path=None, gcs_uri=None, bq_table=None, ref_id=None,
+               raw_hash=None):
+        """
+        Add one snapshot row and return its id
+
+        Args:
+            raw_hash: sha256 of the payload bytes as received (RawPayloads only), matched
+                before content_hash so an unchanged raw body is never decoded
+            ref_id: Row holding the identical body, for an "unchanged at timestamp" reference.
+                The reference is only added while that row still exists at local_path /
+                gcs_uri (retention may have dropped or moved it): None is returned otherwise.
+        """
+        values = (source, chain, address, user_id or '', endpoint, to_catalog_timestamp(timestamp),
+                  size, content_hash, local_path, gcs_uri, bq_table, ref_id, raw_hash)
+        with self._lock, self._conn:
+            if ref_id is None:
+                cursor = self._conn.execute(
+                    "INSERT INTO snapshots (source, chain, address, user_id, endpoint, timestamp, "
+                    "bytes, content_hash, local_path, gcs_uri, bq_table, ref_id, raw_hash) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", values)
+                return cursor.lastrowid
+            # Checked in the same transaction as the insert, so retention cannot delete the body in between
+            cursor = self._conn.execute(
+                "INSERT INTO snapshots (source, chain, address, user_id, endpoint, timestamp, "
+                "bytes, content_hash, local_path, gcs_uri, bq_table, ref_id, raw_hash) "
+                "SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM snapshots "
+                "WHERE id = ? AND local_path IS ? AND gcs_uri IS ?)",
+                values + (ref_id, local_path, gcs_uri))
+            return cursor.lastrowid if cursor.rowcount else None
+
+    def get(self, snapshot_id):
+        """Snapshot row by id (None if unknown)"""
+        rows = self._rows("SELECT * FROM snapshots WHERE id = ?", (snapshot_id,))
+        return rows[0] if rows else None
+
+    def clear_location(self, column, value):
+        """Forget a location that turned out not to exist (e.g. a failed background upload)"""
+        if column not in ('local_path', 'gcs_uri', 'bq_table'):
+            raise ValueError(f"Unknown location column: {column}")
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE snapshots SET {column} = NULL WHERE {column} = ?", (value,))
+
+    def set_location(self, column, value, snapshot_ids):
+        """Record a location once the snapshots are durably stored there (e.g. after a BigQuery load)"""
+        if column not in ('local_path', 'gcs_uri', 'bq_table'):
+            raise ValueError(f"Unknown location column: {column}")
+        with self._lock, self._conn:
+            self._conn.executemany(f"UPDATE snapshots SET {column} = ? WHERE id = ?",
+                                   [(value, i) for i in snapshot_ids])
+
+    def discard_unstored(self, snapshot_ids):
+        """Delete rows that ended up stored nowhere (e.g. BigQuery-only rows dropped after failed loads)"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM snapshots WHERE id = ? AND local_path IS NULL AND gcs_uri IS NULL "
+                "AND bq_table IS NULL", [(i,) for i in snapshot_ids])
+
+    def latest(self, source, chain, address, endpoint, user_id=None, location=None):
+        """
+        Newest snapshot row for an endpoint (None if never stored).
+
+        Args:
+            location: Only rows stored there: 'local_path', 'gcs_uri' or 'bq_table'
+        """
+        where = f" AND {location} IS NOT NULL" if location in ('local_path', 'gcs_uri', 'bq_table') else ""
+        rows = self._rows(
+            "SELECT * FROM snapshots WHERE source = ? AND chain = ? AND address = ? "
+            f"AND user_id = ? AND endpoint = ?{where} ORDER BY timestamp DESC, id DESC LIMIT 1",
+            (source, chain, address, user_id or '', endpoint)
+        )
+        return rows[0] if rows else None
+
+    def latest_body(self, source, endpoint, content_hash=None, raw_hash=None):
+        """Newest row of an endpoint, for any token or user, holding a body with this content (or raw) hash"""
+        column, value = ('raw_hash', raw_hash) if raw_hash is not None else ('content_hash', content_hash)
+        rows = self._rows(
+            f"SELECT * FROM snapshots WHERE source = ? AND endpoint = ? AND {column} = ? "
+            "AND ref_id IS NULL ORDER BY timestamp DESC, id DESC LIMIT 1",
+            (source, endpoint, value)
+        )
+        return rows[0] if rows else None
+
+    def snapshots(self, source, chain, address, endpoint, user_id=None, start=None, end=None):
+        """Snapshot rows of an endpoint with start <= timestamp <= end, oldest first"""
+        sql = ("SELECT * FROM snapshots WHERE source = ? AND chain = ? AND address = ? "
+               "AND user_id = ? AND endpoint = ?")
+        params = [source, chain, address, user_id or '', endpoint]
+        if start is not None:
+            sql += " AND timestamp >= ?"
+            params.append(to_catalog_timestamp(start))
+        if end is not None:
+            sql += " AND timestamp <= ?"
+            params.append(to_catalog_timestamp(end))
+        return self._rows(sql + " ORDER BY timestamp, id", params)
+
+    def endpoints(self):
+        """Distinct (source, chain, address, user_id, endpoint) with snapshots"""
+        return [dict(zip(('source', 'chain', 'address', 'user_id', 'endpoint'), row)) for row in self._query(
+            "SELECT DISTINCT source, chain, address, user_id, endpoint FROM snapshots "
+            "ORDER BY source, chain, address, user_id, endpoint")]
+
+    def relocate(self, column, old, new):
+        """Point every row stored at old (body and unchanged references) to new"""
+        if column not in ('local_path', 'gcs_uri'):
+            raise ValueError(f"Unknown location column: {column}")
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE snapshots SET {column} = ? WHERE {column} = ?", (new, old))
+
+    def forget(self, snapshot_ids, locations=None) -> dict:
+        """
+        Drop snapshot rows removed by retention.
+        Rows also stored in BigQuery only lose their local/GCS locations. When a
+        deleted row holds a body, its oldest remaining reference takes it over.
+
+        Args:
+            locations: {column: [location]} retention means to delete; checked in the
+                same transaction, after the rows are dropped
+
+        Returns:
+            {column: [location]} of those no row uses any more (e.g. not one an
+            unchanged reference recorded since the plan points to): safe to delete
+        """
+        with self._lock, self._conn:
+            for snapshot_id in snapshot_ids:
+                (size, bq_table), = self._conn.execute(
+                    "SELECT bytes, bq_table FROM snapshots WHERE id = ?", (snapshot_id,)).fetchall() or [(0, None)]
+                if bq_table is not None:
+                    self._conn.execute(
+                        "UPDATE snapshots SET local_path = NULL, gcs_uri = NULL WHERE id = ?", (snapshot_id,))
+                    continue
+                heir = self._conn.execute(
+                    "SELECT id FROM snapshots WHERE ref_id = ? ORDER BY timestamp, id LIMIT 1", (snapshot_id,)
+                ).fetchone()
+                if heir is not None:
+                    self._conn.execute("UPDATE snapshots SET ref_id = ? WHERE ref_id = ?", (heir[0], snapshot_id))
+                    self._conn.execute("UPDATE snapshots SET ref_id = NULL, bytes = ? WHERE id = ?",
+                                       (size, heir[0]))
+                self._conn.execute("DELETE FROM snapshots WHERE id = ?", (snapshot_id,))
+
+            unused = {}
+            for column, values in (locations or {}).items():
+                if column not in ('local_path', 'gcs_uri'):
+                    raise ValueError(f"Unknown location column: {column}")
+                for value in values:
+                    used = self._conn.execute(
+                        f"SELECT 1 FROM snapshots WHERE {column} = ? LIMIT 1", (value,)).fetchone()
+                    if used is None:
+                        unused.setdefault(column, []).append(value)
+            return unused
+
+    def list_tokens(self):
+        """Distinct (source, chain, address) that have snapshots"""
+        return [{'source': s, 'chain': c, 'address': a} for s, c, a in self._query(
+            "SELECT DISTINCT source, chain, address FROM snapshots ORDER BY source, chain, address")]
+
+    def stats(self):
+        """
+        Snapshot counts and bytes. Per-location counts are stored bodies only;
+        unchanged references (no body of their own) are counted under 'unchanged'.
+        """
+        (total, total_bytes, local, gcs, bq, unchanged), = self._query(
+            "SELECT COUNT(*), COALESCE(SUM(bytes), 0), "
+            "COUNT(CASE WHEN ref_id IS NULL THEN local_path END), "
+            "COUNT(CASE WHEN ref_id IS NULL THEN gcs_uri END), "
+            "COUNT(CASE WHEN ref_id IS NULL THEN bq_table END), COUNT(ref_id) FROM snapshots")
+        return {'snapshots': total, 'bytes': total_bytes,
+                'local': local, 'gcs': gcs, 'bigquery': bq, 'unchanged': unchanged}
+
+    def is_empty(self):
+        return not self._query("SELECT 1 FROM snapshots LIMIT 1")
+
+    def backfill_local(self, data_dir=DATA_DIR, snapshot_re=None):
+        """
+        Catalog snapshot files already on disk (written before the catalog existed).
+        Layout: {data_dir}/{source}/{chain}/{address}[/{user_id}]/{endpoint}_{YYYYmmdd_HHMMSS}.json[.gz|.zst]
+        """
+        from data_handlers.storage import SNAPSHOT_RE
+        snapshot_re = snapshot_re or SNAPSHOT_RE
+        root = Path(data_dir)
+        if not root.exists():
+            return 0
+
+        known = {row[0] for row in self._query("SELECT local_path FROM snapshots WHERE local_path IS NOT NULL")}
+        rows = []
+        for path in root.rglob('*.json*'):
+            match = snapshot_re.search(path.name)
+            parts = path.relative_to(root).parts
+            if not match or len(parts) not in (4, 5) or str(path) in known:
+                continue
+            source, chain, address = parts[:3]
+            user_id = parts[3] if len(parts) == 5 else ''
+            endpoint = path.name[:match.start()]
+            timestamp = path.name[match.start() + 1:match.start() + 16]
+            rows.append((source, chain, address, user_id, endpoint, to_catalog_timestamp(timestamp),
+                         path.stat().st_size, None, str(path), None, None, None))
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO snapshots (source, chain, address, user_id, endpoint, timestamp, "
+                "bytes, content_hash, local_path, gcs_uri, bq_table, ref_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        logger.info(f"Catalog: backfilled {len(rows)} local snapshots")
+        return len(rows)
+
+
+def get_catalog():
+    """Get the process-wide SnapshotCatalog (lazy init, backfilled from DATA_DIR on first use)"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                catalog = SnapshotCatalog()
+                if catalog.is_empty():
+                    catalog.backfill_local()
+                _catalog = catalog
+    return _catalog
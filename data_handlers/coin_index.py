@@ -0,0 +1,149 @@
+"""
+Local cross-provider ID index (SQLite).
+Maps (chain, contract) -> CoinGecko id, symbol, DefiLlama coin identifier and
+Nansen chain slug, built from CoinGecko /coins/list?include_platform=true.
+Lets the fetchers resolve coin_id/token_symbol without a network round trip
+(and offline).
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from config import COIN_INDEX_PATH, SUPPORTED_CHAINS
+
+logger = logging.getLogger('coin_index')
+
+_index = None
+_index_lock = threading.Lock()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS coins (
+    chain TEXT NOT NULL,
+    contract TEXT NOT NULL,
+    coingecko_id TEXT NOT NULL,
+    symbol TEXT,
+    name TEXT,
+    defillama_id TEXT,
+    nansen_chain TEXT,
+    updated_at TEXT,
+    PRIMARY KEY (chain, contract)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def normalize_contract(contract: str) -> str:
+    """EVM addresses are case-insensitive (stored lowercase); others (e.g. Solana) are not"""
+    contract = (contract or '').strip()
+    return contract.lower() if contract.startswith('0x') else contract
+
+
+class CoinIndex:
+    """Persistent (chain, contract) -> provider IDs index."""
+
+    def __init__(self, path=COIN_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        # CoinGecko platform id -> SUPPORTED_CHAINS name
+        self.platform_chains = {cfg['coingecko']: name for name, cfg in SUPPORTED_CHAINS.items()}
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Connection that commits on success and is always closed"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _rows_from_coins_list(self, coins):
+        """Yield index rows for every supported-chain platform of every coin"""
+        for coin in coins:
+            for platform, contract in (coin.get('platforms') or {}).items():
+                chain = self.platform_chains.get(platform)
+                if not chain or not contract:
+                    continue
+                contract = normalize_contract(contract)
+                chain_config = SUPPORTED_CHAINS[chain]
+                yield (chain, contract, coin['id'], (coin.get('symbol') or '').upper(),
+                       coin.get('name'), f"{chain_config['defillama']}:{contract}",
+                       chain_config.get('nansen'))
+
+    def update_from_coins_list(self, coins) -> dict:
+        """
+        Incrementally sync the index with a /coins/list?include_platform=true response.
+        Only new/changed rows are written; contracts no longer listed are removed.
+
+        Returns:
+            Counts of added, updated, removed rows
+        """
+        if not isinstance(coins, list):
+            return {'added': 0, 'updated': 0, 'removed': 0}
+        now = datetime.now().isoformat()
+        rows = {(r[0], r[1]): r for r in self._rows_from_coins_list(coins)}
+
+        with self._lock, self._connect() as conn:
+            existing = {
+                (chain, contract): (cg_id, symbol, name)
+                for chain, contract, cg_id, symbol, name in conn.execute(
+                    "SELECT chain, contract, coingecko_id, symbol, name FROM coins")
+            }
+            added = [r for k, r in rows.items() if k not in existing]
+            updated = [r for k, r in rows.items() if k in existing and existing[k] != r[2:5]]
+            removed = [k for k in existing if k not in rows]
+
+            conn.executemany(
+                "INSERT OR REPLACE INTO coins VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [r + (now,) for r in added + updated]
+            )
+            conn.executemany("DELETE FROM coins WHERE chain = ? AND contract = ?", removed)
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('refreshed_at', ?)", (now,))
+
+        counts = {'added': len(added), 'updated': len(updated), 'removed': len(removed)}
+        logger.info(f"Coin index refreshed: {counts}")
+        return counts
+
+    def lookup(self, chain_name: str, contract: str):
+        """
+        Resolve a contract on a SUPPORTED_CHAINS chain.
+
+        Returns:
+            Dict with coingecko_id, symbol, name, defillama_id, nansen_chain (None if unknown)
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT coingecko_id, symbol, name, defillama_id, nansen_chain FROM coins "
+                "WHERE chain = ? AND contract = ?",
+                (chain_name, normalize_contract(contract))
+            ).fetchone()
+        if not row:
+            return None
+        return dict(zip(('coingecko_id', 'symbol', 'name', 'defillama_id', 'nansen_chain'), row))
+
+    def stats(self) -> dict:
+        """Row count and last refresh time"""
+        with self._connect() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM coins").fetchone()[0]
+            refreshed = conn.execute("SELECT value FROM meta WHERE key = 'refreshed_at'").fetchone()
+        return {'coins': count, 'refreshed_at': refreshed[0] if refreshed else None}
+
+
+def get_coin_index():
+    """Get the process-wide CoinIndex (lazy init)"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = CoinIndex()
+    return _index
@@ -0,0 +1,70 @@
+"""
+Snapshot compression helpers (gzip / zstd).
+Writers pick the codec from config.STORAGE_COMPRESSION; readers detect it
+from the magic bytes, so plain .json, .json.gz and .json.zst all load.
+"""
+import gzip
+import logging
+
+logger = logging.getLogger('storage')
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+EXTENSIONS = {'none': '.json', 'gzip': '.json.gz', 'zstd': '.json.zst'}
+CONTENT_ENCODINGS = {'none': None, 'gzip': 'gzip', 'zstd': 'zstd'}
+
+_zstd_warned = False
+
+
+def _zstd():
+    """zstandard module (optional dependency), None if not installed"""
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+
+def resolve_codec(codec):
+    """Normalize a codec name; zstd falls back to gzip when zstandard is missing"""
+    global _zstd_warned
+    codec = (codec or 'none').lower()
+    if codec not in EXTENSIONS:
+        raise ValueError(f"Unknown storage compression: {codec}")
+    if codec == 'zstd' and _zstd() is None:
+        if not _zstd_warned:
+            logger.warning("zstandard not installed, falling back to gzip (pip install zstandard)")
+            _zstd_warned = True
+        return 'gzip'
+    return codec
+
+
+def compress(content: bytes, codec: str, level=None) -> bytes:
+    """Compress bytes with a resolved codec ('none' returns them unchanged)"""
+    if codec == 'gzip':
+        return gzip.compress(content, compresslevel=level or 6)
+    if codec == 'zstd':
+        return _zstd().ZstdCompressor(level=level or 3).compress(content)
+    return content
+
+
+def decompress(content: bytes) -> bytes:
+    """Decompress gzip/zstd bytes (detected by magic number); plain bytes pass through"""
+    if content[:2] == GZIP_MAGIC:
+        return gzip.decompress(content)
+    if content[:4] == ZSTD_MAGIC:
+        zstd = _zstd()
+        if zstd is None:
+            raise RuntimeError("zstd-compressed snapshot but zstandard is not installed")
+        return zstd.ZstdDecompressor().decompressobj().decompress(content)
+    return content
+
+
+def extension(codec: str) -> str:
+    return EXTENSIONS[codec]
+
+
+def content_encoding(codec: str):
+    """HTTP Content-Encoding for GCS object metadata (None when uncompressed)"""
+    return CONTENT_ENCODINGS[codec]
@@ -0,0 +1,128 @@
+"""
+Bounded thread-pool uploader for GCS snapshots.
+save_json submits blobs and returns immediately; flush() waits for the
+pending uploads (all, or one fetch's) and reports the result per blob.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from config import GCS_UPLOAD_WORKERS
+
+logger = logging.getLogger('storage')
+
+POINTER_RETRIES = 5  # Attempts to move a latest pointer that other uploads keep moving
+
+
+class GcsUploader:
+    """
+    Uploads blobs on a fixed pool of worker threads.
+    At most max_pending uploads are queued; submit() blocks beyond that (backpressure).
+    """
+
+    def __init__(self, get_bucket, workers=GCS_UPLOAD_WORKERS, max_pending=None):
+        self.get_bucket = get_bucket
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='gcs-upload')
+        self._slots = threading.BoundedSemaphore(max_pending or workers * 4)
+        self._pending = {}  # uri -> Future, since the last flush()
+        self._lock = threading.Lock()
+
+    def _upload(self, blob_path, content, content_encoding, content_type, pointer_path):
+        try:
+            bucket = self.get_bucket()
+            blob = bucket.blob(blob_path)
+            blob.content_encoding = content_encoding
+            blob.upload_from_string(content, content_type=content_type)
+            if pointer_path:
+                # Written after the snapshot, so the pointer never names a missing object
+                self._move_pointer(bucket, pointer_path, blob_path)
+            return f"gs://{bucket.name}/{blob_path}"
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _move_pointer(bucket, pointer_path, blob_path):
+        """
+        Point pointer_path at blob_path unless it already names a newer blob (an
+        endpoint's snapshot names sort by timestamp). The generation precondition
+        turns a concurrent move into a retry instead of a lost update.
+        """
+        from google.api_core.exceptions import PreconditionFailed
+        for _ in range(POINTER_RETRIES):
+            pointer = bucket.get_blob(pointer_path)
+            generation = 0  # Only create it if there is none
+            if pointer is not None:
+                if pointer.download_as_text().strip() > blob_path:
+                    return
+                generation = pointer.generation
+            try:
+                bucket.blob(pointer_path).upload_from_string(blob_path, content_type='text/plain',
+                                                             if_generation_match=generation)
+                return
+            except PreconditionFailed:
+                continue
+        logger.warning(f"GCS latest pointer {pointer_path} not moved to {blob_path}: kept changing")
+
+    def submit(self, uri, blob_path, content, content_encoding=None, content_type='application/json',
+               pointer_path=None):
+        """
+        Queue an upload and return its Future (resolves to the gs:// URI, or raises).
+
+        Args:
+            uri: gs:// URI the blob will have (key in flush() results)
+            blob_path: Object name inside the bucket
+            content: Bytes to upload
+            pointer_path: Optional "latest" pointer object updated to blob_path after the upload
+        """
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(self._upload, blob_path, content,
+                                           content_encoding, content_type, pointer_path)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._pending[uri] = future
+        return future
+
+    def future(self, uri):
+        """Pending Future for a submitted URI (None if unknown or already flushed)"""
+        with self._lock:
+            return self._pending.get(uri)
+
+    def flush(self, timeout=None, uploads=None) -> dict:
+        """
+        Wait for pending uploads.
+
+        Args:
+            uploads: Only wait for these {uri: Future} (e.g. one fetch's WriteBatch.uploads;
+                default: every pending upload)
+
+        Returns:
+            {uri: uri on success | {'error': message} on failure | {'error': 'timeout'}}
+        """
+        with self._lock:
+            if uploads is None:
+                pending, self._pending = self._pending, {}
+            else:
+                pending = dict(uploads)
+                for uri, future in pending.items():
+                    if self._pending.get(uri) is future:
+                        del self._pending[uri]
+        done, not_done = wait(pending.values(), timeout=timeout)
+
+        results = {}
+        for uri, future in pending.items():
+            if future in not_done:
+                results[uri] = {'error': 'timeout'}
+                with self._lock:
+                    self._pending.setdefault(uri, future)  # Still reported by the next flush
+            elif future.exception() is not None:
+                results[uri] = {'error': str(future.exception())}
+            else:
+                results[uri] = future.result()
+        failed = sum(1 for r in results.values() if isinstance(r, dict))
+        if results:
+            logger.info(f"GCS: flushed {len(results)} uploads ({failed} failed)")
+        return results
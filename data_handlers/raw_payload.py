@@ -0,0 +1,71 @@
+"""
+Undecoded API response body.
+Clients in raw mode return a RawPayload instead of response.json(); storage
+writes its bytes as-is, and the JSON is only parsed if a consumer reads it.
+"""
+import json
+
+
+class RawPayload:
+    """
+    Response bytes with lazy JSON decoding.
+    Behaves like the decoded object for common read access (get, [], len, iter),
+    decoding on first use.
+    """
+
+    __slots__ = ('content', 'content_type', '_data', '_decoded')
+
+    def __init__(self, content: bytes, content_type: str = 'application/json'):
+        self.content = content
+        self.content_type = content_type or 'application/json'
+        self._data = None
+        self._decoded = False
+
+    @property
+    def data(self):
+        """Decoded JSON (parsed once, on first access)"""
+        if not self._decoded:
+            self._data = json.loads(self.content)
+            self._decoded = True
+        return self._data
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    @property
+    def size(self) -> int:
+        """Body size in bytes (no decoding)"""
+        return len(self.content)
+
+    def size_label(self) -> str:
+        """Human readable body size, e.g. '4.2 MB'"""
+        size = float(self.size)
+        for unit in ('B', 'KB', 'MB'):
+            if size < 1024:
+                return f"{size:.1f} {unit}" if unit != 'B' else f"{int(size)} B"
+            size /= 1024
+        return f"{size:.1f} GB"
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __bool__(self):
+        return bool(self.content)
+
+    def __repr__(self):
+        return f"RawPayload({self.size_label()}, {self.content_type})"
+
+
+def decode_payload(data):
+    """Return the decoded object for a RawPayload, anything else unchanged"""
+    return data.data if isinstance(data, RawPayload) else data
@@ -0,0 +1,313 @@
+"""
+Retention and compaction of stored snapshots (local DATA_DIR and the GCS bucket).
+Each endpoint follows a RetentionPolicy (config.RETENTION_POLICIES): every
+snapshot is kept for keep_all_days, then the newest per day, then the newest
+per ISO week. Kept snapshots older than keep_all_days are packed into monthly
+archive segments (data_handlers/archive.py) that the catalog and
+load_latest_json still address; the rest are deleted.
+BigQuery rows are not touched.
+
+Usage:
+    python -m data_handlers.retention            # dry-run report
+    python -m data_handlers.retention --apply
+"""
+
+import logging
+import sys
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from config import RETENTION_INTERVAL_HOURS, RETENTION_POLICIES
+from data_handlers.archive import (
+    ARCHIVE_DIR, ARCHIVE_SEP, build_segment, is_archived, segment_members, segment_name, split_location
+)
+from data_handlers.catalog import get_catalog
+
+logger = logging.getLogger('storage')
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+CATALOG_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+# Catalog columns of the locations retention manages
+LOCATIONS = ('local_path', 'gcs_uri')
+
+
+class RetentionPolicy:
+    """
+    Which snapshots of one endpoint to keep.
+
+    Args:
+        keep_all_days: Keep every snapshot this recent
+        daily_days: Then the newest snapshot per day up to this age (None = forever)
+        weekly_days: Then the newest snapshot per ISO week up to this age (None = forever)
+    """
+
+    def __init__(self, keep_all_days=7, daily_days=90, weekly_days=None):
+        self.keep_all_days = keep_all_days
+        self.daily_days = daily_days
+        self.weekly_days = weekly_days
+
+    def keep(self, rows, now) -> set:
+        """Ids of the catalog rows to keep (rows oldest first); the newest row is always kept"""
+        kept = set()
+        buckets = {}  # day / ISO week -> newest row id
+        for row in rows:
+            taken_at = datetime.strptime(row['timestamp'], CATALOG_TIME_FORMAT)
+            age = now - taken_at
+            if age <= timedelta(days=self.keep_all_days):
+                kept.add(row['id'])
+            elif self.daily_days is None or age <= timedelta(days=self.daily_days):
+                buckets[('day', taken_at.date())] = row['id']
+            elif self.weekly_days is None or age <= timedelta(days=self.weekly_days):
+                buckets[('week', taken_at.isocalendar()[:2])] = row['id']
+        kept.update(buckets.values())
+        if rows:
+            kept.add(rows[-1]['id'])
+        return kept
+
+
+def policy_for(endpoint_name, policies=None):
+    """RetentionPolicy of an endpoint ('default' entry unless the endpoint has its own)"""
+    policies = policies or RETENTION_POLICIES
+    return RetentionPolicy(**policies.get(endpoint_name, policies['default']))
+
+
+def _archive_address(column, location, endpoint_name, timestamp):
+    """'{segment}::{member}' a loose snapshot is compacted into (monthly segment next to it)"""
+    name = segment_name(endpoint_name, timestamp)
+    if column == 'local_path':
+        path = Path(location)
+        return f"{path.parent / ARCHIVE_DIR / name}{ARCHIVE_SEP}{path.name}"
+    head, filename = location.rsplit('/', 1)
+    return f"{head}/{ARCHIVE_DIR}/{name}{ARCHIVE_SEP}{filename}"
+
+
+class RetentionEngine:
+    """
+    Plans and applies retention from the catalog.
+    A stored body (file / object) is deleted only when no kept row uses it;
+    unchanged-snapshot references keep their body alive.
+    """
+
+    def __init__(self, catalog=None, get_bucket=None, policies=None):
+        self.catalog = catalog or get_catalog()
+        self.get_bucket = get_bucket
+        self.policies = policies
+
+    def plan(self, now=None) -> list:
+        """
+        Retention actions per endpoint (nothing is changed).
+
+        Returns:
+            [{source, chain, address, user_id, endpoint, 'snapshots': n, 'keep': n,
+              'drop': [row ids], 'delete': {column: [location]},
+              'archive': {column: {location: archive address}},
+              'bytes_freed': n, 'bytes_archived': n}, ...]
+        """
+        now = now or datetime.now()
+        plans = []
+        for group in self.catalog.endpoints():
+            rows = self.catalog.snapshots(group['source'], group['chain'], group['address'],
+                                          group['endpoint'], group['user_id'])
+            policy = policy_for(group['endpoint'], self.policies)
+            kept = policy.keep(rows, now)
+            archive_before = (now - timedelta(days=policy.keep_all_days)).strftime(CATALOG_TIME_FORMAT)
+
+            plan = {**group, 'snapshots': len(rows), 'keep': len(kept),
+                    'drop': [row['id'] for row in rows if row['id'] not in kept],
+                    'delete': {}, 'archive': {}, 'bytes_freed': 0, 'bytes_archived': 0}
+            for column in LOCATIONS:
+                users = {}  # location -> rows stored there, oldest first
+                for row in rows:
+                    if row[column]:
+                        users.setdefault(row[column], []).append(row)
+                for location, using in users.items():
+                    size = sum(row['bytes'] or 0 for row in using)
+                    if not any(row['id'] in kept for row in using):
+                        plan['delete'].setdefault(column, []).append(location)
+                        plan['bytes_freed'] += size
+                    elif not is_archived(location) and using[-1]['timestamp'] < archive_before:
+                        plan['archive'].setdefault(column, {})[location] = _archive_address(
+                            column, location, group['endpoint'], using[0]['timestamp'])
+                        plan['bytes_archived'] += size
+            plans.append(plan)
+        return plans
+
+    def run(self, dry_run=True, now=None) -> dict:
+        """
+        Plan retention and, unless dry_run, apply it.
+
+        Returns:
+            Report dict (see format_report); per-endpoint failures are listed
+            under 'errors' and that endpoint is retried on the next run
+        """
+        plans = self.plan(now)
+        report = {'dry_run': dry_run, 'endpoints': len(plans),
+                  'snapshots': sum(p['snapshots'] for p in plans),
+                  'kept': sum(p['keep'] for p in plans),
+                  'dropped': sum(len(p['drop']) for p in plans),
+                  'deleted': sum(len(locs) for p in plans for locs in p['delete'].values()),
+                  'archived': sum(len(locs) for p in plans for locs in p['archive'].values()),
+                  'bytes_freed': sum(p['bytes_freed'] for p in plans),
+                  'bytes_archived': sum(p['bytes_archived'] for p in plans),
+                  'details': [p for p in plans if p['drop'] or p['delete'] or p['archive']],
+                  'errors': []}
+        if dry_run:
+            return report
+
+        for plan in report['details']:
+            try:
+                self._apply(plan)
+            except Exception as e:
+                name = f"{plan['source']}/{plan['chain']}/{plan['address']}/{plan['endpoint']}"
+                logger.error(f"Retention error: {name}: {e}")
+                report['errors'].append({'endpoint': name, 'error': str(e)})
+        logger.info(f"Retention: {report['dropped']} snapshots dropped, {report['archived']} archived, "
+                    f"{report['bytes_freed'] / 1e6:.1f} MB freed ({len(report['errors'])} errors)")
+        return report
+
+    def _apply(self, plan):
+        # Rows first: a crash afterwards leaves orphaned files, never rows pointing at nothing.
+        # Bodies are re-checked in the same transaction: a reference recorded since plan() keeps its body.
+        deletable = self.catalog.forget(plan['drop'], plan['delete'])
+
+        for column in LOCATIONS:
+            segments = {}  # segment -> ({member: loose location}, {dropped members})
+            for location, address in plan['archive'].get(column, {}).items():
+                segment, member = split_location(address)
+                segments.setdefault(segment, ({}, set()))[0][member] = location
+            for location in deletable.get(column, []):
+                if is_archived(location):
+                    segment, member = split_location(location)
+                    segments.setdefault(segment, ({}, set()))[1].add(member)
+                else:
+                    self._delete(column, location)
+
+            for segment, (added, dropped) in segments.items():
+                members = {member: self._read(column, location) for member, location in added.items()}
+                content = build_segment(self._read(column, segment, missing_ok=True), members, drop=dropped)
+                if segment_members(content):
+                    self._write(column, segment, content)
+                else:
+                    self._delete(column, segment)
+                for member, location in added.items():
+                    # A reference recorded after this still names the loose location and is
+                    # refused by catalog.record (save_json then writes a new snapshot)
+                    self.catalog.relocate(column, location, f"{segment}{ARCHIVE_SEP}{member}")
+                    self._delete(column, location)
+
+    def _blob_name(self, uri):
+        bucket = self.get_bucket()
+        bucket_prefix = f"gs://{bucket.name}/"
+        if not uri.startswith(bucket_prefix):
+            raise ValueError(f"Not in bucket {bucket.name}: {uri}")
+        return bucket, uri[len(bucket_prefix):]
+
+    def _read(self, column, location, missing_ok=False):
+        """Stored bytes of a snapshot file / object or segment (None if missing and missing_ok)"""
+        if column == 'local_path':
+            path = Path(location)
+            if missing_ok and not path.exists():
+                return None
+            return path.read_bytes()
+        from google.api_core.exceptions import NotFound
+        bucket, blob_name = self._blob_name(location)
+        try:
+            return bucket.blob(blob_name).download_as_bytes(raw_download=True)
+        except NotFound:
+            if missing_ok:
+                return None
+            raise
+
+    def _write(self, column, segment, content):
+        """Replace a segment atomically (local: tmp file + rename, GCS: single object upload)"""
+        if column == 'local_path':
+            path = Path(segment)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.parent / f".{path.name}.tmp"
+            tmp.write_bytes(content)
+            tmp.replace(path)
+            return
+        bucket, blob_name = self._blob_name(segment)
+        bucket.blob(blob_name).upload_from_string(content, content_type='application/zip')
+
+    def _delete(self, column, location):
+        if column == 'local_path':
+            Path(location).unlink(missing_ok=True)
+            return
+        from google.api_core.exceptions import NotFound
+        bucket, blob_name = self._blob_name(location)
+        try:
+            bucket.blob(blob_name).delete()
+        except NotFound:
+            pass
+
+
+def format_report(report) -> str:
+    """Human-readable retention report (CLI / logs)"""
+    lines = [
+        f"Retention {'dry run' if report['dry_run'] else 'run'}: {report['endpoints']} endpoints, "
+        f"{report['snapshots']} snapshots",
+        f"  keep {report['kept']}, drop {report['dropped']}",
+        f"  delete {report['deleted']} stored bodies ({report['bytes_freed'] / 1e6:.1f} MB), "
+        f"archive {report['archived']} ({report['bytes_archived'] / 1e6:.1f} MB)",
+    ]
+    for plan in report['details']:
+        deleted = sum(len(locs) for locs in plan['delete'].values())
+        archived = sum(len(locs) for locs in plan['archive'].values())
+        user = f" [{plan['user_id']}]" if plan['user_id'] else ""
+        lines.append(f"  {plan['source']}/{plan['chain']}/{plan['address']}/{plan['endpoint']}{user}: "
+                     f"{plan['snapshots']} -> {plan['keep']} snapshots, "
+                     f"{deleted} deleted, {archived} archived")
+    for error in report['errors']:
+        lines.append(f"  ERROR {error['endpoint']}: {error['error']}")
+    return "\n".join(lines)
+
+
+class RetentionScheduler:
+    """Applies retention on a daemon thread: once at start, then every interval_hours."""
+
+    def __init__(self, engine_factory=None, interval_hours=RETENTION_INTERVAL_HOURS):
+        self.engine_factory = engine_factory or _default_engine
+        self.interval = interval_hours * 3600
+        self.last_report = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name='storage-retention', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.last_report = self.engine_factory().run(dry_run=False)
+            except Exception as e:
+                logger.error(f"Retention run failed: {e}")
+            self._stop.wait(self.interval)
+
+
+def _default_engine():
+    from data_handlers.storage import _get_gcs_bucket
+    return RetentionEngine(get_bucket=_get_gcs_bucket)
+
+
+def start_retention_scheduler():
+    """Start the process-wide retention scheduler (once; later calls return it)"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                scheduler = RetentionScheduler()
+                scheduler.start()
+                _scheduler = scheduler
+    return _scheduler
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    print(format_report(_default_engine().run(dry_run='--apply' not in sys.argv[1:])))
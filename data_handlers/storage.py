@@ -2,12 +2,25 @@
 Storage module for Token Tracker
 Supports: Local JSON, Google Cloud Storage (GCS), BigQuery
 """
+import atexit
+import hashlib
 import json
 import os
 import logging
+import re
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
-from config import DATA_DIR, GCP_CONFIG, STORAGE_MODE
+from config import DATA_DIR, DUNE_LOAD_CHUNK_ROWS, GCP_CONFIG, STORAGE_MODE, STORAGE_COMPRESSION, STORAGE_DEDUPE
+from data_handlers.archive import read_member, split_location
+from data_handlers.bq_writer import BigQueryBatchWriter, migrate_snapshot_table
+from data_handlers.gcs_uploader import GcsUploader
+from data_handlers.catalog import get_catalog, to_catalog_timestamp
+from data_handlers.compression import compress, content_encoding, decompress, extension, resolve_codec
+from data_handlers.raw_payload import RawPayload
 
 # Setup logging
 logger = logging.getLogger('storage')
@@ -15,6 +28,15 @@ logger = logging.getLogger('storage')
 # Lazy imports for GCP libraries
 _gcs_client = None
 _bq_client = None
+_gcs_bucket = None
+_gcs_uploader = None
+_bq_writer = None
+_gcs_lock = threading.Lock()
+
+# Memoised BigQuery latest-row reads: (table, chain, address, table version) -> data
+BQ_READ_CACHE_SIZE = 256
+_bq_read_cache = OrderedDict()
+_bq_read_lock = threading.Lock()
 
 
 
@@ -50,6 +72,48 @@ def _get_gcs_client():
     return _gcs_client
 
 
+def _get_gcs_bucket():
+    """Get the GCS bucket handle (existence checked / bucket created once per process)"""
+    global _gcs_bucket
+    if _gcs_bucket is None:
+        with _gcs_lock:
+            if _gcs_bucket is None:
+                client = _get_gcs_client()
+                bucket = client.bucket(GCP_CONFIG['GCS_BUCKET'])
+
+                # Create bucket if not exists
+                if not bucket.exists():
+                    bucket = client.create_bucket(
+                        GCP_CONFIG['GCS_BUCKET'],
+                        location='asia-southeast1'
+                    )
+                _gcs_bucket = bucket
+    return _gcs_bucket
+
+
+def _get_gcs_uploader():
+    """Get the process-wide background GCS uploader"""
+    global _gcs_uploader
+    if _gcs_uploader is None:
+        with _gcs_lock:
+            if _gcs_uploader is None:
+                _gcs_uploader = GcsUploader(_get_gcs_bucket)
+    return _gcs_uploader
+
+
+def _get_bq_writer():
+    """Get the process-wide batched BigQuery writer"""
+    global _bq_writer
+    if _bq_writer is None:
+        with _gcs_lock:
+            if _bq_writer is None:
+                _bq_writer = BigQueryBatchWriter(_get_bq_client, on_loaded=_on_bq_loaded,
+                                                 on_dropped=_on_bq_dropped)
+                # Buffered rows would otherwise be lost at exit
+                atexit.register(_bq_writer.close)
+    return _bq_writer
+
+
 def _get_bq_client():
     """Get or create BigQuery client (lazy loading)"""
     global _bq_client
@@ -87,77 +151,214 @@ def ensure_directory(path):
     Path(path).mkdir(parents=True, exist_ok=True)
 
 
-def _save_local(data, source, chain, address, endpoint_name, timestamp, user_id=None):
-    """Save to local filesystem"""
+def _json_default(obj):
+    """json.dumps fallback: decode RawPayloads nested inside other objects"""
+    if isinstance(obj, RawPayload):
+        return obj.data
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _to_bytes(data, indent=None):
+    """Bytes to store: a RawPayload's body as-is, anything else JSON-encoded"""
+    if isinstance(data, RawPayload):
+        return data.content
+    return json.dumps(data, indent=indent, default=_json_default).encode('utf-8')
+
+
+def _content_hash(data):
+    """
+    sha256 of the payload's canonical JSON (sorted keys, compact separators): the same
+    content hashes alike as a RawPayload or a decoded dict, whatever its key order.
+    A raw body that is not JSON hashes as its bytes.
+    """
+    if isinstance(data, RawPayload):
+        try:
+            data = data.data
+        except ValueError:
+            return hashlib.sha256(data.content).hexdigest()
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), default=_json_default)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class _PayloadHash:
+    """
+    Dedupe hashes of one payload. A RawPayload is matched on its raw bytes first;
+    the canonical content hash (a full decode and re-encode) is only computed
+    when the raw hash differs or a new body is recorded.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.raw = hashlib.sha256(data.content).hexdigest() if isinstance(data, RawPayload) else None
+        self._content = None
+
+    @property
+    def content(self):
+        if self._content is None:
+            self._content = _content_hash(self.data)
+        return self._content
+
+    def matches(self, row):
+        """Whether a catalog row holds this payload (same raw bytes, else same canonical JSON)"""
+        if self.raw is not None and row['raw_hash'] == self.raw and row['content_hash']:
+            self._content = row['content_hash']
+            return True
+        return row['content_hash'] == self.content
+
+
+def _encode(data, codec, indent=None):
+    """Stored bytes: JSON (pretty-printed only when uncompressed), compressed with codec"""
+    if codec != 'none':
+        indent = None
+    return compress(_to_bytes(data, indent), codec)
+
+
+# {endpoint}_{YYYYmmdd_HHMMSS}.json[.gz|.zst]
+SNAPSHOT_RE = re.compile(r'_\d{8}_\d{6}\.json(\.gz|\.zst)?$')
+
+
+def _snapshot_timestamp(name):
+    """Catalog timestamp of a snapshot file/blob name ('YYYY-mm-ddTHH:MM:SS')"""
+    match = SNAPSHOT_RE.search(name)
+    return to_catalog_timestamp(name[match.start() + 1:match.start() + 16])
+
+
+def _is_snapshot(name, endpoint_name):
+    """Whether a file/blob name is a snapshot of exactly this endpoint (not e.g. global_defi for global)"""
+    prefix = f"{endpoint_name}_"
+    return name.startswith(prefix) and SNAPSHOT_RE.fullmatch(name[len(endpoint_name):]) is not None
+
+
+# Per-directory latest pointers: {dir}/.latest/{endpoint_name} holds the newest snapshot's filename
+LATEST_DIR = '.latest'
+
+
+def _local_directory(source, chain, address, user_id=None):
     if user_id:
-        directory = Path(DATA_DIR) / source / chain / address / user_id
-    else:
-        directory = Path(DATA_DIR) / source / chain / address
+        return Path(DATA_DIR) / source / chain / address / user_id
+    return Path(DATA_DIR) / source / chain / address
+
+
+_pointer_lock = threading.Lock()
+
+
+def _write_latest_pointer(directory, endpoint_name, filename):
+    """
+    Atomically point {directory}/.latest/{endpoint_name} at filename, unless it
+    names a newer snapshot that still exists (write queue workers can finish an
+    older snapshot last). An endpoint's snapshot filenames sort by timestamp.
+    """
+    pointer_dir = directory / LATEST_DIR
+    pointer = pointer_dir / endpoint_name
+    with _pointer_lock:
+        try:
+            current = pointer.read_text().strip()
+        except OSError:
+            current = ''
+        if current > filename and (directory / current).is_file():
+            return
+        ensure_directory(pointer_dir)
+        tmp = pointer_dir / f".{endpoint_name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        tmp.write_text(filename)
+        os.replace(tmp, pointer)
+
+
+def _latest_local_file(directory, endpoint_name):
+    """Newest snapshot file via the latest pointer; directory scan (and pointer repair) as fallback"""
+    try:
+        target = directory / (directory / LATEST_DIR / endpoint_name).read_text().strip()
+        if target.is_file():
+            return target
+    except OSError:
+        pass
+
+    files = [f for f in directory.glob(f"{endpoint_name}_*.json*") if _is_snapshot(f.name, endpoint_name)]
+    if not files:
+        return None
+    latest_file = max(files, key=lambda f: f.name)
+    try:
+        _write_latest_pointer(directory, endpoint_name, latest_file.name)
+    except OSError as e:
+        logger.warning(f"Latest pointer repair failed: {e}")
+    return latest_file
+
+
+def _save_local(data, source, chain, address, endpoint_name, timestamp, user_id=None, body=None):
+    """Save to local filesystem (body: bytes already encoded by save_json, if any)"""
+    directory = _local_directory(source, chain, address, user_id)
     ensure_directory(directory)
 
-    filename = f"{endpoint_name}_{timestamp}.json"
+    codec = resolve_codec(STORAGE_COMPRESSION)
+    filename = f"{endpoint_name}_{timestamp}{extension(codec)}"
     filepath = directory / filename
 
-    with open(filepath, 'w') as f:
-        json.dump(data, f, indent=4)
+    with open(filepath, 'wb') as f:
+        f.write(body if body is not None else _encode(data, codec, indent=4))
+    # Pointer moves only after the snapshot is fully written
+    _write_latest_pointer(directory, endpoint_name, filename)
 
     return str(filepath)
 
 
-def _save_gcs(data, source, chain, address, endpoint_name, timestamp, user_id=None):
-    """Save to Google Cloud Storage"""
-    try:
-        client = _get_gcs_client()
-        bucket = client.bucket(GCP_CONFIG['GCS_BUCKET'])
-
-        # Create bucket if not exists
-        if not bucket.exists():
-            bucket = client.create_bucket(
-                GCP_CONFIG['GCS_BUCKET'],
-                location='asia-southeast1'
-            )
+# GCS latest pointers: {prefix}_latest/{endpoint_name} holds the newest snapshot's blob name
+GCS_LATEST_DIR = '_latest'
 
-        # Path: {source}/{chain}/{address}/{user_id}/{endpoint_name}_{timestamp}.json
-        if user_id:
-            blob_path = f"{source}/{chain}/{address}/{user_id}/{endpoint_name}_{timestamp}.json"
-        else:
-            blob_path = f"{source}/{chain}/{address}/{endpoint_name}_{timestamp}.json"
-        blob = bucket.blob(blob_path)
 
-        blob.upload_from_string(
-            json.dumps(data, indent=2),
-            content_type='application/json'
+def _gcs_prefix(source, chain, address, user_id=None):
+    """Blob name prefix of a token's snapshots: {source}/{chain}/{address}[/{user_id}]/"""
+    if user_id:
+        return f"{source}/{chain}/{address}/{user_id}/"
+    return f"{source}/{chain}/{address}/"
+
+
+def _save_gcs(data, source, chain, address, endpoint_name, timestamp, user_id=None, body=None):
+    """
+    Queue an upload to Google Cloud Storage and return its gs:// URI.
+    The upload runs on the background uploader; flush_storage() waits for it.
+    body: bytes already encoded by save_json, if any
+    """
+    try:
+        bucket = _get_gcs_bucket()
+
+        # Path: {source}/{chain}/{address}/{user_id}/{endpoint_name}_{timestamp}.json[.gz|.zst]
+        codec = resolve_codec(STORAGE_COMPRESSION)
+        filename = f"{endpoint_name}_{timestamp}{extension(codec)}"
+        prefix = _gcs_prefix(source, chain, address, user_id)
+        blob_path = f"{prefix}{filename}"
+        uri = f"gs://{bucket.name}/{blob_path}"
+
+        _get_gcs_uploader().submit(
+            uri, blob_path,
+            body if body is not None else _encode(data, codec, indent=2),
+            content_encoding=content_encoding(codec),
+            content_type='application/json',
+            pointer_path=f"{prefix}{GCS_LATEST_DIR}/{endpoint_name}"
         )
 
-        return f"gs://{GCP_CONFIG['GCS_BUCKET']}/{blob_path}"
+        return uri
     except Exception as e:
         logger.error(f"GCS save error: {e}")
         return {'error': str(e)}
 
 
-def _save_bigquery(data, source, chain, address, endpoint_name, timestamp, user_id=None):
-    """Save to BigQuery - Dataset per user: token_tracker_{user_id}"""
-    try:
-        client = _get_bq_client()
-        project_id = GCP_CONFIG['PROJECT_ID']
+def _bq_table_ref(source, endpoint_name, user_id=None):
+    """Snapshot table: {project}.token_tracker_{user_id}.{source}_{endpoint_name} (sanitized)"""
+    user_suffix = (user_id or 'unknown').lower().replace(' ', '_')
+    dataset_id = f"{GCP_CONFIG['BIGQUERY_DATASET']}_{user_suffix}"
+    table_name = f"{source}_{endpoint_name}".replace('-', '_').lower()
+    return f"{GCP_CONFIG['PROJECT_ID']}.{dataset_id}.{table_name}"
 
-        # Dataset name includes user_id: token_tracker_andrew, token_tracker_minh, etc.
-        user_suffix = (user_id or 'unknown').lower().replace(' ', '_')
-        dataset_id = f"{GCP_CONFIG['BIGQUERY_DATASET']}_{user_suffix}"
 
-        # Create dataset if not exists
-        dataset_ref = f"{project_id}.{dataset_id}"
-        try:
-            client.get_dataset(dataset_ref)
-        except Exception:
-            from google.cloud import bigquery
-            dataset = bigquery.Dataset(dataset_ref)
-            dataset.location = 'asia-southeast1'
-            client.create_dataset(dataset, exists_ok=True)
-
-        # Table name: {source}_{endpoint_name} (sanitized)
-        table_name = f"{source}_{endpoint_name}".replace('-', '_').lower()
-        table_ref = f"{dataset_ref}.{table_name}"
+def _save_bigquery(data, source, chain, address, endpoint_name, timestamp, user_id=None, snapshot_id=None,
+                   batch=None):
+    """
+    Buffer a snapshot row for BigQuery - Dataset per user: token_tracker_{user_id}
+    Rows are written by one load job per table in flush_storage(); the catalog
+    row (snapshot_id) gets its bq_table only once that load succeeded.
+    batch: WriteBatch the row is reported in
+    """
+    try:
+        table_ref = _bq_table_ref(source, endpoint_name, user_id)
 
         # Prepare row data (no user_id column needed - it's in dataset name)
         row = {
@@ -166,61 +367,136 @@ def _save_bigquery(data, source, chain, address, endpoint_name, timestamp, user_
             'address': address,
             'timestamp': datetime.strptime(timestamp, "%Y%m%d_%H%M%S").isoformat(),
             'fetched_at': datetime.now().isoformat(),
-            'raw_data': json.dumps(data),
+            'raw_data': data.text if isinstance(data, RawPayload) else json.dumps(data, default=_json_default),
         }
 
-        # Create table if not exists
-        from google.cloud import bigquery
-        schema = [
-            bigquery.SchemaField('id', 'STRING', mode='REQUIRED'),
-            bigquery.SchemaField('chain', 'STRING'),
-            bigquery.SchemaField('address', 'STRING'),
-            bigquery.SchemaField('timestamp', 'TIMESTAMP'),
-            bigquery.SchemaField('fetched_at', 'TIMESTAMP'),
-            bigquery.SchemaField('raw_data', 'STRING'),
-        ]
-
-        try:
-            client.get_table(table_ref)
-        except Exception:
-            table = bigquery.Table(table_ref, schema=schema)
-            client.create_table(table, exists_ok=True)
-
-        # Insert row
-        errors = client.insert_rows_json(table_ref, [row])
-        if errors:
-            logger.error(f"BigQuery insert errors: {errors}")
-            return {'error': str(errors)}
-
+        future = _get_bq_writer().add(table_ref, row, key=snapshot_id)
+        if batch is not None:
+            batch.add_row(table_ref, future)
         return table_ref
     except Exception as e:
         logger.error(f"BigQuery save error: {e}")
         return {'error': str(e)}
 
 
-def _infer_bq_type(value):
-    """Infer BigQuery type from Python value"""
-    if value is None:
-        return 'STRING'
-    elif isinstance(value, bool):
-        return 'BOOLEAN'
-    elif isinstance(value, int):
+# Dune NDJSON load buffers stay in memory up to this size, then spill to a temp file
+DUNE_SPOOL_MAX_BYTES = 64 * 1024 * 1024
+
+
+# pandas.api.types.infer_dtype result -> BigQuery type ('empty' = all null, decided by other chunks)
+_BQ_TYPES = {
+    'boolean': 'BOOLEAN',
+    'integer': 'INTEGER',
+    'floating': 'FLOAT',
+    'mixed-integer-float': 'FLOAT',
+    'decimal': 'FLOAT',
+    'empty': None,
+}
+
+
+# Integer ranges: INT64, then NUMERIC (29 integer digits); wider integers are stored as STRING
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+NUMERIC_MAX = 10 ** 29 - 1
+
+# Widening of the types seen in different chunks (anything else -> STRING)
+_BQ_WIDENING = {
+    frozenset({'INTEGER', 'FLOAT'}): 'FLOAT',
+    frozenset({'INTEGER', 'NUMERIC'}): 'NUMERIC',
+    frozenset({'NUMERIC', 'FLOAT'}): 'FLOAT',
+}
+
+
+def _merge_bq_type(current, new):
+    """Widen a column type seen in one chunk with the type seen in another"""
+    if current is None or current == new:
+        return new
+    if new is None:
+        return current
+    return _BQ_WIDENING.get(frozenset({current, new}), 'STRING')
+
+
+def _integer_bq_type(values):
+    """INTEGER if the (non-null, all int) values fit INT64, else NUMERIC or STRING"""
+    values = values.dropna()
+    low, high = values.min(), values.max()
+    if INT64_MIN <= low and high <= INT64_MAX:
         return 'INTEGER'
-    elif isinstance(value, float):
-        return 'FLOAT'
-    else:
-        return 'STRING'
+    if -NUMERIC_MAX <= low and high <= NUMERIC_MAX:
+        return 'NUMERIC'
+    return 'STRING'
 
 
-def save_dune_to_bigquery(rows_data, export_name, user_id=None):
+def _safe_column(col_name):
+    return str(col_name).replace(' ', '_').replace('-', '_').lower()
+
+
+def _dune_chunks(rows_data, chunk_rows):
+    """Object-dtype DataFrames of chunk_rows rows with sanitized column names"""
+    import pandas as pd
+    for i in range(0, len(rows_data), chunk_rows):
+        df = pd.DataFrame(rows_data[i:i + chunk_rows], dtype=object)
+        df.columns = [_safe_column(c) for c in df.columns]
+        yield i, df
+
+
+def _infer_bq_schema(rows_data, chunk_rows, progress=None):
+    """
+    Infer column types over all rows, vectorised per chunk.
+
+    Returns:
+        {column: BigQuery type} in first-seen column order
+    """
+    import pandas as pd
+    types = {}
+    for i, df in _dune_chunks(rows_data, chunk_rows):
+        for col in df.columns:
+            bq_type = _BQ_TYPES.get(pd.api.types.infer_dtype(df[col], skipna=True), 'STRING')
+            if bq_type == 'INTEGER':
+                bq_type = _integer_bq_type(df[col])
+            types[col] = _merge_bq_type(types.get(col), bq_type)
+        if progress:
+            progress('schema', i + len(df), len(rows_data))
+    return {col: bq_type or 'STRING' for col, bq_type in types.items()}
+
+
+def _write_dune_ndjson(rows_data, types, ingested_at, out, chunk_rows, progress=None):
+    """
+    Serialize rows as newline-delimited JSON matching the inferred types, one chunk at a time.
+    Records go through json.dumps so floats keep full precision (shortest round-trip repr).
+    """
+    import numpy as np
+    casts = {'INTEGER': 'Int64', 'FLOAT': 'float64', 'BOOLEAN': 'boolean'}
+    for i, df in _dune_chunks(rows_data, chunk_rows):
+        df = df.reindex(columns=list(types))
+        for col, bq_type in types.items():
+            if bq_type == 'FLOAT':
+                # NaN / inf are not valid JSON numbers: load them as NULL
+                df[col] = df[col].astype('float64').replace([np.inf, -np.inf], np.nan)
+            elif bq_type in casts:
+                df[col] = df[col].astype(casts[bq_type])
+            else:
+                # NUMERIC loads from its decimal string; nested values (dicts, lists)
+                # and mixed-type columns are stored as strings
+                df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+        records = df.astype(object).where(df.notna(), None).to_dict('records')
+        lines = [json.dumps({'_ingested_at': ingested_at, **record}) for record in records]
+        out.write(('\n'.join(lines) + '\n').encode('utf-8'))
+        if progress:
+            progress('serialize', i + len(df), len(rows_data))
+
+
+def save_dune_to_bigquery(rows_data, export_name, user_id=None, progress=None):
     """
     Save Dune query results to BigQuery as proper table with columns.
-    Each row of data becomes a separate BigQuery row.
+    Each row of data becomes a separate BigQuery row. Rows are serialized to an
+    NDJSON buffer (spilled to disk when large) and written by one WRITE_TRUNCATE
+    load job, which replaces the table and its schema atomically.
 
     Args:
         rows_data: List of dicts from Dune query results
         export_name: Name for the table
         user_id: User identifier for dataset naming
+        progress: Optional callback(stage, done, total); stage is 'schema', 'serialize' or 'load'
 
     Returns:
         table_ref or {'error': message}
@@ -237,72 +513,41 @@ def save_dune_to_bigquery(rows_data, export_name, user_id=None):
         # Dataset: token_tracker_{user_id}
         user_suffix = (user_id or 'unknown').lower().replace(' ', '_')
         dataset_id = f"{GCP_CONFIG['BIGQUERY_DATASET']}_{user_suffix}"
-
-        # Create dataset if not exists
         dataset_ref = f"{project_id}.{dataset_id}"
-        try:
-            client.get_dataset(dataset_ref)
-        except Exception:
-            dataset = bigquery.Dataset(dataset_ref)
-            dataset.location = 'asia-southeast1'
-            client.create_dataset(dataset, exists_ok=True)
+        _get_bq_writer().ensure_dataset(dataset_ref)
 
         # Table name from export_name (sanitized)
         table_name = f"dune_{export_name}".replace('-', '_').replace(' ', '_').lower()
         table_ref = f"{dataset_ref}.{table_name}"
 
-        # Infer schema from first row
-        first_row = rows_data[0]
-        schema = []
-        for col_name, value in first_row.items():
-            bq_type = _infer_bq_type(value)
-            # Sanitize column name
-            safe_col = col_name.replace(' ', '_').replace('-', '_').lower()
-            schema.append(bigquery.SchemaField(safe_col, bq_type, mode='NULLABLE'))
-
-        # Add metadata columns
-        schema.insert(0, bigquery.SchemaField('_ingested_at', 'TIMESTAMP', mode='NULLABLE'))
+        # Schema from all rows, plus metadata column
+        types = _infer_bq_schema(rows_data, DUNE_LOAD_CHUNK_ROWS, progress)
+        schema = [bigquery.SchemaField('_ingested_at', 'TIMESTAMP', mode='NULLABLE')]
+        schema += [bigquery.SchemaField(col, bq_type, mode='NULLABLE') for col, bq_type in types.items()]
 
-        # Create or replace table
-        table = bigquery.Table(table_ref, schema=schema)
-
-        # Delete existing table if exists, then create new
-        try:
-            client.delete_table(table_ref)
-            logger.info(f"Deleted existing table: {table_ref}")
-        except Exception:
-            pass  # Table doesn't exist
+        ingested_at = datetime.now().isoformat()
+        with tempfile.SpooledTemporaryFile(max_size=DUNE_SPOOL_MAX_BYTES) as buffer:
+            _write_dune_ndjson(rows_data, types, ingested_at, buffer, DUNE_LOAD_CHUNK_ROWS, progress)
+            size = buffer.tell()
+            buffer.seek(0)
+
+            if progress:
+                progress('load', 0, len(rows_data))
+            job_config = bigquery.LoadJobConfig(
+                schema=schema,
+                source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+                write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+            )
+            job = client.load_table_from_file(buffer, table_ref, job_config=job_config, size=size)
+            job.result()
 
-        client.create_table(table)
-        logger.info(f"Created table: {table_ref}")
+        if job.errors:
+            logger.error(f"BigQuery load errors: {job.errors[:5]}")  # Log first 5 errors
+            return {'error': f'{len(job.errors)} load errors'}
+        if progress:
+            progress('load', len(rows_data), len(rows_data))
 
-        # Prepare rows with sanitized column names
-        ingested_at = datetime.now().isoformat()
-        prepared_rows = []
-        for row in rows_data:
-            prepared_row = {'_ingested_at': ingested_at}
-            for col_name, value in row.items():
-                safe_col = col_name.replace(' ', '_').replace('-', '_').lower()
-                # Convert value to string if it's not a basic type
-                if value is not None and not isinstance(value, (bool, int, float, str)):
-                    value = str(value)
-                prepared_row[safe_col] = value
-            prepared_rows.append(prepared_row)
-
-        # Insert rows in batches of 500
-        batch_size = 500
-        total_errors = []
-        for i in range(0, len(prepared_rows), batch_size):
-            batch = prepared_rows[i:i + batch_size]
-            errors = client.insert_rows_json(table_ref, batch)
-            if errors:
-                total_errors.extend(errors)
-
-        if total_errors:
-            logger.error(f"BigQuery insert errors: {total_errors[:5]}")  # Log first 5 errors
-            return {'error': f'{len(total_errors)} rows failed to insert'}
-
-        logger.info(f"Inserted {len(prepared_rows)} rows to {table_ref}")
+        logger.info(f"Loaded {len(rows_data)} rows ({size / 1e6:.1f} MB NDJSON) to {table_ref}")
         return table_ref
 
     except Exception as e:
@@ -310,9 +555,11 @@ def save_dune_to_bigquery(rows_data, export_name, user_id=None):
         return {'error': str(e)}
 
 
-def save_json(data, source, chain, address, endpoint_name, user_id=None):
+def save_json(data, source, chain, address, endpoint_name, user_id=None, timestamp=None, batch=None,
+              shared=False):
     """
     Save raw API response based on STORAGE_MODE
+    RawPayload bodies are written as received (no decode/re-encode).
 
     Modes:
     - 'local': Save to local filesystem only
@@ -320,110 +567,404 @@ def save_json(data, source, chain, address, endpoint_name, user_id=None):
     - 'bigquery': Save to BigQuery only
     - 'all': Save to all destinations
 
+    A payload identical to the endpoint's latest snapshot (same raw bytes, or
+    same sha256 of its canonical JSON, see _PayloadHash) is not written again:
+    the catalog records an "unchanged at timestamp" reference (STORAGE_DEDUPE).
+
     Args:
         user_id: Optional user identifier for multi-user support
+        timestamp: Snapshot time 'YYYYmmdd_HHMMSS' (default: now; set by the write queue)
+        batch: WriteBatch that tracks the background GCS upload and BigQuery row (flush_storage)
+        shared: Token-independent payload (shared response cache): an identical body
+            stored for any token or user of the endpoint is referenced
 
     Returns: dict with paths/status for each destination
     """
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
     results = {}
 
     mode = STORAGE_MODE.lower()
 
+    payload_hash = _PayloadHash(data)
+
+    # Same payload as the latest snapshot: reference it instead of storing another copy
+    if STORAGE_DEDUPE:
+        body_row = _unchanged_snapshot(source, chain, address, endpoint_name, user_id, payload_hash, mode,
+                                       shared)
+        if body_row is not None:
+            unchanged = _record_unchanged(body_row, source, chain, address, endpoint_name, timestamp,
+                                          user_id, payload_hash, mode, shared)
+            if unchanged is not None:
+                results, snapshot_id = unchanged
+                if shared and mode in ('bigquery', 'all'):
+                    # BigQuery rows are per token, in a dataset per user: write this token's row
+                    results['bigquery'] = _save_bigquery(data, source, chain, address, endpoint_name, timestamp,
+                                                         user_id, snapshot_id, batch)
+                return results
+
+    # Snapshots are identical for local and GCS: encode once (pretty-printed only when uncompressed)
+    codec = resolve_codec(STORAGE_COMPRESSION)
+    body = _encode(data, codec, indent=4) if mode in ('local', 'gcs', 'all') else None
+
     # Always save locally (for immediate access)
     if mode in ('local', 'all'):
-        results['local'] = _save_local(data, source, chain, address, endpoint_name, timestamp, user_id)
+        results['local'] = _save_local(data, source, chain, address, endpoint_name, timestamp, user_id, body)
 
     # Save to GCS
     if mode in ('gcs', 'all'):
-        results['gcs'] = _save_gcs(data, source, chain, address, endpoint_name, timestamp, user_id)
-
-    # Save to BigQuery
-    if mode in ('bigquery', 'all'):
-        results['bigquery'] = _save_bigquery(data, source, chain, address, endpoint_name, timestamp, user_id)
+        results['gcs'] = _save_gcs(data, source, chain, address, endpoint_name, timestamp, user_id, body)
+
+    to_bigquery = mode in ('bigquery', 'all')
+    snapshot_id = _record_snapshot(results, source, chain, address, endpoint_name, timestamp, user_id,
+                                   size=len(body if body is not None else _to_bytes(data)),
+                                   payload_hash=payload_hash, pending=to_bigquery)
+
+    # Save to BigQuery (buffered; the catalog location is set once the load succeeds)
+    if to_bigquery:
+        results['bigquery'] = _save_bigquery(data, source, chain, address, endpoint_name, timestamp,
+                                             user_id, snapshot_id, batch)
+
+    # Background GCS upload: drop the catalog location again if it fails
+    if isinstance(results.get('gcs'), str):
+        future = _get_gcs_uploader().future(results['gcs'])
+        if future is not None:
+            future.add_done_callback(lambda f, uri=results['gcs']: _on_gcs_upload_done(f, uri))
+            if batch is not None:
+                batch.add_upload(results['gcs'], future)
 
     # Return all results dict instead of single path
     return results
 
 
+# Catalog location column per STORAGE_MODE destination
+LOCATION_COLUMNS = {'local': 'local_path', 'gcs': 'gcs_uri', 'bigquery': 'bq_table'}
+
+
+def _mode_destinations(mode):
+    return [dest for dest in LOCATION_COLUMNS if mode in (dest, 'all')]
+
+
+def _unchanged_snapshot(source, chain, address, endpoint_name, user_id, payload_hash, mode, shared=False):
+    """
+    Latest catalog row if it holds the same payload (_PayloadHash) and is stored
+    in every destination of the current mode (None: write a new snapshot).
+    shared: the newest body with that payload stored for any token or user of the endpoint.
+        Its BigQuery row belongs to another token's table, so only local and GCS count.
+    """
+    destinations = _mode_destinations(mode)
+    if shared:
+        destinations = [dest for dest in destinations if dest != 'bigquery']
+        if not destinations:
+            return None
+    try:
+        catalog = get_catalog()
+        if shared:
+            row = None
+            if payload_hash.raw is not None:
+                row = catalog.latest_body(source, endpoint_name, raw_hash=payload_hash.raw)
+            if row is None:
+                row = catalog.latest_body(source, endpoint_name, content_hash=payload_hash.content)
+        else:
+            row = catalog.latest(source, chain, address, endpoint_name, user_id)
+    except Exception as e:
+        logger.error(f"Catalog lookup error: {e}")
+        return None
+    if row is None or not payload_hash.matches(row):
+        return None
+    for dest in destinations:
+        if not row[LOCATION_COLUMNS[dest]]:
+            return None
+    if row['gcs_uri'] and _gcs_uploader is not None:
+        # Upload still running or failed (its location is cleared on failure): not durable yet
+        future = _gcs_uploader.future(row['gcs_uri'])
+        if future is not None and (not future.done() or future.exception() is not None):
+            return None
+    if row['local_path'] and mode in ('local', 'all') and not os.path.exists(split_location(row['local_path'])[0]):
+        return None
+    return row
+
+
+def _record_unchanged(body_row, source, chain, address, endpoint_name, timestamp, user_id, payload_hash, mode,
+                      shared=False):
+    """
+    Catalog an "unchanged at timestamp" reference to the row holding the body
+    and return (results, reference row id); None if that body was dropped or
+    moved by retention meanwhile: write a new snapshot.
+    shared: the body may be another token's, so its BigQuery table is not referenced
+    """
+    ref_id = body_row['ref_id'] or body_row['id']
+    destinations = [dest for dest in _mode_destinations(mode) if not (shared and dest == 'bigquery')]
+    results = {dest: body_row[LOCATION_COLUMNS[dest]] for dest in destinations}
+    try:
+        recorded = get_catalog().record(source, chain, address, endpoint_name, timestamp, user_id,
+                                        size=0, content_hash=payload_hash.content, raw_hash=payload_hash.raw,
+                                        local_path=body_row['local_path'], gcs_uri=body_row['gcs_uri'],
+                                        bq_table=None if shared else body_row['bq_table'], ref_id=ref_id)
+    except Exception as e:
+        logger.error(f"Catalog record error: {e}")
+        results['unchanged'] = ref_id
+        return results, None
+    if recorded is None:
+        return None
+    results['unchanged'] = ref_id
+    return results, recorded
+
+
+def _on_gcs_upload_done(future, uri):
+    if future.exception() is None:
+        return
+    logger.error(f"GCS save error: {uri}: {future.exception()}")
+    try:
+        get_catalog().clear_location('gcs_uri', uri)
+    except Exception as e:
+        logger.error(f"Catalog update error: {e}")
+
+
+def flush_storage(timeout=None, batch=None):
+    """
+    Wait for background writes: GCS uploads, then buffered BigQuery rows (one load job per table).
+
+    Args:
+        batch: Only wait for and report this WriteBatch's uploads and rows (default: everything pending)
+
+    Returns:
+        {'gcs': {uri: uri | {'error': message}},
+         'bigquery': {table_ref: rows loaded | {'error': message}}}
+    """
+    results = {'gcs': {}, 'bigquery': {}}
+    if _gcs_uploader is not None:
+        results['gcs'] = _gcs_uploader.flush(timeout, uploads=batch.uploads if batch is not None else None)
+    if _bq_writer is not None:
+        results['bigquery'] = _bq_writer.flush() if batch is None else _bq_writer.flush_rows(batch.rows)
+    return results
+
+
+def _record_snapshot(results, source, chain, address, endpoint_name, timestamp, user_id, size, payload_hash,
+                     pending=False):
+    """
+    Add the saved snapshot's locations to the catalog (failed destinations are left empty)
+    and return its id. pending: a BigQuery row follows, so record even without locations.
+    """
+    locations = {dest: loc for dest, loc in results.items() if isinstance(loc, str)}
+    if not locations and not pending:
+        return None
+    try:
+        return get_catalog().record(source, chain, address, endpoint_name, timestamp, user_id,
+                                    size=size, content_hash=payload_hash.content, raw_hash=payload_hash.raw,
+                                    local_path=locations.get('local'), gcs_uri=locations.get('gcs'))
+    except Exception as e:
+        logger.error(f"Catalog record error: {e}")
+        return None
+
+
+def _on_bq_loaded(table_ref, snapshot_ids):
+    """BigQuery rows are durable: record the table as their catalog location"""
+    get_catalog().set_location('bq_table', table_ref, snapshot_ids)
+
+
+def _on_bq_dropped(table_ref, snapshot_ids):
+    """BigQuery rows given up after failed loads: they never get bq_table; drop rows stored nowhere"""
+    get_catalog().discard_unstored(snapshot_ids)
+
+
+def _read_local_location(location):
+    """Stored bytes at a catalog local_path (snapshot file or archive segment member)"""
+    path, member = split_location(location)
+    if member is not None:
+        return read_member(path, member)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
 def _load_local(source, chain, address, endpoint_name, user_id=None):
-    """Load from local filesystem"""
-    if user_id:
-        directory = Path(DATA_DIR) / source / chain / address / user_id
-    else:
-        directory = Path(DATA_DIR) / source / chain / address
-    if not directory.exists():
+    """
+    Load from local filesystem: O(1) via the latest pointer, unless the catalog
+    has a newer row (a shared cache reference to another token's body, which
+    does not move this directory's pointer) or no loose snapshot is left
+    (compacted by retention)
+    """
+    directory = _local_directory(source, chain, address, user_id)
+    latest_file = _latest_local_file(directory, endpoint_name) if directory.exists() else None
+    try:
+        row = get_catalog().latest(source, chain, address, endpoint_name, user_id, location='local_path')
+    except Exception as e:
+        logger.warning(f"Catalog lookup error: {e}")
+        row = None
+    if row is not None and (latest_file is None or row['timestamp'] > _snapshot_timestamp(latest_file.name)):
+        try:
+            return json.loads(decompress(_read_local_location(row['local_path'])))
+        except (OSError, KeyError, zipfile.BadZipFile) as e:
+            logger.warning(f"Catalog snapshot load error: {e}")
+    if latest_file is None:
         return None
+    with open(latest_file, 'rb') as f:
+        return json.loads(decompress(f.read()))
 
-    files = list(directory.glob(f"{endpoint_name}_*.json"))
-    if not files:
+
+def _download_gcs_json(bucket, blob_name):
+    """Download and decode a snapshot blob or archive member (None if it does not exist)"""
+    from google.api_core.exceptions import NotFound
+    blob_name, member = split_location(blob_name)
+    try:
+        # raw_download: get the stored (possibly compressed) bytes, decompress ourselves
+        content = bucket.blob(blob_name).download_as_bytes(raw_download=True)
+        if member is not None:
+            content = read_member(content, member)
+    except (NotFound, KeyError):
         return None
+    return json.loads(decompress(content))
 
-    latest_file = sorted(files)[-1]
-    with open(latest_file, 'r') as f:
-        return json.load(f)
+
+def _latest_gcs_blob_name(bucket, source, chain, address, endpoint_name, user_id=None):
+    """
+    Newest snapshot blob name without listing history:
+    catalog row first, then the _latest pointer object (written by other processes too)
+    """
+    from google.api_core.exceptions import NotFound
+    try:
+        row = get_catalog().latest(source, chain, address, endpoint_name, user_id, location='gcs_uri')
+    except Exception as e:
+        logger.warning(f"Catalog lookup error: {e}")
+        row = None
+    bucket_prefix = f"gs://{bucket.name}/"
+    if row and row['gcs_uri'].startswith(bucket_prefix):
+        yield row['gcs_uri'][len(bucket_prefix):]
+
+    pointer = f"{_gcs_prefix(source, chain, address, user_id)}{GCS_LATEST_DIR}/{endpoint_name}"
+    try:
+        yield bucket.blob(pointer).download_as_bytes().decode('utf-8').strip()
+    except NotFound:
+        return
 
 
 def _load_gcs(source, chain, address, endpoint_name, user_id=None):
-    """Load latest from GCS"""
+    """Load latest from GCS: O(1) via catalog / latest pointer, prefix scan as fallback"""
     try:
-        client = _get_gcs_client()
-        bucket = client.bucket(GCP_CONFIG['GCS_BUCKET'])
+        bucket = _get_gcs_bucket()
 
-        if user_id:
-            prefix = f"{source}/{chain}/{address}/{user_id}/{endpoint_name}_"
-        else:
-            prefix = f"{source}/{chain}/{address}/{endpoint_name}_"
-        blobs = list(bucket.list_blobs(prefix=prefix))
+        for blob_name in _latest_gcs_blob_name(bucket, source, chain, address, endpoint_name, user_id):
+            data = _download_gcs_json(bucket, blob_name)
+            if data is not None:
+                return data
+
+        # Fallback: list the endpoint's full history (pointer blobs don't match the prefix)
+        prefix = f"{_gcs_prefix(source, chain, address, user_id)}{endpoint_name}_"
+        blobs = [b for b in bucket.list_blobs(prefix=prefix)
+                 if _is_snapshot(b.name.rsplit('/', 1)[-1], endpoint_name)]
 
         if not blobs:
             return None
 
         # Sort by name (timestamp) and get latest
-        latest_blob = sorted(blobs, key=lambda b: b.name)[-1]
-        content = latest_blob.download_as_string()
-        return json.loads(content)
+        latest_blob = max(blobs, key=lambda b: b.name)
+        content = latest_blob.download_as_bytes(raw_download=True)
+        return json.loads(decompress(content))
     except Exception as e:
         print(f"GCS load error: {e}")
         return None
 
 
+def _bq_read_key(table, chain, address):
+    """
+    Memo key of a latest-row read. The table's last-modified time changes with
+    every load into any partition (including the current day's, which leaves
+    the max partition id unchanged), so it stands in for the max partition.
+    """
+    return (f"{table.project}.{table.dataset_id}.{table.table_id}", chain, address, table.modified)
+
+
 def _load_bigquery(source, chain, address, endpoint_name, user_id=None):
-    """Load latest from BigQuery - Dataset per user: token_tracker_{user_id}"""
+    """
+    Load latest from BigQuery - Dataset per user: token_tracker_{user_id}
+    Memoised per (table, chain, address, table version): repeated previews only
+    fetch table metadata, no query job. The catalog's newest timestamp limits
+    the query to one partition when known.
+    """
     try:
         client = _get_bq_client()
-        project_id = GCP_CONFIG['PROJECT_ID']
-
-        # Dataset name includes user_id
-        user_suffix = (user_id or 'unknown').lower().replace(' ', '_')
-        dataset_id = f"{GCP_CONFIG['BIGQUERY_DATASET']}_{user_suffix}"
-        table_name = f"{source}_{endpoint_name}".replace('-', '_').lower()
-
-        query = f"""
-        SELECT raw_data
-        FROM `{project_id}.{dataset_id}.{table_name}`
-        WHERE chain = @chain AND address = @address
-        ORDER BY timestamp DESC
-        LIMIT 1
-        """
+        table = client.get_table(_bq_table_ref(source, endpoint_name, user_id))
+        key = _bq_read_key(table, chain, address)
+        with _bq_read_lock:
+            if key in _bq_read_cache:
+                _bq_read_cache.move_to_end(key)
+                return _bq_read_cache[key]
 
         from google.cloud import bigquery
         params = [
             bigquery.ScalarQueryParameter('chain', 'STRING', chain),
             bigquery.ScalarQueryParameter('address', 'STRING', address),
         ]
+        query = f"""
+        SELECT raw_data
+        FROM `{key[0]}`
+        WHERE chain = @chain AND address = @address{{partition_filter}}
+        ORDER BY timestamp DESC
+        LIMIT 1
+        """
 
-        job_config = bigquery.QueryJobConfig(query_parameters=params)
-
-        result = client.query(query, job_config=job_config).result()
-        for row in result:
-            return json.loads(row.raw_data)
-        return None
+        queries = []
+        row = get_catalog().latest(source, chain, address, endpoint_name, user_id, location='bq_table')
+        if row and row['ref_id']:
+            # Unchanged-snapshot reference: the BigQuery row has the body's timestamp
+            row = get_catalog().get(row['ref_id'])
+        if row and table.time_partitioning is not None:
+            since = datetime.strptime(row['timestamp'], '%Y-%m-%dT%H:%M:%S').date().isoformat()
+            queries.append((query.format(partition_filter=" AND timestamp >= TIMESTAMP(@since)"),
+                            params + [bigquery.ScalarQueryParameter('since', 'STRING', since)]))
+        queries.append((query.format(partition_filter=""), params))
+
+        data = None
+        for sql, query_params in queries:
+            job_config = bigquery.QueryJobConfig(query_parameters=query_params)
+            for result_row in client.query(sql, job_config=job_config).result():
+                data = json.loads(result_row.raw_data)
+            if data is not None:
+                break
+
+        with _bq_read_lock:
+            _bq_read_cache[key] = data
+            while len(_bq_read_cache) > BQ_READ_CACHE_SIZE:
+                _bq_read_cache.popitem(last=False)
+        return data
     except Exception as e:
         print(f"BigQuery load error: {e}")
         return None
 
 
+def migrate_bigquery_tables(user_id=None):
+    """
+    Partition + cluster existing snapshot tables created before partitioning.
+    Dune export tables (dune_*) are left as they are.
+
+    Args:
+        user_id: Only this user's dataset (default: every token_tracker_* dataset)
+
+    Returns:
+        {table_ref: 'migrated' | 'already partitioned' | {'error': message}}
+    """
+    client = _get_bq_client()
+    prefix = f"{GCP_CONFIG['BIGQUERY_DATASET']}_"
+    if user_id:
+        datasets = [prefix + user_id.lower().replace(' ', '_')]
+    else:
+        datasets = [d.dataset_id for d in client.list_datasets() if d.dataset_id.startswith(prefix)]
+
+    results = {}
+    for dataset_id in datasets:
+        for item in client.list_tables(f"{GCP_CONFIG['PROJECT_ID']}.{dataset_id}"):
+            if item.table_id.startswith('dune_') or item.table_id.endswith(('__partitioned', '__unpartitioned')):
+                continue
+            table_ref = f"{item.project}.{item.dataset_id}.{item.table_id}"
+            try:
+                results[table_ref] = migrate_snapshot_table(client, table_ref)
+            except Exception as e:
+                logger.error(f"BigQuery migration error: {table_ref}: {e}")
+                results[table_ref] = {'error': str(e)}
+            if _bq_writer is not None:
+                _bq_writer.forget_table(table_ref)
+    return results
+
+
 def load_latest_json(source, chain, address, endpoint_name, user_id=None):
     """
     Load the most recent data for a given endpoint
@@ -454,38 +995,57 @@ def load_latest_json(source, chain, address, endpoint_name, user_id=None):
 
 
 def list_stored_tokens():
-    """List all tokens that have been stored"""
-    tokens = []
-
-    # Check local storage
-    data_path = Path(DATA_DIR)
-    if data_path.exists():
-        for source_dir in data_path.iterdir():
-            if source_dir.is_dir():
-                for chain_dir in source_dir.iterdir():
-                    if chain_dir.is_dir():
-                        for address_dir in chain_dir.iterdir():
-                            if address_dir.is_dir():
-                                tokens.append({
-                                    'source': source_dir.name,
-                                    'chain': chain_dir.name,
-                                    'address': address_dir.name
-                                })
-
-    return tokens
+    """List all tokens that have been stored (catalog query)"""
+    return get_catalog().list_tokens()
 
 
-def get_storage_stats():
-    """Get storage statistics"""
-    stats = {
-        'local': {'enabled': STORAGE_MODE in ('local', 'all'), 'count': 0},
-        'gcs': {'enabled': STORAGE_MODE in ('gcs', 'all'), 'count': 0},
-        'bigquery': {'enabled': STORAGE_MODE in ('bigquery', 'all'), 'count': 0},
-    }
+def list_snapshots(source, chain, address, endpoint_name, user_id=None, start=None, end=None):
+    """
+    Catalog rows of an endpoint's snapshots in a time range, oldest first
+
+    Args:
+        start/end: datetime, 'YYYYmmdd_HHMMSS' or ISO string (inclusive, optional)
+    """
+    return get_catalog().snapshots(source, chain, address, endpoint_name, user_id, start, end)
+
+
+def get_latest_snapshot(source, chain, address, endpoint_name, user_id=None):
+    """Catalog row of the newest snapshot (locations, size, hash) or None"""
+    return get_catalog().latest(source, chain, address, endpoint_name, user_id)
+
+
+def load_snapshot_json(snapshot_id):
+    """
+    Load one catalogued snapshot (e.g. a list_snapshots row id) from local
+    storage or GCS, including snapshots compacted into archive segments
+    """
+    row = get_catalog().get(snapshot_id)
+    if row is None:
+        return None
+    if row['local_path']:
+        try:
+            return json.loads(decompress(_read_local_location(row['local_path'])))
+        except (OSError, KeyError, zipfile.BadZipFile) as e:
+            logger.warning(f"Local snapshot load error: {e}")
+    if row['gcs_uri']:
+        try:
+            bucket = _get_gcs_bucket()
+            bucket_prefix = f"gs://{bucket.name}/"
+            if row['gcs_uri'].startswith(bucket_prefix):
+                return _download_gcs_json(bucket, row['gcs_uri'][len(bucket_prefix):])
+        except Exception as e:
+            logger.warning(f"GCS snapshot load error: {e}")
+    return None
 
-    # Count local files
-    data_path = Path(DATA_DIR)
-    if data_path.exists():
-        stats['local']['count'] = len(list(data_path.rglob('*.json')))
 
-    return stats
+def get_storage_stats():
+    """Get storage statistics (catalog query)"""
+    counts = get_catalog().stats()
+    return {
+        'local': {'enabled': STORAGE_MODE in ('local', 'all'), 'count': counts['local']},
+        'gcs': {'enabled': STORAGE_MODE in ('gcs', 'all'), 'count': counts['gcs']},
+        'bigquery': {'enabled': STORAGE_MODE in ('bigquery', 'all'), 'count': counts['bigquery']},
+        'snapshots': counts['snapshots'],
+        'unchanged': counts['unchanged'],
+        'bytes': counts['bytes'],
+    }
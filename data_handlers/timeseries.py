@@ -0,0 +1,352 @@
+"""
+Columnar store for time-series endpoints.
+Chart payloads (CoinGecko market charts / OHLC, DefiLlama price chart and
+chain TVL, CDC exchange candles) are normalised into typed rows and kept as
+Parquet datasets partitioned by source, chain and address:
+
+    {TIMESERIES_DIR}/{series}/source={source}/chain={chain}/address={address}/data.parquet
+
+Appends merge into the partition and dedupe on timestamp; reads return typed
+DataFrames and push time-range filters down to Parquet row groups.
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from config import TIMESERIES_DIR
+from data_handlers.raw_payload import decode_payload
+
+logger = logging.getLogger('storage')
+
+_store = None
+_store_lock = threading.Lock()
+
+ROW_GROUP_ROWS = 10000
+PARTITION_FILE = 'data.parquet'
+# Window start a full fetch has covered, per point spacing ({freq: ISO}); '_' prefix keeps it out of
+# dataset discovery
+COVERAGE_FILE = '_coverage'
+PARTITIONING = ds.partitioning(
+    pa.schema([('source', pa.string()), ('chain', pa.string()), ('address', pa.string())]),
+    flavor='hive'
+)
+TIMESTAMP = pa.timestamp('ms', tz='UTC')
+EPOCH = pd.Timestamp(0, tz='UTC')
+
+
+def _schema(*columns):
+    return pa.schema([('timestamp', TIMESTAMP)] + [(name, pa.float64()) for name in columns])
+
+
+def _ms_frame(points, columns):
+    """[[ms, v1, v2, ...], ...] -> DataFrame(timestamp, *columns)"""
+    df = pd.DataFrame(points or [], columns=['timestamp', *columns])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms', utc=True)
+    return df
+
+
+def _market_chart_frame(data):
+    """CoinGecko market_chart: {'prices': [[ms, p]], 'market_caps': [...], 'total_volumes': [...]}"""
+    frames = [_ms_frame(data.get(key), [column]).set_index('timestamp')
+              for key, column in (('prices', 'price'), ('market_caps', 'market_cap'),
+                                  ('total_volumes', 'total_volume'))]
+    df = pd.concat(frames, axis=1)
+    return df[~df.index.duplicated(keep='last')].reset_index()
+
+
+def _ohlc_frame(data):
+    """CoinGecko ohlc: [[ms, open, high, low, close], ...]"""
+    return _ms_frame(data, ['open', 'high', 'low', 'close'])
+
+
+def _ohlcv_frame(data):
+    """ccxt fetch_ohlcv: [[ms, open, high, low, close, volume], ...]"""
+    return _ms_frame(data, ['open', 'high', 'low', 'close', 'volume'])
+
+
+def _price_chart_frame(data):
+    """DefiLlama chart: {'coins': {'chain:address': {'prices': [{'timestamp': s, 'price': p}]}}}"""
+    frames = []
+    for coin, series in (data.get('coins') or {}).items():
+        df = pd.DataFrame(series.get('prices') or [], columns=['timestamp', 'price'])
+        df['coin'] = coin
+        frames.append(df)
+    df = pd.concat(frames) if frames else pd.DataFrame(columns=['timestamp', 'price', 'coin'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s', utc=True)
+    return df[['timestamp', 'coin', 'price']]
+
+
+def market_chart_payload(df):
+    """DataFrame(timestamp, price, market_cap, total_volume) -> CoinGecko market_chart payload"""
+    ms = ((df['timestamp'] - EPOCH) // pd.Timedelta(milliseconds=1)).tolist()
+    return {key: [[t, None if pd.isna(v) else float(v)] for t, v in zip(ms, df[column])]
+            for key, column in (('prices', 'price'), ('market_caps', 'market_cap'),
+                                ('total_volumes', 'total_volume'))}
+
+
+def price_chart_payload(df, data=None):
+    """
+    DataFrame(timestamp, coin, price) -> DefiLlama chart payload.
+    data: A chart payload whose per-coin fields (symbol, decimals, ...) are kept
+    """
+    coins = (data or {}).get('coins') or {}
+    return {'coins': {
+        coin: {**coins.get(coin, {}),
+               'prices': [{'timestamp': int(t.timestamp()), 'price': float(p)}
+                          for t, p in zip(group['timestamp'], group['price'])]}
+        for coin, group in df.groupby('coin', sort=False)
+    }}
+
+
+def resample(df, freq, keys=('timestamp',)):
+    """
+    One point per freq bucket (the first, closest to the bucket start like the
+    APIs' own hourly / daily points) plus the newest point, per non-time key.
+    Used to bring range-endpoint deltas to the granularity of the full window.
+    """
+    if df.empty:
+        return df
+    df = df.sort_values('timestamp', ignore_index=True)
+    groups = [k for k in keys if k != 'timestamp']
+    bucket = df['timestamp'].dt.floor(freq).rename('_bucket')
+    first = ~pd.concat([bucket, df[groups]], axis=1).duplicated(keep='first')
+    newest = ~df.duplicated(subset=groups, keep='last') if groups else df.index == df.index[-1]
+    return df[first | newest].reset_index(drop=True)
+
+
+def _chain_tvl_frame(data):
+    """DefiLlama historicalChainTvl: [{'date': s, 'tvl': x}, ...]"""
+    df = pd.DataFrame(data or [], columns=['date', 'tvl']).rename(columns={'date': 'timestamp'})
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s', utc=True)
+    return df
+
+
+class Series:
+    """A time-series endpoint: payload normaliser, Parquet schema and dedupe keys"""
+
+    def __init__(self, normalise, schema, keys=('timestamp',)):
+        self.normalise = normalise
+        self.schema = schema
+        self.keys = list(keys)
+
+
+# Series name (endpoint key) -> definition
+SERIES = {
+    'coin_market_chart': Series(_market_chart_frame, _schema('price', 'market_cap', 'total_volume')),
+    'historical_chart': Series(_market_chart_frame, _schema('price', 'market_cap', 'total_volume')),
+    'coin_ohlc': Series(_ohlc_frame, _schema('open', 'high', 'low', 'close')),
+    'price_chart': Series(_price_chart_frame,
+                          pa.schema([('timestamp', TIMESTAMP), ('coin', pa.string()), ('price', pa.float64())]),
+                          keys=('timestamp', 'coin')),
+    'chain_tvl': Series(_chain_tvl_frame, _schema('tvl')),
+    'ohlcv': Series(_ohlcv_frame, _schema('open', 'high', 'low', 'close', 'volume')),
+}
+
+
+def is_timeseries(endpoint_name):
+    return endpoint_name in SERIES
+
+
+def _partition_value(value):
+    """Directory-safe partition value (e.g. CDC symbols 'BTC/USDT' -> 'BTC-USDT')"""
+    return str(value).replace('/', '-')
+
+
+def _spacing(freq):
+    """pandas frequency -> point spacing ('5min' < '1h' < '1D')"""
+    return pd.Timedelta(freq)
+
+
+def _to_timestamp(value):
+    """datetime / ISO string / pandas Timestamp -> UTC pandas Timestamp"""
+    ts = pd.Timestamp(value)
+    return ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+
+
+class TimeSeriesStore:
+    """Parquet time-series datasets, one per series, hive-partitioned by source/chain/address."""
+
+    def __init__(self, root=TIMESERIES_DIR):
+        self.root = Path(root)
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _partition_dir(self, series, source, chain, address):
+        return (self.root / series / f"source={_partition_value(source)}"
+                / f"chain={_partition_value(chain)}" / f"address={_partition_value(address)}")
+
+    def _partition_lock(self, directory):
+        with self._lock:
+            return self._locks.setdefault(directory, threading.Lock())
+
+    def append(self, series, source, chain, address, data, retain_from=None) -> int:
+        """
+        Normalise a payload and merge it into the partition (dedupe on timestamp, newest values win).
+
+        Args:
+            series: Series name from SERIES (endpoint key)
+            data: Raw payload (dict / list / RawPayload) or an already normalised DataFrame
+            retain_from: Drop stored and new rows older than this (None = keep everything)
+
+        Returns:
+            Number of new rows
+        """
+        definition = SERIES[series]
+        df = data if isinstance(data, pd.DataFrame) else definition.normalise(decode_payload(data))
+        if df.empty:
+            return 0
+
+        directory = self._partition_dir(series, source, chain, address)
+        path = directory / PARTITION_FILE
+        with self._partition_lock(directory):
+            existing = pq.read_table(path).to_pandas() if path.exists() else None
+            merged = df.drop_duplicates(subset=definition.keys, keep='last').set_index(definition.keys)
+            if existing is not None:
+                # New values win; columns missing from the new payload keep the stored values
+                merged = merged.combine_first(existing.set_index(definition.keys))
+            merged = merged.reset_index().sort_values(definition.keys, ignore_index=True)
+            if retain_from is not None:
+                merged = merged[merged['timestamp'] >= _to_timestamp(retain_from)].reset_index(drop=True)
+            table = pa.Table.from_pandas(merged[definition.schema.names], schema=definition.schema,
+                                         preserve_index=False)
+
+            directory.mkdir(parents=True, exist_ok=True)
+            tmp = directory / f".{PARTITION_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+            pq.write_table(table, tmp, row_group_size=ROW_GROUP_ROWS, compression='zstd')
+            os.replace(tmp, path)
+        if existing is not None and retain_from is not None:
+            existing = existing[existing['timestamp'] >= _to_timestamp(retain_from)]
+        return len(merged) - (0 if existing is None else len(existing))
+
+    def read(self, series, source, chain=None, address=None, start=None, end=None, columns=None):
+        """
+        Typed DataFrame of a series, oldest first.
+
+        Args:
+            chain/address: Partition filters (None = all)
+            start/end: Inclusive time range (datetime or ISO string; naive = UTC),
+                pushed down to Parquet row-group statistics
+            columns: Value columns to read (timestamp is always included)
+
+        Returns:
+            DataFrame with 'timestamp' (UTC) first; empty if nothing is stored
+        """
+        definition = SERIES[series]
+        if chain is not None and address is not None:
+            # Single partition: open its file directly instead of discovering the dataset
+            path = self._partition_dir(series, source, chain, address) / PARTITION_FILE
+            if not path.exists():
+                return definition.schema.empty_table().to_pandas()
+            dataset = ds.dataset(path, format='parquet', schema=definition.schema)
+            expression = None
+        else:
+            directory = self.root / series
+            if not directory.exists():
+                return definition.schema.empty_table().to_pandas()
+            dataset = ds.dataset(directory, format='parquet', partitioning=PARTITIONING)
+            expression = ds.field('source') == _partition_value(source)
+            if chain is not None:
+                expression &= ds.field('chain') == _partition_value(chain)
+            if address is not None:
+                expression &= ds.field('address') == _partition_value(address)
+
+        if start is not None:
+            bound = ds.field('timestamp') >= pa.scalar(_to_timestamp(start), type=TIMESTAMP)
+            expression = bound if expression is None else expression & bound
+        if end is not None:
+            bound = ds.field('timestamp') <= pa.scalar(_to_timestamp(end), type=TIMESTAMP)
+            expression = bound if expression is None else expression & bound
+
+        if columns is not None:
+            columns = ['timestamp'] + [c for c in columns if c != 'timestamp']
+        df = dataset.to_table(columns=columns, filter=expression).to_pandas()
+        return df.sort_values('timestamp', ignore_index=True)
+
+    def last_timestamp(self, series, source, chain, address):
+        """Newest stored timestamp of a partition (None if empty)"""
+        path = self._partition_dir(series, source, chain, address) / PARTITION_FILE
+        if not path.exists():
+            return None
+        # Max from row-group statistics: no data pages are read
+        metadata = pq.ParquetFile(path).metadata
+        column = metadata.schema.names.index('timestamp')
+        maxima = [metadata.row_group(i).column(column).statistics.max
+                  for i in range(metadata.num_row_groups)
+                  if metadata.row_group(i).column(column).statistics is not None]
+        return _to_timestamp(max(maxima)) if maxima else None
+
+    def window(self, series, source, chain, address, start=None, delta=None, freq=None):
+        """
+        Stored series from start on, merged with a newer payload that is not stored
+        yet (its values win), optionally resampled to one point per freq.
+
+        Args:
+            delta: Raw payload (e.g. a range-endpoint response) to merge in
+            freq: pandas frequency ('5min', '1h', '1D'; None = as stored)
+        """
+        definition = SERIES[series]
+        df = self.read(series, source, chain, address, start=start)
+        if delta is not None:
+            new = definition.normalise(decode_payload(delta))
+            if not new.empty:
+                # Same time unit as the stored column, or concat falls back to object dtype
+                new['timestamp'] = new['timestamp'].astype(df['timestamp'].dtype)
+                df = pd.concat([df, new], ignore_index=True)
+                df = df.drop_duplicates(subset=definition.keys, keep='last')
+        df = df.sort_values(definition.keys, ignore_index=True)
+        return resample(df, freq, definition.keys) if freq else df
+
+    def _read_coverage(self, directory):
+        """{freq: window start} of the full fetches recorded for a partition"""
+        try:
+            coverage = json.loads((directory / COVERAGE_FILE).read_text())
+        except (OSError, ValueError):
+            return {}
+        # Files written before coverage was kept per spacing hold a bare ISO start: spacing unknown
+        return {freq: _to_timestamp(start) for freq, start in coverage.items()} if isinstance(coverage, dict) else {}
+
+    def coverage_start(self, series, source, chain, address, freq):
+        """
+        Earliest window start a full fetch has requested for this partition with
+        points every freq or finer (None if never): coarser stored points cannot
+        be resampled into a window at freq.
+        """
+        coverage = self._read_coverage(self._partition_dir(series, source, chain, address))
+        starts = [start for spacing, start in coverage.items() if _spacing(spacing) <= _spacing(freq)]
+        return min(starts) if starts else None
+
+    def extend_coverage(self, series, source, chain, address, start, freq):
+        """
+        Record that a full fetch requested points every freq from start on (keeps
+        the earliest start per spacing). Incremental fetches are only used for
+        windows the stored series already covers at their granularity.
+        """
+        start = _to_timestamp(start)
+        directory = self._partition_dir(series, source, chain, address)
+        with self._partition_lock(directory):
+            coverage = self._read_coverage(directory)
+            if freq in coverage and coverage[freq] <= start:
+                return
+            coverage[freq] = start
+            directory.mkdir(parents=True, exist_ok=True)
+            tmp = directory / f".{COVERAGE_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+            tmp.write_text(json.dumps({spacing: ts.isoformat() for spacing, ts in coverage.items()}))
+            os.replace(tmp, directory / COVERAGE_FILE)
+
+
+def get_timeseries_store():
+    """Get the process-wide TimeSeriesStore"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = TimeSeriesStore()
+    return _store
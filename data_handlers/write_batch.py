@@ -0,0 +1,57 @@
+"""
+Per-fetch tracking of background storage work.
+One fetch creates a WriteBatch and passes it to every save; the write queue,
+GCS uploader and BigQuery writer register their jobs on it, so the fetch
+flushes and reports only its own snapshots, not those of concurrent sessions.
+"""
+
+import threading
+
+
+class WriteBatch:
+    """
+    Writes started by one fetch: queued snapshots (counters), GCS upload
+    futures and BigQuery row futures.
+    """
+
+    def __init__(self):
+        self._done = threading.Condition()
+        self.unfinished = 0
+        self.written = 0
+        self.failed = 0
+        self.uploads = {}  # gs:// uri -> Future
+        self.rows = []     # [(table_ref, Future), ...]
+
+    def queued(self):
+        """A snapshot of this batch entered the write queue"""
+        with self._done:
+            self.unfinished += 1
+
+    def finished(self, ok):
+        """A queued snapshot of this batch was written (ok) or failed"""
+        with self._done:
+            self.unfinished -= 1
+            if ok:
+                self.written += 1
+            else:
+                self.failed += 1
+            self._done.notify_all()
+
+    def wait(self, timeout=None) -> dict:
+        """
+        Wait until every queued snapshot of this batch has been written.
+
+        Returns:
+            {'written': n, 'failed': n, 'pending': n} (pending > 0 only on timeout)
+        """
+        with self._done:
+            self._done.wait_for(lambda: self.unfinished == 0, timeout=timeout)
+            return {'written': self.written, 'failed': self.failed, 'pending': self.unfinished}
+
+    def add_upload(self, uri, future):
+        with self._done:
+            self.uploads[uri] = future
+
+    def add_row(self, table_ref, future):
+        with self._done:
+            self.rows.append((table_ref, future))
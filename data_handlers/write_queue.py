@@ -0,0 +1,276 @@
+"""
+Write-behind queue for snapshot saves.
+BaseFetcher.save enqueues; background writer threads run save_json (local,
+GCS, BigQuery) and the time-series store so fetches don't wait on storage
+round trips. Snapshots stay in memory up to STORAGE_WRITE_QUEUE_SIZE; beyond
+that, and for failed writes and whatever is still queued at exit, they are
+journaled to STORAGE_SPILL_DIR and replayed on the next start.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from config import STORAGE_SHUTDOWN_WAIT, STORAGE_SPILL_DIR, STORAGE_WRITE_QUEUE_SIZE, STORAGE_WRITE_WORKERS
+from data_handlers.raw_payload import RawPayload
+from data_handlers.storage import _to_bytes, save_json
+from data_handlers.timeseries import get_timeseries_store, is_timeseries
+
+logger = logging.getLogger('storage')
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+SPILL_SUFFIX = '.job'
+
+
+def write_snapshot(data, source, chain, address, endpoint_name, user_id=None, timestamp=None, batch=None,
+                   coverage=None, shared=False):
+    """
+    save_json, plus the Parquet time-series store for chart endpoints.
+    coverage: {'start': ISO window start, 'freq': point spacing} of the full fetch
+    that produced data; the series' coverage is only extended after the append succeeded.
+    """
+    results = save_json(data, source, chain, address, endpoint_name, user_id, timestamp=timestamp, batch=batch,
+                        shared=shared)
+    if is_timeseries(endpoint_name):
+        try:
+            store = get_timeseries_store()
+            store.append(endpoint_name, source, chain, address, data)
+            if coverage is not None:
+                store.extend_coverage(endpoint_name, source, chain, address, coverage['start'], coverage['freq'])
+        except Exception as e:
+            logger.error(f"Time-series store error: {endpoint_name}: {e}")
+    return results
+
+
+class WriteQueue:
+    """
+    Queue of pending save_json calls drained by writer threads.
+    Up to max_pending snapshots wait in memory; beyond that put() journals the
+    snapshot to spill_dir and the writers read it back from there (without a
+    spill_dir, put() blocks instead: backpressure).
+    """
+
+    def __init__(self, writer=write_snapshot, workers=STORAGE_WRITE_WORKERS,
+                 max_pending=STORAGE_WRITE_QUEUE_SIZE, spill_dir=STORAGE_SPILL_DIR):
+        self.writer = writer
+        self.max_pending = max_pending
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self._queue = queue.Queue()  # (data, meta, journal path, batch); data None = read from the journal
+        self._done = threading.Condition()
+        self._unfinished = 0
+        self._in_memory = 0
+        self._active = {}  # writer thread name -> job being written
+        self._written = 0
+        self._failed = 0
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._worker, name=f"storage-writer-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _spill(self, job_id, body, meta):
+        """Journal a job as one file: JSON header line + payload bytes (atomic rename)"""
+        if self.spill_dir is None:
+            return None
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        path = self.spill_dir / f"{job_id}{SPILL_SUFFIX}"
+        tmp = self.spill_dir / f".{job_id}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(json.dumps(meta).encode('utf-8') + b'\n')
+            f.write(body)
+        os.replace(tmp, path)
+        return path
+
+    def _journal(self, data, meta):
+        """Journal an in-memory job for replay (None if there is no spill_dir or the write failed)"""
+        try:
+            return self._spill(uuid.uuid4().hex, _to_bytes(data), meta)
+        except OSError as e:
+            logger.error(f"Write queue spill failed, {meta['endpoint_name']} is lost: {e}")
+            return None
+
+    def _reserve_memory(self, wait):
+        """Take an in-memory slot; False if all max_pending are taken and not wait"""
+        with self._done:
+            if self._in_memory >= self.max_pending:
+                if not wait:
+                    return False
+                self._done.wait_for(lambda: self._in_memory < self.max_pending)
+            self._in_memory += 1
+            return True
+
+    def put(self, data, source, chain, address, endpoint_name, user_id=None, batch=None, coverage=None,
+            shared=False):
+        """
+        Queue a snapshot for save_json. The snapshot timestamp is taken now,
+        not when the writer gets to it.
+
+        Args:
+            batch: WriteBatch of the calling fetch (see flush)
+            coverage: Window start and spacing of a full time-series fetch (see write_snapshot)
+            shared: Token-independent payload (see save_json)
+        """
+        meta = {
+            'source': source, 'chain': chain, 'address': address,
+            'endpoint_name': endpoint_name, 'user_id': user_id,
+            'timestamp': datetime.now().strftime("%Y%m%d_%H%M%S"),
+            'coverage': coverage, 'shared': shared,
+        }
+        path = None
+        if not self._reserve_memory(wait=self.spill_dir is None):
+            # Queue full: journal the snapshot instead of holding it in memory
+            try:
+                path = self._spill(uuid.uuid4().hex, _to_bytes(data), meta)
+                data = None
+            except OSError as e:
+                logger.warning(f"Write queue spill failed, waiting to queue {endpoint_name} in memory: {e}")
+                self._reserve_memory(wait=True)
+        self._enqueue(data, meta, path, batch)
+
+    def _enqueue(self, data, meta, path, batch=None):
+        with self._done:
+            self._unfinished += 1
+        if batch is not None:
+            batch.queued()
+        self._queue.put((data, meta, path, batch))
+
+    def _worker(self):
+        name = threading.current_thread().name
+        while True:
+            job = self._queue.get()
+            data, meta, path, batch = job
+            with self._done:
+                if data is not None:
+                    self._in_memory -= 1
+                    self._done.notify_all()
+                self._active[name] = job
+            ok = False
+            try:
+                if data is None:
+                    with open(path, 'rb') as f:
+                        f.readline()
+                        data = RawPayload(f.read())
+                self.writer(data, meta['source'], meta['chain'], meta['address'],
+                            meta['endpoint_name'], meta['user_id'], timestamp=meta['timestamp'], batch=batch,
+                            coverage=meta.get('coverage'), shared=meta.get('shared', False))
+                ok = True
+                if path is not None:
+                    path.unlink(missing_ok=True)
+            except Exception as e:
+                logger.error(f"Storage write error: {meta['endpoint_name']}: {e}")
+                if path is None and data is not None:
+                    # Journaled now, so the next start retries it
+                    self._journal(data, meta)
+            finally:
+                with self._done:
+                    del self._active[name]
+                    self._unfinished -= 1
+                    if ok:
+                        self._written += 1
+                    else:
+                        self._failed += 1
+                    self._done.notify_all()
+                if batch is not None:
+                    batch.finished(ok)
+
+    def replay(self) -> int:
+        """Re-queue snapshots journaled by a previous process that were never written"""
+        if self.spill_dir is None or not self.spill_dir.exists():
+            return 0
+        count = 0
+        for path in sorted(self.spill_dir.glob(f"*{SPILL_SUFFIX}")):
+            try:
+                with open(path, 'rb') as f:
+                    meta = json.loads(f.readline())
+            except (OSError, ValueError) as e:
+                logger.error(f"Unreadable spilled snapshot {path.name}: {e}")
+                continue
+            # The body is read back by the writer thread
+            self._enqueue(None, meta, path)
+            count += 1
+        if count:
+            logger.info(f"Write queue: replaying {count} spilled snapshots")
+        return count
+
+    def pending(self) -> int:
+        """Snapshots queued or being written"""
+        with self._done:
+            return self._unfinished
+
+    def flush(self, timeout=None, batch=None) -> dict:
+        """
+        Wait until every queued snapshot has been written.
+
+        Args:
+            batch: Only wait for the snapshots put() with this WriteBatch and
+                report its counters (other fetches' snapshots are not awaited)
+
+        Returns:
+            {'written': n, 'failed': n, 'pending': n} of the batch, or of the
+            whole queue since the last flush without a batch
+            (pending > 0 only on timeout)
+        """
+        if batch is not None:
+            return batch.wait(timeout)
+        with self._done:
+            self._done.wait_for(lambda: self._unfinished == 0, timeout=timeout)
+            results = {'written': self._written, 'failed': self._failed, 'pending': self._unfinished}
+            self._written = self._failed = 0
+        return results
+
+    def close(self, timeout=STORAGE_SHUTDOWN_WAIT) -> int:
+        """
+        Shutdown: give the writers up to timeout seconds, then journal every
+        snapshot still held in memory (queued or being written) for replay.
+
+        Returns:
+            Number of snapshots journaled
+        """
+        with self._done:
+            self._done.wait_for(lambda: self._unfinished == 0, timeout=timeout)
+            # A job still being written is journaled too: if it finishes after all,
+            # its replay is stored as an unchanged reference (STORAGE_DEDUPE)
+            jobs = [job for job in self._active.values() if job[2] is None]
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            data, meta, path, batch = job
+            with self._done:
+                self._unfinished -= 1
+                if data is not None:
+                    self._in_memory -= 1
+            if path is None:
+                jobs.append(job)
+            if batch is not None:
+                batch.finished(False)
+
+        count = sum(1 for data, meta, _, _ in jobs if self._journal(data, meta) is not None)
+        if count:
+            logger.info(f"Write queue: journaled {count} unwritten snapshots for replay")
+        return count
+
+
+def get_write_queue():
+    """
+    Get the process-wide WriteQueue (lazy init: replays spilled snapshots on
+    first use, journals the unwritten ones at exit)
+    """
+    global _write_queue
+    if _write_queue is None:
+        with _write_queue_lock:
+            if _write_queue is None:
+                write_queue = WriteQueue()
+                write_queue.replay()
+                atexit.register(write_queue.close)
+                _write_queue = write_queue
+    return _write_queue
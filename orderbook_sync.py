@@ -1,49 +1,140 @@
+import bisect
 import ccxt
 import time
-from collections import defaultdict, deque
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+class BoundedDedupe:
+    """
+    Set of the last `capacity` keys in insertion order (ring buffer + hash set).
+    Fixed memory, O(1) add / lookup; the oldest key is evicted first. capacity
+    must exceed the trades one fetch returns so a key still inside the fetch
+    window is never forgotten and counted twice.
+    """
+    def __init__(self, capacity=2000):
+        self.capacity = capacity
+        self._ring = [None] * capacity
+        self._next = 0
+        self._keys = set()
+
+    def add(self, key):
+        """Remember key; False if it was already seen"""
+        if key in self._keys:
+            return False
+        oldest = self._ring[self._next]
+        if oldest is not None:
+            self._keys.discard(oldest)
+        self._ring[self._next] = key
+        self._next = (self._next + 1) % self.capacity
+        self._keys.add(key)
+        return True
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
 
 class CVDTracker:
+    """
+    Rolling cumulative volume delta per window.
+    One trade log sorted by timestamp (parallel lists of times and deltas)
+    holds the longest window; each window is the log suffix from its own start
+    index, with a running sum. Ageing out advances a window's start index, so
+    get_cvd is O(1) and ingestion amortised O(1) per trade; the log prefix no
+    window uses any more is dropped once it is half of the log.
+    """
+    COMPACT_MIN = 1024  # Dropped prefix size worth a compaction
+
     def __init__(self):
-        self.trades = deque()
-        self.seen_trade_ids = set()
+        # fetch_trades returns at most 100 trades, far below the dedupe capacity
+        self.seen_trade_ids = BoundedDedupe(2000)
         self.windows = {
             '5m': 5 * 60,
             '1h': 60 * 60,
             '12h': 12 * 60 * 60,
             '24h': 24 * 60 * 60
         }
+        self._times = []   # trade timestamps (seconds), ascending
+        self._deltas = []  # signed amount of the trade at the same index
+        self._starts = {key: 0 for key in self.windows}
+        self._sums = {key: 0.0 for key in self.windows}
+
+    def _evict(self, now):
+        times, deltas = self._times, self._deltas
+        for key, limit in self.windows.items():
+            start = self._starts[key]
+            cutoff = now - limit
+            while start < len(times) and times[start] < cutoff:
+                self._sums[key] -= deltas[start]
+                start += 1
+            self._starts[key] = start
+            if start == len(times):
+                # Reset float drift of the running sum once the window is empty
+                self._sums[key] = 0.0
+        self._compact()
+
+    def _compact(self):
+        unused = min(self._starts.values())
+        if unused >= self.COMPACT_MIN and unused * 2 >= len(self._times):
+            del self._times[:unused]
+            del self._deltas[:unused]
+            for key in self._starts:
+                self._starts[key] -= unused
+
+    def _insert(self, ts, delta):
+        # Late trades land before the newest ones; one ordered log keeps every window a suffix
+        i = bisect.bisect_right(self._times, ts)
+        self._times.insert(i, ts)
+        self._deltas.insert(i, delta)
+        for key, start in self._starts.items():
+            if i < start:
+                self._starts[key] = start + 1  # Before the window: shifts it, not in it
+            else:
+                self._sums[key] += delta  # Aged out trades are evicted again by _evict
 
     def add_trades(self, trade_list):
         now = time.time()
         for t in trade_list:
             t_id = t.get('id') or f"{t['timestamp']}_{t['amount']}_{t['price']}"
-            if t_id not in self.seen_trade_ids:
-                delta = t['amount'] if t['side'] == 'buy' else -t['amount']
-                self.trades.append((t['timestamp'] / 1000, delta))
-                self.seen_trade_ids.add(t_id)
-        
-        cutoff = now - self.windows['24h']
-        while self.trades and self.trades[0][0] < cutoff:
-            self.trades.popleft()
-        
-        if len(self.seen_trade_ids) > 2000:
-            self.seen_trade_ids = set(list(self.seen_trade_ids)[-1000:])
+            if self.seen_trade_ids.add(t_id):
+                ts = t['timestamp'] / 1000
+                if now - ts <= self.windows['24h']:
+                    self._insert(ts, t['amount'] if t['side'] == 'buy' else -t['amount'])
+
+        self._evict(now)
 
     def get_cvd(self, window_key):
         if window_key not in self.windows:
             return 0
-        now = time.time()
-        limit = self.windows[window_key]
-        return sum(delta for ts, delta in self.trades if now - ts <= limit)
+        self._evict(time.time())
+        return self._sums[window_key]
 
 class OrderbookEngineSync:
-    """Synchronous version for Streamlit compatibility."""
-    def __init__(self, exchanges_list, symbol, depth=10):
+    """
+    Synchronous version for Streamlit compatibility.
+    fetch_all polls the exchanges concurrently; a venue that misses the deadline
+    (seconds) or fails returns its last good snapshot marked 'stale', or a
+    'timeout' / 'error' row without market data if it has none yet.
+    Candle history uses its own ccxt instance per venue: ccxt exchanges are not
+    thread-safe and a timed-out poll may still be using the polling instance.
+    fetch_candles polls it on the same pool, so a slow venue cannot hold up a refresh.
+    """
+    def __init__(self, exchanges_list, symbol, depth=10, deadline=1.5):
         self.target_exchanges = exchanges_list
         self.symbol = symbol
         self.depth = depth
+        self.deadline = deadline
         self.trackers = {ex: CVDTracker() for ex in exchanges_list}
         self.exchanges = {}
+        self._candle_exchanges = {}  # ex_id -> ccxt instance used only by fetch_candle_history
+        # One worker per venue, plus one for the candle history poll
+        self._pool = ThreadPoolExecutor(max_workers=len(exchanges_list) + 1, thread_name_prefix='orderbook')
+        self._polls = {}      # ex_id -> Future of the poll in flight
+        self._last_good = {}  # ex_id -> last successful fetch_exchange_data result
+        self._candle_poll = None   # Future of the candle history poll in flight
+        self._last_candles = None  # last successful fetch_candle_history result
 
     def init(self):
         for ex_id in self.target_exchanges:
@@ -52,6 +143,10 @@ class OrderbookEngineSync:
                 exchange = exchange_class({'enableRateLimit': True})
                 exchange.load_markets()
                 self.exchanges[ex_id] = exchange
+                # Second instance sharing the loaded markets (no extra request)
+                candle_exchange = exchange_class({'enableRateLimit': True})
+                candle_exchange.set_markets(exchange.markets, exchange.currencies)
+                self._candle_exchanges[ex_id] = candle_exchange
                 
                 actual_symbol = self._get_actual_symbol(ex_id)
                 if ex_id != 'hyperliquid':
@@ -96,33 +191,89 @@ class OrderbookEngineSync:
                 'cvd_5m': self.trackers[ex_id].get_cvd('5m'),
                 'cvd_1h': self.trackers[ex_id].get_cvd('1h'),
                 'cvd_12h': self.trackers[ex_id].get_cvd('12h'),
-                'cvd_24h': self.trackers[ex_id].get_cvd('24h')
+                'cvd_24h': self.trackers[ex_id].get_cvd('24h'),
+                'stale': False,
+                'status': 'live'
             }
         except Exception as e:
             print(f"Error fetching {ex_id}: {e}")
             return None
 
-    def fetch_all(self):
+    def fetch_all(self, deadline=None):
+        """
+        Poll every venue; one row per venue in target_exchanges order.
+
+        Args:
+            deadline: Seconds to wait for the polls (default: self.deadline),
+                e.g. a share of the dashboard refresh interval
+
+        Returns:
+            fetch_exchange_data rows ('status' 'live', or 'stale' for the last good
+            row of a late / failed venue), and {'id', 'status': 'timeout' | 'error'}
+            for venues without any data yet
+        """
+        for ex_id in self.target_exchanges:
+            # A venue still busy with an earlier poll is not polled again until it returns
+            if ex_id not in self._polls:
+                self._polls[ex_id] = self._pool.submit(self.fetch_exchange_data, ex_id)
+        wait(list(self._polls.values()), timeout=self.deadline if deadline is None else deadline)
+
         results = []
         for ex_id in self.target_exchanges:
-            data = self.fetch_exchange_data(ex_id)
+            data = None
+            poll = self._polls.get(ex_id)
+            if poll is not None and poll.done():
+                del self._polls[ex_id]
+                data = poll.result()
             if data:
+                self._last_good[ex_id] = data
                 results.append(data)
+            elif ex_id in self._last_good:
+                results.append({**self._last_good[ex_id], 'stale': True, 'status': 'stale'})
+            else:
+                results.append({'id': ex_id, 'status': 'timeout' if ex_id in self._polls else 'error'})
         return results
 
+    def close(self):
+        self._pool.shutdown(wait=False)
+
+    def fetch_candles(self, deadline=None, timeframe='1m', limit=100):
+        """
+        Candle history polled on the engine pool, like fetch_all.
+
+        Args:
+            deadline: Seconds to wait for the poll (default: self.deadline); 0 only
+                starts it and returns what is already there
+
+        Returns:
+            fetch_candle_history result, or the last one received while the poll is
+            late or failed (None before the first)
+        """
+        # A poll still running is not started again until it returns
+        if self._candle_poll is None:
+            self._candle_poll = self._pool.submit(self.fetch_candle_history, timeframe, limit)
+        wait([self._candle_poll], timeout=self.deadline if deadline is None else deadline)
+        if self._candle_poll.done():
+            poll, self._candle_poll = self._candle_poll, None
+            candles = poll.result()
+            if candles:
+                self._last_candles = candles
+        return self._last_candles
+
     def fetch_candle_history(self, timeframe='1m', limit=100):
         # Prefer Binance, then Bybit, then others
         preferred = ['binance', 'bybit', 'coinbase', 'hyperliquid']
         
         for ex_id in preferred:
-            if ex_id in self.exchanges:
+            if ex_id in self._candle_exchanges:
                 try:
-                    exchange = self.exchanges[ex_id]
+                    exchange = self._candle_exchanges[ex_id]
                     actual_symbol = self._get_actual_symbol(ex_id)
                     ohlcv = exchange.fetch_ohlcv(actual_symbol, timeframe, limit=limit)
                     # Format: [[timestamp, open, high, low, close, volume], ...]
                     return {
                         'exchange': ex_id,
+                        'timeframe': timeframe,
                         'data': ohlcv
                     }
                 except Exception as e:
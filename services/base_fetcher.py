@@ -3,20 +3,31 @@ Base fetcher class with common utilities for all data sources.
 """
 
 import streamlit as st
-from data_handlers.storage import save_json
+from api_clients.retry import get_call_stats, reset_call_stats
+from config import SHARED_ENDPOINT_TTLS
+from data_handlers.timeseries import get_timeseries_store
+from data_handlers.write_queue import get_write_queue
+from services.executor import DagExecutor, EndpointTask
+from services.response_cache import get_response_cache
 from utils.logger import log_to_ui as log_to_ui_util
 
 
 class BaseFetcher:
     """Base class for all API fetchers with common utilities."""
 
+    SOURCE = "unknown"
+    PROVIDER = "DEFAULT"  # Concurrency group in FETCH_CONCURRENCY
+    TITLE = None  # Section banner for fetch_all()
+
     def __init__(self, chain_name: str, contract_address: str, user_id: str,
-                 chain_config: dict, log_callback=None):
+                 chain_config: dict, log_callback=None, batch=None):
         self.chain_name = chain_name
         self.contract_address = contract_address
         self.user_id = user_id
         self.chain_config = chain_config
         self.log_callback = log_callback
+        self.batch = batch  # WriteBatch of the fetch: its saves are flushed and reported together
+        self._coverage = {}  # series -> (window start, freq) of a full fetch, recorded once its save is written
 
     def log(self, message: str, status: str = "info"):
         """Log message to UI."""
@@ -25,21 +36,82 @@ class BaseFetcher:
             self.log_callback(message, status)
 
     def save(self, data, source: str, endpoint_key: str):
-        """Save data to storage."""
-        save_json(data, source, self.chain_name, self.contract_address,
-                  endpoint_key, self.user_id)
+        """
+        Queue data for storage (written in the background, see fetch_all_data's flush).
+        Shared-cache endpoints are saved as shared: a cached response another token
+        already stored becomes a catalog reference, not another stored body.
+        """
+        coverage = self._coverage.pop(endpoint_key, None)
+        if coverage is not None:
+            coverage = {'start': coverage[0].isoformat(), 'freq': coverage[1]}
+        get_write_queue().put(data, source, self.chain_name, self.contract_address,
+                              endpoint_key, self.user_id, batch=self.batch, coverage=coverage,
+                              shared=endpoint_key in SHARED_ENDPOINT_TTLS)
+
+    def stored_since(self, series: str, start, freq):
+        """
+        Newest stored timestamp of a time-series endpoint, if the stored series
+        already covers the requested window at its granularity (None: fetch the full window).
+
+        Args:
+            series: Endpoint key in the time-series store
+            start: Requested window start (UTC pandas Timestamp; epoch 0 = full history)
+            freq: Point spacing of the requested window (pandas frequency)
+        """
+        store = get_timeseries_store()
+        args = (series, self.SOURCE, self.chain_name, self.contract_address)
+        try:
+            coverage = store.coverage_start(*args, freq)
+            if coverage is None or coverage > start:
+                return None
+            return store.last_timestamp(*args)
+        except Exception as e:
+            self.log(f"{series}: time-series lookup error: {str(e)[:50]}", "error")
+            return None
+
+    def stored_window(self, series: str, start, delta, freq):
+        """
+        Stored series from start on merged with a newer delta payload and resampled
+        to freq: the window a full fetch would have returned (None on store errors).
+
+        Args:
+            series: Endpoint key in the time-series store
+            start: Window start (UTC pandas Timestamp; None = everything stored)
+            delta: Incremental payload not yet written to the store
+            freq: Granularity of the full window (pandas frequency)
+        """
+        try:
+            return get_timeseries_store().window(series, self.SOURCE, self.chain_name, self.contract_address,
+                                                 start=start, delta=delta, freq=freq)
+        except Exception as e:
+            self.log(f"{series}: time-series window error: {str(e)[:50]}", "error")
+            return None
+
+    def record_coverage(self, series: str, start, freq):
+        """
+        Remember that a full fetch of a time-series endpoint requested points every freq from start on.
+        The store's coverage is extended by the writer once the series itself is appended,
+        so a later fetch never goes incremental against points that are not stored yet.
+        """
+        self._coverage[series] = (start, freq)
 
     def update_status(self, key: str, success: bool = True):
         """Update endpoint status in session state."""
         status = "✅ done" if success else "❌ failed"
         st.session_state.endpoint_status[key] = status
 
+    def update_meta(self, key: str):
+        """Record attempt count / breaker state of the last fetch in session state."""
+        stats = get_call_stats()
+        if stats is not None:
+            st.session_state.setdefault('endpoint_meta', {})[key] = dict(stats)
+
     def skip_status(self, key: str):
         """Mark endpoint as skipped."""
         st.session_state.endpoint_status[key] = "⚠️ skip"
 
     def fetch_and_save(self, endpoint_key: str, fetch_func, *args,
-                       source: str = "unknown", log_msg: str = None, **kwargs):
+                       source: str = "unknown", log_msg=None, **kwargs):
         """
         Generic fetch and save with error handling.
 
@@ -47,16 +119,81 @@ class BaseFetcher:
             endpoint_key: Key to identify the endpoint
             fetch_func: Function to call for fetching data
             source: Data source name
-            log_msg: Optional success message
+            log_msg: Optional success message, or callable(data) -> message
         """
+        reset_call_stats()
         try:
             data = fetch_func(*args, **kwargs)
+            self.update_meta(endpoint_key)
             self.save(data, source, endpoint_key)
             self.update_status(endpoint_key, True)
             if log_msg:
-                self.log(log_msg, "success")
+                self.log(log_msg(data) if callable(log_msg) else log_msg, "success")
             return data
         except Exception as e:
+            self.update_meta(endpoint_key)
             self.update_status(endpoint_key, False)
             self.log(f"{endpoint_key} error: {str(e)[:50]}", "error")
             return None
+
+    def cached(self, endpoint_key: str, fetch_func, cache_params=()):
+        """
+        Wrap fetch_func with the shared response cache (TTL from SHARED_ENDPOINT_TTLS).
+
+        Args:
+            endpoint_key: Key to identify the endpoint
+            fetch_func: Function to call on a cache miss
+            cache_params: Values besides the inputs that the response depends on (e.g. chain)
+        """
+        ttl = SHARED_ENDPOINT_TTLS[endpoint_key]
+
+        def fetch(**inputs):
+            key = (self.PROVIDER, endpoint_key, tuple(cache_params), tuple(sorted(inputs.items())))
+            data, hit = get_response_cache().get_or_fetch(key, ttl, lambda: fetch_func(**inputs))
+            stats = get_call_stats()
+            if hit and stats is not None:
+                stats['cached'] = True
+            return data
+
+        return fetch
+
+    def task(self, endpoint_key: str, fetch_func, requires=(), log_msg=None,
+             cache_params=()) -> EndpointTask:
+        """
+        Declare an endpoint as a DAG task.
+        Endpoints listed in SHARED_ENDPOINT_TTLS are served from the shared cache.
+
+        Args:
+            endpoint_key: Key to identify the endpoint
+            fetch_func: Called with the required inputs as keyword arguments
+            requires: Input names needed before fetching (e.g. ('coin_id',))
+            log_msg: Optional success message (may use {input} placeholders),
+                or callable(data) -> message
+            cache_params: Values the shared response depends on besides inputs (e.g. chain)
+        """
+        if endpoint_key in SHARED_ENDPOINT_TTLS:
+            fetch_func = self.cached(endpoint_key, fetch_func, cache_params)
+
+        def run(inputs):
+            msg = log_msg.format(**inputs) if isinstance(log_msg, str) and inputs else log_msg
+            self.fetch_and_save(endpoint_key, fetch_func, source=self.SOURCE,
+                                log_msg=msg, **inputs)
+
+        return EndpointTask(endpoint_key, self.PROVIDER, run, requires=requires,
+                            on_skip=lambda: self.skip_status(endpoint_key))
+
+    def tasks(self) -> list:
+        """Return the EndpointTasks for this source."""
+        raise NotImplementedError
+
+    def initial_context(self) -> dict:
+        """Inputs already known before any endpoint runs."""
+        return {}
+
+    def fetch_all(self) -> dict:
+        """Fetch all endpoints of this source and return the resolved context."""
+        if self.TITLE:
+            self.log("=" * 40, "info")
+            self.log(f"{self.TITLE} ENDPOINTS", "info")
+            self.log("=" * 40, "info")
+        return DagExecutor().run(self.tasks(), self.initial_context())
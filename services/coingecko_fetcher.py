@@ -2,305 +2,228 @@
 CoinGecko data fetcher - handles all CoinGecko API endpoints.
 """
 
+import pandas as pd
+
 from services.base_fetcher import BaseFetcher
+from services.executor import EndpointTask
 from api_clients.coingecko_client import CoinGeckoClient
+from data_handlers.coin_index import get_coin_index
+from data_handlers.raw_payload import decode_payload
+from data_handlers.timeseries import market_chart_payload
 
 
 class CoinGeckoFetcher(BaseFetcher):
     """Fetcher for CoinGecko API endpoints."""
 
     SOURCE = "coingecko"
+    PROVIDER = "COINGECKO"
+    TITLE = "COINGECKO"
 
     def __init__(self, chain_name: str, contract_address: str, user_id: str,
-                 chain_config: dict, cg_days: str, log_callback=None):
-        super().__init__(chain_name, contract_address, user_id, chain_config, log_callback)
-        self.client = CoinGeckoClient()
+                 chain_config: dict, cg_days: str, log_callback=None, batch=None):
+        super().__init__(chain_name, contract_address, user_id, chain_config, log_callback, batch)
+        self.client = CoinGeckoClient(raw=True)  # Bodies go to storage undecoded
         self.cg_chain = chain_config.get('coingecko')
         self.cg_days = cg_days
         self.token_symbol = None
         self.coin_id = None
 
     def fetch_all(self):
-        """Fetch all CoinGecko endpoints."""
-        self.log("=" * 40, "info")
-        self.log("COINGECKO ENDPOINTS", "info")
-        self.log("=" * 40, "info")
-
-        # Get coin info first (needed for other endpoints)
-        self._fetch_coin_info()
-        self._fetch_price_endpoints()
-        self._fetch_coins_endpoints()
-        self._fetch_contract_endpoints()
-        self._fetch_category_endpoints()
-        self._fetch_exchange_endpoints()
-        self._fetch_derivatives_endpoints()
-        self._fetch_general_endpoints()
-        self._fetch_onchain_endpoints()
-
-        return self.token_symbol, self.coin_id
+        """Fetch all CoinGecko endpoints and return (token_symbol, coin_id)."""
+        context = super().fetch_all()
+        return context.get('token_symbol'), context.get('coin_id')
+
+    def initial_context(self):
+        """coin_id/token_symbol from the local coin index, so dependents don't wait on coin_info."""
+        try:
+            entry = get_coin_index().lookup(self.chain_name, self.contract_address)
+        except Exception as e:
+            self.log(f"Coin index lookup error: {str(e)[:50]}", "error")
+            return {}
+        if not entry:
+            return {}
+        self.token_symbol = entry['symbol'] or None
+        self.coin_id = entry['coingecko_id']
+        self.log(f"Coin Index: {self.token_symbol} (ID: {self.coin_id})", "info")
+        return {'token_symbol': self.token_symbol, 'coin_id': self.coin_id}
+
+    def tasks(self):
+        """All CoinGecko endpoints; coin_id/token_symbol come from the coin index or coin_info."""
+        return (
+            [self._coin_info_task()]
+            + self._price_tasks()
+            + self._coins_tasks()
+            + self._contract_tasks()
+            + self._category_tasks()
+            + self._exchange_tasks()
+            + self._derivatives_tasks()
+            + self._general_tasks()
+            + self._onchain_tasks()
+        )
+
+    def _coin_info_task(self):
+        """Coin info by contract - provides coin_id and token_symbol."""
+        return EndpointTask('coin_info', self.PROVIDER, lambda inputs: self._fetch_coin_info(),
+                            provides=('token_symbol', 'coin_id'))
 
     def _fetch_coin_info(self):
         """Fetch coin info by contract to get coin_id and symbol."""
-        try:
-            coin_info = self.client.get_coin_info_by_contract(self.cg_chain, self.contract_address)
-            self.save(coin_info, self.SOURCE, 'coin_info')
-            self.update_status("coin_info", True)
-            self.token_symbol = coin_info.get('symbol', '').upper()
-            self.coin_id = coin_info.get('id')
-            self.log(f"Coin Info: {self.token_symbol} (ID: {self.coin_id})", "success")
-        except Exception as e:
-            self.log(f"Coin Info error: {str(e)[:50]}", "error")
-            self.update_status("coin_info", False)
-
-    def _fetch_price_endpoints(self):
-        """Fetch simple/price endpoints."""
-        # Simple Price (requires coin_id)
-        try:
-            if self.coin_id:
-                data = self.client.get_simple_price([self.coin_id])
-                self.save(data, self.SOURCE, 'simple_price')
-                self.update_status("simple_price", True)
-                self.log("Simple Price fetched", "success")
-        except Exception as e:
-            self.update_status("simple_price", False)
-
-        # Token Price by Contract
-        try:
-            data = self.client.get_simple_token_price(self.cg_chain, self.contract_address)
-            self.save(data, self.SOURCE, 'simple_token_price')
-            self.update_status("simple_token_price", True)
-            self.log("Token Price by Contract fetched", "success")
-        except Exception as e:
-            self.update_status("simple_token_price", False)
-
-    def _fetch_coins_endpoints(self):
-        """Fetch coins-related endpoints."""
-        # Coins List
-        try:
-            data = self.client.get_coins_list()
-            self.save(data, self.SOURCE, 'coins_list')
-            self.update_status("coins_list", True)
-            self.log(f"Coins List: {len(data)} coins", "success")
-        except Exception as e:
-            self.update_status("coins_list", False)
-
-        # Coins Markets
-        try:
-            data = self.client.get_coins_markets(per_page=100)
-            self.save(data, self.SOURCE, 'coins_markets')
-            self.update_status("coins_markets", True)
-            self.log("Coins Markets fetched", "success")
-        except Exception as e:
-            self.update_status("coins_markets", False)
-
-        # Coin-specific endpoints (require coin_id)
-        if self.coin_id:
-            # Coin Data
-            try:
-                data = self.client.get_coin_data(self.coin_id)
-                self.save(data, self.SOURCE, 'coin_data')
-                self.update_status("coin_data", True)
-                self.log("Coin Data by ID fetched", "success")
-            except Exception as e:
-                self.update_status("coin_data", False)
-
-            # Coin Tickers
-            try:
-                data = self.client.get_coin_tickers(self.coin_id)
-                self.save(data, self.SOURCE, 'coin_tickers')
-                self.update_status("coin_tickers", True)
-                self.log("Coin Tickers fetched", "success")
-            except Exception as e:
-                self.update_status("coin_tickers", False)
-
-            # Coin Market Chart
-            try:
-                data = self.client.get_coin_market_chart(self.coin_id, days=self.cg_days)
-                self.save(data, self.SOURCE, 'coin_market_chart')
-                self.update_status("coin_market_chart", True)
-                self.log("Coin Market Chart fetched", "success")
-            except Exception as e:
-                self.update_status("coin_market_chart", False)
-
-            # Coin OHLC
-            try:
-                data = self.client.get_coin_ohlc(self.coin_id, days=30)
-                self.save(data, self.SOURCE, 'coin_ohlc')
-                self.update_status("coin_ohlc", True)
-                self.log("Coin OHLC fetched", "success")
-            except Exception as e:
-                self.update_status("coin_ohlc", False)
-        else:
-            for k in ["coin_data", "coin_tickers", "coin_market_chart", "coin_ohlc"]:
-                self.skip_status(k)
-
-    def _fetch_contract_endpoints(self):
-        """Fetch contract-based endpoints."""
-        try:
-            data = self.client.get_coin_historical_chart_by_contract(
-                self.cg_chain, self.contract_address, days=self.cg_days)
-            self.save(data, self.SOURCE, 'historical_chart')
-            self.update_status("historical_chart", True)
-            self.log("Chart by Contract fetched", "success")
-        except Exception as e:
-            self.update_status("historical_chart", False)
-
-    def _fetch_category_endpoints(self):
-        """Fetch category-related endpoints."""
-        try:
-            data = self.client.get_categories_list()
-            self.save(data, self.SOURCE, 'categories_list')
-            self.update_status("categories_list", True)
-            self.log("Categories List fetched", "success")
-        except Exception as e:
-            self.update_status("categories_list", False)
-
-        try:
-            data = self.client.get_categories()
-            self.save(data, self.SOURCE, 'categories')
-            self.update_status("categories", True)
-            self.log("Categories fetched", "success")
-        except Exception as e:
-            self.update_status("categories", False)
-
-    def _fetch_exchange_endpoints(self):
-        """Fetch exchange-related endpoints."""
-        try:
-            data = self.client.get_exchanges(per_page=50)
-            self.save(data, self.SOURCE, 'exchanges')
-            self.update_status("exchanges", True)
-            self.log("Exchanges fetched", "success")
-        except Exception as e:
-            self.update_status("exchanges", False)
-
-        try:
-            data = self.client.get_exchanges_list()
-            self.save(data, self.SOURCE, 'exchanges_list')
-            self.update_status("exchanges_list", True)
-            self.log("Exchanges List fetched", "success")
-        except Exception as e:
-            self.update_status("exchanges_list", False)
-
-    def _fetch_derivatives_endpoints(self):
-        """Fetch derivatives-related endpoints."""
-        try:
-            data = self.client.get_derivatives()
-            self.save(data, self.SOURCE, 'derivatives')
-            self.update_status("derivatives", True)
-            self.log("Derivatives fetched", "success")
-        except Exception as e:
-            self.update_status("derivatives", False)
-
-        try:
-            data = self.client.get_derivatives_exchanges()
-            self.save(data, self.SOURCE, 'derivatives_exchanges')
-            self.update_status("derivatives_exchanges", True)
-            self.log("Derivatives Exchanges fetched", "success")
-        except Exception as e:
-            self.update_status("derivatives_exchanges", False)
-
-    def _fetch_general_endpoints(self):
-        """Fetch general CoinGecko endpoints."""
-        # Asset Platforms
-        try:
-            data = self.client.get_asset_platforms()
-            self.save(data, self.SOURCE, 'asset_platforms')
-            self.update_status("asset_platforms", True)
-            self.log("Asset Platforms fetched", "success")
-        except Exception as e:
-            self.update_status("asset_platforms", False)
-
-        # Exchange Rates
-        try:
-            data = self.client.get_exchange_rates()
-            self.save(data, self.SOURCE, 'exchange_rates')
-            self.update_status("exchange_rates", True)
-            self.log("Exchange Rates fetched", "success")
-        except Exception as e:
-            self.update_status("exchange_rates", False)
-
-        # Search (requires token_symbol)
-        if self.token_symbol:
-            try:
-                data = self.client.search(self.token_symbol)
-                self.save(data, self.SOURCE, 'search')
-                self.update_status("search", True)
-                self.log(f"Search for {self.token_symbol} done", "success")
-            except Exception as e:
-                self.update_status("search", False)
-        else:
-            self.skip_status("search")
-
-        # Trending
-        try:
-            data = self.client.get_trending()
-            self.save(data, self.SOURCE, 'trending')
-            self.update_status("trending", True)
-            self.log("Trending fetched", "success")
-        except Exception as e:
-            self.update_status("trending", False)
-
-        # Global
-        try:
-            data = self.client.get_global()
-            self.save(data, self.SOURCE, 'global')
-            self.update_status("global", True)
-            self.log("Global data fetched", "success")
-        except Exception as e:
-            self.update_status("global", False)
-
-        # Global DeFi
-        try:
-            data = self.client.get_global_defi()
-            self.save(data, self.SOURCE, 'global_defi')
-            self.update_status("global_defi", True)
-            self.log("Global DeFi fetched", "success")
-        except Exception as e:
-            self.update_status("global_defi", False)
-
-    def _fetch_onchain_endpoints(self):
-        """Fetch onchain DEX endpoints."""
-        # Onchain Networks
-        try:
-            data = self.client.get_onchain_networks()
-            self.save(data, self.SOURCE, 'onchain_networks')
-            self.update_status("onchain_networks", True)
-            self.log("Onchain Networks fetched", "success")
-        except Exception as e:
-            self.update_status("onchain_networks", False)
-
-        # Onchain Token
-        try:
-            data = self.client.get_onchain_token(self.cg_chain, self.contract_address)
-            self.save(data, self.SOURCE, 'onchain_token')
-            self.update_status("onchain_token", True)
-            self.log("Onchain Token fetched", "success")
-        except Exception as e:
-            self.update_status("onchain_token", False)
-
-        # Onchain Token Pools
-        try:
-            data = self.client.get_onchain_token_pools(self.cg_chain, self.contract_address)
-            self.save(data, self.SOURCE, 'onchain_token_pools')
-            self.update_status("onchain_token_pools", True)
-            self.log("Onchain Token Pools fetched", "success")
-        except Exception as e:
-            self.update_status("onchain_token_pools", False)
-
-        # Onchain Trending Pools
-        try:
-            data = self.client.get_onchain_trending_pools()
-            self.save(data, self.SOURCE, 'onchain_trending_pools')
-            self.update_status("onchain_trending_pools", True)
-            self.log("Onchain Trending Pools fetched", "success")
-        except Exception as e:
-            self.update_status("onchain_trending_pools", False)
-
-        # Onchain New Pools
-        try:
-            data = self.client.get_onchain_new_pools()
-            self.save(data, self.SOURCE, 'onchain_new_pools')
-            self.update_status("onchain_new_pools", True)
-            self.log("Onchain New Pools fetched", "success")
-        except Exception as e:
-            self.update_status("onchain_new_pools", False)
+        coin_info = self.fetch_and_save('coin_info', self.client.get_coin_info_by_contract,
+                                        self.cg_chain, self.contract_address, source=self.SOURCE)
+        if not coin_info:
+            return None
+        self.token_symbol = coin_info.get('symbol', '').upper() or None
+        self.coin_id = coin_info.get('id')
+        self.log(f"Coin Info: {self.token_symbol} (ID: {self.coin_id})", "success")
+        return {'token_symbol': self.token_symbol, 'coin_id': self.coin_id}
+
+    def _fetch_coins_list(self):
+        """Coins list with platforms; also refreshes the local coin index."""
+        coins = self.client.get_coins_list(include_platform=True)
+        get_coin_index().update_from_coins_list(decode_payload(coins))
+        return coins
+
+    def _price_tasks(self):
+        """Simple/price endpoints."""
+        return [
+            self.task('simple_price', lambda coin_id: self.client.get_simple_price([coin_id]),
+                      requires=('coin_id',), log_msg="Simple Price fetched"),
+            self.task('simple_token_price',
+                      lambda: self.client.get_simple_token_price(self.cg_chain, self.contract_address),
+                      log_msg="Token Price by Contract fetched"),
+        ]
+
+    def _coins_tasks(self):
+        """Coins-related endpoints (coin-specific ones require coin_id)."""
+        return [
+            self.task('coins_list', self._fetch_coins_list,
+                      log_msg=lambda data: f"Coins List: {len(data)} coins"),
+            self.task('coins_markets', lambda: self.client.get_coins_markets(per_page=100),
+                      log_msg="Coins Markets fetched"),
+            self.task('coin_data', self.client.get_coin_data,
+                      requires=('coin_id',), log_msg="Coin Data by ID fetched"),
+            self.task('coin_tickers', self.client.get_coin_tickers,
+                      requires=('coin_id',), log_msg="Coin Tickers fetched"),
+            self.task('coin_market_chart', self._fetch_coin_market_chart,
+                      requires=('coin_id',), log_msg="Coin Market Chart fetched"),
+            self.task('coin_ohlc', lambda coin_id: self.client.get_coin_ohlc(coin_id, days=30),
+                      requires=('coin_id',), log_msg="Coin OHLC fetched"),
+        ]
+
+    def _contract_tasks(self):
+        """Contract-based endpoints."""
+        return [
+            self.task('historical_chart', self._fetch_historical_chart,
+                      log_msg="Chart by Contract fetched"),
+        ]
+
+    def _window_start(self):
+        """Start of the requested chart window (epoch 0 for days='max')"""
+        if self.cg_days == 'max':
+            return pd.Timestamp(0, tz='UTC')
+        return pd.Timestamp.now(tz='UTC') - pd.Timedelta(days=int(self.cg_days))
+
+    def _granularity(self):
+        """Point spacing CoinGecko uses for a days=cg_days chart (1 day: 5 min, up to 90: hourly, else daily)"""
+        if self.cg_days == 'max' or int(self.cg_days) > 90:
+            return '1D'
+        return '1h' if int(self.cg_days) > 1 else '5min'
+
+    def _fetch_chart(self, series, fetch_full, fetch_range):
+        """
+        Full window on the first fetch; afterwards only the range since the newest
+        stored point. The range response (finer points for short ranges) is merged
+        with the stored window and resampled to the window's granularity, so the
+        saved snapshot is the full window, as a days=cg_days call would return it.
+        Only a window stored at that granularity or finer goes incremental (daily
+        points of a days='max' fetch cannot make an hourly 90-day window).
+        """
+        start = self._window_start()
+        freq = self._granularity()
+        since = self.stored_since(series, start, freq)
+        if since is None:
+            data = fetch_full()
+            self.record_coverage(series, start, freq)
+            return data
+        self.log(f"{series}: incremental since {since:%Y-%m-%d %H:%M}", "info")
+        delta = fetch_range(int(since.timestamp()), int(pd.Timestamp.now(tz='UTC').timestamp()))
+        window = self.stored_window(series, start, delta, freq)
+        if window is None:
+            return fetch_full()
+        return market_chart_payload(window)
+
+    def _fetch_coin_market_chart(self, coin_id):
+        return self._fetch_chart(
+            'coin_market_chart',
+            lambda: self.client.get_coin_market_chart(coin_id, days=self.cg_days),
+            lambda start, end: self.client.get_coin_market_chart_range(
+                coin_id, from_timestamp=start, to_timestamp=end))
+
+    def _fetch_historical_chart(self):
+        return self._fetch_chart(
+            'historical_chart',
+            lambda: self.client.get_coin_historical_chart_by_contract(
+                self.cg_chain, self.contract_address, days=self.cg_days),
+            lambda start, end: self.client.get_coin_market_chart_range_by_contract(
+                self.cg_chain, self.contract_address, from_timestamp=start, to_timestamp=end))
+
+    def _category_tasks(self):
+        """Category-related endpoints."""
+        return [
+            self.task('categories_list', self.client.get_categories_list,
+                      log_msg="Categories List fetched"),
+            self.task('categories', self.client.get_categories,
+                      log_msg="Categories fetched"),
+        ]
+
+    def _exchange_tasks(self):
+        """Exchange-related endpoints."""
+        return [
+            self.task('exchanges', lambda: self.client.get_exchanges(per_page=50),
+                      log_msg="Exchanges fetched"),
+            self.task('exchanges_list', self.client.get_exchanges_list,
+                      log_msg="Exchanges List fetched"),
+        ]
+
+    def _derivatives_tasks(self):
+        """Derivatives-related endpoints."""
+        return [
+            self.task('derivatives', self.client.get_derivatives,
+                      log_msg="Derivatives fetched"),
+            self.task('derivatives_exchanges', self.client.get_derivatives_exchanges,
+                      log_msg="Derivatives Exchanges fetched"),
+        ]
+
+    def _general_tasks(self):
+        """General CoinGecko endpoints (search requires token_symbol)."""
+        return [
+            self.task('asset_platforms', self.client.get_asset_platforms,
+                      log_msg="Asset Platforms fetched"),
+            self.task('exchange_rates', self.client.get_exchange_rates,
+                      log_msg="Exchange Rates fetched"),
+            self.task('search', lambda token_symbol: self.client.search(token_symbol),
+                      requires=('token_symbol',), log_msg="Search for {token_symbol} done"),
+            self.task('trending', self.client.get_trending,
+                      log_msg="Trending fetched"),
+            self.task('global', self.client.get_global,
+                      log_msg="Global data fetched"),
+            self.task('global_defi', self.client.get_global_defi,
+                      log_msg="Global DeFi fetched"),
+        ]
+
+    def _onchain_tasks(self):
+        """Onchain DEX endpoints."""
+        return [
+            self.task('onchain_networks', self.client.get_onchain_networks,
+                      log_msg="Onchain Networks fetched"),
+            self.task('onchain_token',
+                      lambda: self.client.get_onchain_token(self.cg_chain, self.contract_address),
+                      log_msg="Onchain Token fetched"),
+            self.task('onchain_token_pools',
+                      lambda: self.client.get_onchain_token_pools(self.cg_chain, self.contract_address),
+                      log_msg="Onchain Token Pools fetched"),
+            self.task('onchain_trending_pools', self.client.get_onchain_trending_pools,
+                      log_msg="Onchain Trending Pools fetched"),
+            self.task('onchain_new_pools', self.client.get_onchain_new_pools,
+                      log_msg="Onchain New Pools fetched"),
+        ]
@@ -5,12 +5,17 @@ Main data fetcher orchestrator - coordinates all API fetchers.
 import streamlit as st
 from datetime import datetime, timedelta
 
-from config import SUPPORTED_CHAINS
+from config import FETCH_PERIOD_DAYS, SUPPORTED_CHAINS
+from api_clients.validator_cache import get_validator_cache
+from data_handlers.storage import flush_storage
+from data_handlers.write_batch import WriteBatch
+from data_handlers.write_queue import get_write_queue
 from constants.endpoints import ENDPOINT_MAPPING
 from utils.logger import log_to_ui as log_to_ui_util
 from services.defillama_fetcher import DefiLlamaFetcher
 from services.coingecko_fetcher import CoinGeckoFetcher
 from services.nansen_fetcher import NansenFetcher
+from services.executor import DagExecutor
 
 
 def fetch_all_data(chain_name: str, contract_address: str, period: str = "3 months",
@@ -29,6 +34,7 @@ def fetch_all_data(chain_name: str, contract_address: str, period: str = "3 mont
     # Reset session state
     st.session_state.logs = []
     st.session_state.endpoint_status = {}
+    st.session_state.endpoint_meta = {}
 
     # Theme colors
     bg_color = "#0c0c0c" if theme == "Dark" else "#f0f2f6"
@@ -58,46 +64,79 @@ def fetch_all_data(chain_name: str, contract_address: str, period: str = "3 mont
 
     # Calculate dates
     end_date_obj = datetime.now()
-    days_map = {"3 months": 90, "6 months": 180, "1 year": 365}
-    days = days_map.get(period, 365 * 3)
+    days = FETCH_PERIOD_DAYS.get(period, 365 * 3)
     start_date_obj = end_date_obj - timedelta(days=days)
     start_date_str = start_date_obj.strftime("%Y-%m-%d")
     end_date_str = end_date_obj.strftime("%Y-%m-%d")
     cg_days = str(days) if period != "All" else "max"
 
-    # Initialize and run fetchers
+    # Process-wide validator counters: report the difference over this fetch
+    http_cache_before = get_validator_cache().stats()
+
+    # Storage work of this fetch only (other sessions share the writers)
+    batch = WriteBatch()
+
+    # Initialize fetchers and run all endpoints as one dependency graph
     try:
         log_to_ui("Initializing API clients...", "info")
 
-        # DefiLlama
-        dl_fetcher = DefiLlamaFetcher(
-            chain_name, contract_address, user_id, chain_config,
-            log_callback=log_to_ui
-        )
-        dl_fetcher.fetch_all()
-
-        # CoinGecko
-        cg_fetcher = CoinGeckoFetcher(
-            chain_name, contract_address, user_id, chain_config, cg_days,
-            log_callback=log_to_ui
-        )
-        token_symbol, coin_id = cg_fetcher.fetch_all()
-
-        # Nansen
-        ns_fetcher = NansenFetcher(
-            chain_name, contract_address, user_id, chain_config,
-            start_date_str, end_date_str, token_symbol,
-            log_callback=log_to_ui
-        )
-        ns_fetcher.fetch_all()
+        fetchers = [
+            DefiLlamaFetcher(
+                chain_name, contract_address, user_id, chain_config,
+                log_callback=log_to_ui, batch=batch, days=days
+            ),
+            CoinGeckoFetcher(
+                chain_name, contract_address, user_id, chain_config, cg_days,
+                log_callback=log_to_ui, batch=batch
+            ),
+            # token_symbol is provided by CoinGecko coin_info inside the graph
+            NansenFetcher(
+                chain_name, contract_address, user_id, chain_config,
+                start_date_str, end_date_str,
+                log_callback=log_to_ui, batch=batch
+            ),
+        ]
+
+        tasks = []
+        context = {}
+        for fetcher in fetchers:
+            tasks.extend(fetcher.tasks())
+            context.update(fetcher.initial_context())
+
+        log_to_ui("=" * 40, "info")
+        log_to_ui(f"FETCHING {len(tasks)} ENDPOINTS (DefiLlama, CoinGecko, Nansen in parallel)", "info")
+        log_to_ui("=" * 40, "info")
+        DagExecutor().run(tasks, context)
 
     except Exception as e:
         log_to_ui(f"Client init error: {str(e)}", "error")
         return
 
+    # Wait for this fetch's queued snapshot writes, then its uploads and rows, before reporting
+    writes = get_write_queue().flush(batch=batch)
+    if writes['written'] or writes['failed']:
+        log_to_ui(f"Storage: {writes['written']} snapshots written, {writes['failed']} failed",
+                  "error" if writes['failed'] else "success")
+    flushed = flush_storage(batch=batch)
+    uploads = flushed['gcs']
+    failed = [uri for uri, result in uploads.items() if isinstance(result, dict)]
+    if uploads:
+        log_to_ui(f"GCS: {len(uploads) - len(failed)}/{len(uploads)} uploads done",
+                  "error" if failed else "success")
+    loads = flushed['bigquery']
+    failed = [table for table, result in loads.items() if isinstance(result, dict)]
+    if loads:
+        rows = sum(result for result in loads.values() if isinstance(result, int))
+        log_to_ui(f"BigQuery: {rows} rows loaded into {len(loads) - len(failed)}/{len(loads)} tables",
+                  "error" if failed else "success")
+
     # Summary
     log_to_ui("=" * 40, "info")
     total = len(ENDPOINT_MAPPING)
     done = sum(1 for v in st.session_state.endpoint_status.values() if "done" in v)
     log_to_ui(f"COMPLETED: {done}/{total} endpoints", "success")
+    http_cache_after = get_validator_cache().stats()
+    http_cache = {k: http_cache_after[k] - http_cache_before[k] for k in http_cache_before}
+    log_to_ui(f"HTTP cache (this fetch): {http_cache['hits']} not modified / {http_cache['misses']} downloaded, "
+              f"{http_cache['bytes_saved'] / 1e6:.1f} MB saved", "info")
     st.session_state.fetched_data['last_updated'] = datetime.now()
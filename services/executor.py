@@ -0,0 +1,136 @@
+"""
+Dependency-aware concurrent executor for endpoint fetches.
+
+Each endpoint is an EndpointTask that declares the inputs it requires
+(e.g. 'coin_id') and the values it provides. Tasks whose inputs are resolved
+run in parallel on a thread pool, capped per provider.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from config import FETCH_CONCURRENCY
+
+logger = logging.getLogger('executor')
+
+
+class EndpointTask:
+    """A single endpoint fetch with declared inputs and outputs."""
+
+    def __init__(self, key: str, provider: str, run, requires=(), provides=(), on_skip=None):
+        """
+        Args:
+            key: Endpoint key (e.g. 'simple_price')
+            provider: Concurrency group (key of FETCH_CONCURRENCY)
+            run: Callable(inputs: dict) -> dict of provided values or None
+            requires: Names of inputs that must be resolved before running
+            provides: Names of values this task may resolve
+            on_skip: Callable invoked if a required input can never be resolved
+        """
+        self.key = key
+        self.provider = provider
+        self.run = run
+        self.requires = tuple(requires)
+        self.provides = tuple(provides)
+        self.on_skip = on_skip
+
+
+def _attach_streamlit_context(ctx):
+    """Thread initializer: let worker threads use st.session_state."""
+    if ctx is None:
+        return
+    from streamlit.runtime.scriptrunner import add_script_run_ctx
+    add_script_run_ctx(threading.current_thread(), ctx)
+
+
+def _get_streamlit_context():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        return get_script_run_ctx()
+    except Exception:
+        return None
+
+
+class DagExecutor:
+    """Run EndpointTasks in dependency order with per-provider concurrency caps."""
+
+    def __init__(self, concurrency: dict = None):
+        self.concurrency = concurrency or FETCH_CONCURRENCY
+
+    def _cap(self, provider):
+        return self.concurrency.get(provider, self.concurrency.get('DEFAULT', 1))
+
+    def run(self, tasks, context: dict = None) -> dict:
+        """
+        Execute tasks and return the resolved context.
+
+        Args:
+            tasks: List of EndpointTask
+            context: Pre-resolved inputs (e.g. {'token_symbol': 'ETH'})
+
+        Returns:
+            Context dict with every value resolved by the tasks
+        """
+        context = {k: v for k, v in (context or {}).items() if v is not None}
+        pending = list(tasks)
+        running = {}  # future -> task
+        active = {}   # provider -> running count
+
+        providers = {t.provider for t in pending}
+        max_workers = max(1, sum(self._cap(p) for p in providers))
+
+        with ThreadPoolExecutor(max_workers=max_workers,
+                                thread_name_prefix='fetch',
+                                initializer=_attach_streamlit_context,
+                                initargs=(_get_streamlit_context(),)) as pool:
+            while pending or running:
+                self._skip_unresolvable(pending, running, context)
+
+                # Submit every ready task that fits under its provider cap
+                for task in list(pending):
+                    if any(name not in context for name in task.requires):
+                        continue
+                    if active.get(task.provider, 0) >= self._cap(task.provider):
+                        continue
+                    inputs = {name: context[name] for name in task.requires}
+                    running[pool.submit(task.run, inputs)] = task
+                    active[task.provider] = active.get(task.provider, 0) + 1
+                    pending.remove(task)
+
+                if not running:
+                    # Nothing ready and nothing in flight: remaining inputs form a cycle
+                    for task in pending:
+                        if task.on_skip:
+                            task.on_skip()
+                    break
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    active[task.provider] -= 1
+                    try:
+                        provided = future.result()
+                    except Exception as e:
+                        logger.error(f"Task {task.key} crashed: {e}")
+                        provided = None
+                    for name, value in (provided or {}).items():
+                        if value is not None:
+                            context[name] = value
+
+        return context
+
+    @staticmethod
+    def _skip_unresolvable(pending, running, context):
+        """Skip tasks whose inputs are missing and that no unfinished task can provide."""
+        while True:
+            unfinished = pending + list(running.values())
+            providable = {name for t in unfinished for name in t.provides}
+            blocked = [t for t in pending
+                       if any(n not in context and n not in providable for n in t.requires)]
+            if not blocked:
+                return
+            for task in blocked:
+                pending.remove(task)
+                if task.on_skip:
+                    task.on_skip()
@@ -10,229 +10,115 @@ class NansenFetcher(BaseFetcher):
     """Fetcher for Nansen API endpoints."""
 
     SOURCE = "nansen"
+    PROVIDER = "NANSEN"
+    TITLE = "NANSEN"
 
     def __init__(self, chain_name: str, contract_address: str, user_id: str,
                  chain_config: dict, start_date: str, end_date: str,
-                 token_symbol: str = None, log_callback=None):
-        super().__init__(chain_name, contract_address, user_id, chain_config, log_callback)
-        self.client = NansenClient()
+                 token_symbol: str = None, log_callback=None, batch=None):
+        super().__init__(chain_name, contract_address, user_id, chain_config, log_callback, batch)
+        self.client = NansenClient(raw=True)  # Bodies go to storage undecoded
         self.nansen_chain = chain_config.get('nansen')
         self.start_date = start_date
         self.end_date = end_date
         self.token_symbol = token_symbol
 
-    def fetch_all(self):
-        """Fetch all Nansen endpoints."""
-        self.log("=" * 40, "info")
-        self.log("NANSEN ENDPOINTS", "info")
-        self.log("=" * 40, "info")
-
-        self._fetch_smart_money_endpoints()
-        self._fetch_profiler_endpoints()
-        self._fetch_token_endpoints()
-        self._fetch_perp_endpoints()
-        self._fetch_portfolio_endpoints()
-
-    def _fetch_smart_money_endpoints(self):
-        """Fetch Smart Money endpoints."""
-        # Smart Money Netflow
-        try:
-            data = self.client.get_smart_money_netflow([self.nansen_chain])
-            self.save(data, self.SOURCE, 'sm_netflow')
-            self.update_status("sm_netflow", True)
-            self.log("Smart Money Netflow fetched", "success")
-        except Exception as e:
-            self.update_status("sm_netflow", False)
-
-        # Smart Money Holdings
-        try:
-            data = self.client.get_smart_money_holdings([self.nansen_chain])
-            self.save(data, self.SOURCE, 'sm_holdings')
-            self.update_status("sm_holdings", True)
-            self.log("Smart Money Holdings fetched", "success")
-        except Exception as e:
-            self.update_status("sm_holdings", False)
-
-        # Smart Money DEX Trades
-        try:
-            data = self.client.get_smart_money_dex_trades([self.nansen_chain])
-            self.save(data, self.SOURCE, 'sm_dex_trades')
-            self.update_status("sm_dex_trades", True)
-            self.log("Smart Money DEX Trades fetched", "success")
-        except Exception as e:
-            self.update_status("sm_dex_trades", False)
-
-    def _fetch_profiler_endpoints(self):
-        """Fetch Profiler endpoints (using contract as address)."""
-        # Address Balance
-        try:
-            data = self.client.get_address_current_balance(self.contract_address, self.nansen_chain)
-            self.save(data, self.SOURCE, 'address_balance')
-            self.update_status("address_balance", True)
-            self.log("Address Balance fetched", "success")
-        except Exception as e:
-            self.update_status("address_balance", False)
-
-        # Address Transactions
-        try:
-            data = self.client.get_address_transactions(self.contract_address, self.nansen_chain)
-            self.save(data, self.SOURCE, 'address_transactions')
-            self.update_status("address_transactions", True)
-            self.log("Address Transactions fetched", "success")
-        except Exception as e:
-            self.update_status("address_transactions", False)
-
-        # Address Related Wallets
-        try:
-            data = self.client.get_address_related_wallets(self.contract_address, self.nansen_chain)
-            self.save(data, self.SOURCE, 'address_related_wallets')
-            self.update_status("address_related_wallets", True)
-            self.log("Address Related Wallets fetched", "success")
-        except Exception as e:
-            self.update_status("address_related_wallets", False)
-
-        # Address Counterparties
-        try:
-            data = self.client.get_address_counterparties(self.contract_address, self.nansen_chain)
-            self.save(data, self.SOURCE, 'address_counterparties')
-            self.update_status("address_counterparties", True)
-            self.log("Address Counterparties fetched", "success")
-        except Exception as e:
-            self.update_status("address_counterparties", False)
-
-        # Address PnL
-        try:
-            data = self.client.get_address_pnl(self.contract_address, self.nansen_chain)
-            self.save(data, self.SOURCE, 'address_pnl')
-            self.update_status("address_pnl", True)
-            self.log("Address PnL fetched", "success")
-        except Exception as e:
-            self.update_status("address_pnl", False)
-
-    def _fetch_token_endpoints(self):
-        """Fetch TGM Token endpoints."""
-        # Token Screener
-        try:
-            data = self.client.get_token_screener([self.nansen_chain])
-            self.save(data, self.SOURCE, 'token_screener')
-            self.update_status("token_screener", True)
-            self.log("Token Screener fetched", "success")
-        except Exception as e:
-            self.update_status("token_screener", False)
-
-        # Token Flows
-        try:
-            data = self.client.get_token_flows(self.contract_address, self.nansen_chain)
-            self.save(data, self.SOURCE, 'token_flows')
-            self.update_status("token_flows", True)
-            self.log("Token Flows fetched", "success")
-        except Exception as e:
-            self.update_status("token_flows", False)
-
-        # Flow Intelligence
-        try:
-            data = self.client.get_token_flow_intelligence(self.contract_address, self.nansen_chain)
-            self.save(data, self.SOURCE, 'flow_intelligence')
-            self.update_status("flow_intelligence", True)
-            self.log("Flow Intelligence fetched", "success")
-        except Exception as e:
-            self.update_status("flow_intelligence", False)
-
-        # Who Bought/Sold
-        try:
-            data = self.client.get_token_who_bought_sold(
-                self.contract_address, self.nansen_chain, self.start_date, self.end_date)
-            self.save(data, self.SOURCE, 'who_bought_sold')
-            self.update_status("who_bought_sold", True)
-            self.log("Who Bought/Sold fetched", "success")
-        except Exception as e:
-            self.update_status("who_bought_sold", False)
-
-        # Token DEX Trades
-        try:
-            data = self.client.get_token_dex_trades(self.contract_address, self.nansen_chain)
-            self.save(data, self.SOURCE, 'token_dex_trades')
-            self.update_status("token_dex_trades", True)
-            self.log("Token DEX Trades fetched", "success")
-        except Exception as e:
-            self.update_status("token_dex_trades", False)
-
-        # Token Transfers
-        try:
-            data = self.client.get_token_transfers(
-                self.contract_address, self.nansen_chain, self.start_date, self.end_date)
-            self.save(data, self.SOURCE, 'transfers')
-            self.update_status("transfers", True)
-            self.log("Token Transfers fetched", "success")
-        except Exception as e:
-            self.update_status("transfers", False)
-
-        # Token Holders
-        try:
-            data = self.client.get_token_holders(self.contract_address, self.nansen_chain)
-            self.save(data, self.SOURCE, 'holders')
-            self.update_status("holders", True)
-            self.log("Token Holders fetched", "success")
-        except Exception as e:
-            self.update_status("holders", False)
-
-        # Token PnL Leaderboard
-        try:
-            data = self.client.get_token_pnl_leaderboard(self.contract_address, self.nansen_chain)
-            self.save(data, self.SOURCE, 'token_pnl_leaderboard')
-            self.update_status("token_pnl_leaderboard", True)
-            self.log("Token PnL Leaderboard fetched", "success")
-        except Exception as e:
-            self.update_status("token_pnl_leaderboard", False)
-
-    def _fetch_perp_endpoints(self):
-        """Fetch TGM Perp endpoints."""
-        # Perp Screener
-        try:
-            data = self.client.get_perp_screener()
-            self.save(data, self.SOURCE, 'perp_screener')
-            self.update_status("perp_screener", True)
-            self.log("Perp Screener fetched", "success")
-        except Exception as e:
-            self.update_status("perp_screener", False)
-
-        # Token Perp Trades & Positions (requires token_symbol)
-        if self.token_symbol:
-            try:
-                data = self.client.get_token_perp_trades(
-                    self.token_symbol, self.start_date, self.end_date)
-                self.save(data, self.SOURCE, 'perp_trades')
-                self.update_status("perp_trades", True)
-                self.log(f"Perp Trades for {self.token_symbol} fetched", "success")
-            except Exception as e:
-                self.update_status("perp_trades", False)
-
-            try:
-                data = self.client.get_token_perp_positions(self.token_symbol)
-                self.save(data, self.SOURCE, 'perp_positions')
-                self.update_status("perp_positions", True)
-                self.log(f"Perp Positions for {self.token_symbol} fetched", "success")
-            except Exception as e:
-                self.update_status("perp_positions", False)
-        else:
-            self.skip_status("perp_trades")
-            self.skip_status("perp_positions")
-
-        # Perp PnL Leaderboard
-        try:
-            data = self.client.get_perp_pnl_leaderboard()
-            self.save(data, self.SOURCE, 'perp_pnl_leaderboard')
-            self.update_status("perp_pnl_leaderboard", True)
-            self.log("Perp PnL Leaderboard fetched", "success")
-        except Exception as e:
-            self.update_status("perp_pnl_leaderboard", False)
-
-    def _fetch_portfolio_endpoints(self):
-        """Fetch Portfolio endpoints."""
-        try:
-            data = self.client.get_defi_holdings([self.contract_address], [self.nansen_chain])
-            self.save(data, self.SOURCE, 'defi_holdings')
-            self.update_status("defi_holdings", True)
-            self.log("DeFi Holdings fetched", "success")
-        except Exception as e:
-            self.update_status("defi_holdings", False)
+    def initial_context(self):
+        """token_symbol may be known up front (otherwise CoinGecko provides it)."""
+        return {'token_symbol': self.token_symbol} if self.token_symbol else {}
+
+    def tasks(self):
+        """All Nansen endpoints; perp trades/positions require token_symbol."""
+        return (
+            self._smart_money_tasks()
+            + self._profiler_tasks()
+            + self._token_tasks()
+            + self._perp_tasks()
+            + self._portfolio_tasks()
+        )
+
+    def _smart_money_tasks(self):
+        """Smart Money endpoints."""
+        chains = [self.nansen_chain]
+        return [
+            self.task('sm_netflow', lambda: self.client.get_smart_money_netflow(chains),
+                      log_msg="Smart Money Netflow fetched", cache_params=chains),
+            self.task('sm_holdings', lambda: self.client.get_smart_money_holdings(chains),
+                      log_msg="Smart Money Holdings fetched", cache_params=chains),
+            self.task('sm_dex_trades', lambda: self.client.get_smart_money_dex_trades(chains),
+                      log_msg="Smart Money DEX Trades fetched", cache_params=chains),
+        ]
+
+    def _profiler_tasks(self):
+        """Profiler endpoints (using contract as address)."""
+        address, chain = self.contract_address, self.nansen_chain
+        return [
+            self.task('address_balance',
+                      lambda: self.client.get_address_current_balance(address, chain),
+                      log_msg="Address Balance fetched"),
+            self.task('address_transactions',
+                      lambda: self.client.get_address_transactions(address, chain),
+                      log_msg="Address Transactions fetched"),
+            self.task('address_related_wallets',
+                      lambda: self.client.get_address_related_wallets(address, chain),
+                      log_msg="Address Related Wallets fetched"),
+            self.task('address_counterparties',
+                      lambda: self.client.get_address_counterparties(address, chain),
+                      log_msg="Address Counterparties fetched"),
+            self.task('address_pnl',
+                      lambda: self.client.get_address_pnl(address, chain),
+                      log_msg="Address PnL fetched"),
+        ]
+
+    def _token_tasks(self):
+        """TGM Token endpoints."""
+        address, chain = self.contract_address, self.nansen_chain
+        return [
+            self.task('token_screener', lambda: self.client.get_token_screener([chain]),
+                      log_msg="Token Screener fetched", cache_params=(chain,)),
+            self.task('token_flows', lambda: self.client.get_token_flows(address, chain),
+                      log_msg="Token Flows fetched"),
+            self.task('flow_intelligence',
+                      lambda: self.client.get_token_flow_intelligence(address, chain),
+                      log_msg="Flow Intelligence fetched"),
+            self.task('who_bought_sold',
+                      lambda: self.client.get_token_who_bought_sold(
+                          address, chain, self.start_date, self.end_date),
+                      log_msg="Who Bought/Sold fetched"),
+            self.task('token_dex_trades', lambda: self.client.get_token_dex_trades(address, chain),
+                      log_msg="Token DEX Trades fetched"),
+            self.task('transfers',
+                      lambda: self.client.get_token_transfers(
+                          address, chain, self.start_date, self.end_date),
+                      log_msg="Token Transfers fetched"),
+            self.task('holders', lambda: self.client.get_token_holders(address, chain),
+                      log_msg="Token Holders fetched"),
+            self.task('token_pnl_leaderboard',
+                      lambda: self.client.get_token_pnl_leaderboard(address, chain),
+                      log_msg="Token PnL Leaderboard fetched"),
+        ]
+
+    def _perp_tasks(self):
+        """TGM Perp endpoints."""
+        return [
+            self.task('perp_screener', self.client.get_perp_screener,
+                      log_msg="Perp Screener fetched"),
+            self.task('perp_trades',
+                      lambda token_symbol: self.client.get_token_perp_trades(
+                          token_symbol, self.start_date, self.end_date),
+                      requires=('token_symbol',),
+                      log_msg="Perp Trades for {token_symbol} fetched"),
+            self.task('perp_positions', self.client.get_token_perp_positions,
+                      requires=('token_symbol',),
+                      log_msg="Perp Positions for {token_symbol} fetched"),
+            self.task('perp_pnl_leaderboard', self.client.get_perp_pnl_leaderboard,
+                      log_msg="Perp PnL Leaderboard fetched"),
+        ]
+
+    def _portfolio_tasks(self):
+        """Portfolio endpoints."""
+        return [
+            self.task('defi_holdings',
+                      lambda: self.client.get_defi_holdings([self.contract_address], [self.nansen_chain]),
+                      log_msg="DeFi Holdings fetched"),
+        ]
@@ -0,0 +1,111 @@
+"""
+Process-wide TTL cache for token-independent endpoints.
+Shared by every fetcher, user and Streamlit session in the process, so
+e.g. coins_list is downloaded once per TTL instead of once per Fetch.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger('response_cache')
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+class ResponseCache:
+    """
+    Thread-safe TTL cache keyed by (provider, endpoint, params).
+    Concurrent misses on the same key wait for a single fetch (no stampede).
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = {}  # key -> (expires_at, value)
+        self._key_locks = {}  # key -> [lock, users] while a miss on key is in flight
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.hits += 1
+                return True, entry[1]
+            return False, None
+
+    def _acquire_key(self, key):
+        """Take the single-flight lock of key (created on first use)"""
+        with self._lock:
+            slot = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            slot[1] += 1
+        slot[0].acquire()
+        return slot
+
+    def _release_key(self, key, slot):
+        """Release key's lock; the last user removes it so locks don't pile up per key"""
+        slot[0].release()
+        with self._lock:
+            slot[1] -= 1
+            if slot[1] == 0:
+                del self._key_locks[key]
+
+    def _store(self, key, value, ttl):
+        with self._lock:
+            now = time.monotonic()
+            if len(self._entries) >= self.max_entries:
+                # Drop expired entries first, then the ones closest to expiry
+                for k in [k for k, (exp, _) in self._entries.items() if exp <= now]:
+                    del self._entries[k]
+                while len(self._entries) >= self.max_entries:
+                    del self._entries[min(self._entries, key=lambda k: self._entries[k][0])]
+            self._entries[key] = (now + ttl, value)
+
+    def get_or_fetch(self, key, ttl, fetch_func):
+        """
+        Return (value, hit): cached value if still fresh, else fetch_func() cached for ttl.
+
+        Args:
+            key: Hashable cache key
+            ttl: Time to live in seconds
+            fetch_func: Called without arguments on a miss (None results are not cached)
+        """
+        hit, value = self._lookup(key)
+        if hit:
+            return value, True
+        slot = self._acquire_key(key)
+        try:
+            hit, value = self._lookup(key)  # Filled while we waited
+            if hit:
+                return value, True
+            with self._lock:
+                self.misses += 1
+            value = fetch_func()
+            if value is not None:
+                self._store(key, value, ttl)
+            return value, False
+        finally:
+            self._release_key(key, slot)
+
+    def invalidate(self, provider=None):
+        """Drop all entries (or only those of one provider)"""
+        with self._lock:
+            for key in list(self._entries):
+                if provider is None or key[0] == provider:
+                    del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+def get_response_cache():
+    """Get the process-wide ResponseCache (lazy init)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
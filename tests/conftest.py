@@ -0,0 +1,15 @@
+"""Shared fixtures: a temporary snapshot catalog behind local storage."""
+import pytest
+
+from data_handlers import storage
+from data_handlers.catalog import SnapshotCatalog
+
+
+@pytest.fixture
+def catalog(monkeypatch, tmp_path):
+    """Empty catalog under tmp_path, with storage writing locally to tmp_path/data"""
+    catalog = SnapshotCatalog(str(tmp_path / 'catalog.sqlite'))
+    monkeypatch.setattr(storage, 'DATA_DIR', str(tmp_path / 'data'))
+    monkeypatch.setattr(storage, 'STORAGE_MODE', 'local')
+    monkeypatch.setattr(storage, 'get_catalog', lambda: catalog)
+    return catalog
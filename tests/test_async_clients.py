@@ -0,0 +1,143 @@
+"""Async clients: same methods as the sync ones, sending the same requests, same results."""
+import asyncio
+import inspect
+import json
+
+import pytest
+import requests
+
+from api_clients.coingecko_client import AsyncCoinGeckoClient, CoinGeckoClient
+from api_clients.defillama_client import AsyncDefiLlamaClient, DefiLlamaClient
+from api_clients.http_transport import HttpResponse
+from api_clients.nansen_client import AsyncNansenClient, NansenClient
+from data_handlers.raw_payload import RawPayload
+
+PAIRS = [(DefiLlamaClient, AsyncDefiLlamaClient), (CoinGeckoClient, AsyncCoinGeckoClient),
+         (NansenClient, AsyncNansenClient)]
+
+CALLS = [
+    (DefiLlamaClient, AsyncDefiLlamaClient, 'get_price_chart', (['ethereum:0xa'],), {'start': 1, 'span': 2}),
+    (DefiLlamaClient, AsyncDefiLlamaClient, 'get_all_protocols', (), {}),
+    (CoinGeckoClient, AsyncCoinGeckoClient, 'get_coin_market_chart', ('abc',), {'days': '90'}),
+    (CoinGeckoClient, AsyncCoinGeckoClient, 'get_coin_info_by_contract', ('ethereum', '0xa'), {}),
+    (NansenClient, AsyncNansenClient, 'get_address_current_balance', ('0xa', 'ethereum'), {}),
+    (NansenClient, AsyncNansenClient, 'get_token_flow_intelligence', ('0xa', 'ethereum'), {}),
+]
+
+
+class RecordingTransport:
+    def __init__(self, status=200):
+        self.status = status
+        self.requests = []
+
+    def _respond(self, kwargs):
+        self.requests.append(kwargs)
+        return HttpResponse(self.status, {'content-type': 'application/json'}, b'{"data": [1]}', kwargs['url'])
+
+    def request(self, **kwargs):
+        return self._respond(kwargs)
+
+
+class AsyncRecordingTransport(RecordingTransport):
+    async def request(self, **kwargs):
+        return self._respond(kwargs)
+
+    async def close(self):
+        pass
+
+
+def _public_methods(cls):
+    return {name for name, _ in inspect.getmembers(cls, callable) if not name.startswith('_')} - {'close'}
+
+
+@pytest.mark.parametrize('sync_cls, async_cls', PAIRS)
+def test_async_clients_have_the_sync_method_surface(sync_cls, async_cls):
+    assert _public_methods(sync_cls) == _public_methods(async_cls)
+    # Shared base methods return _send's coroutine on the async clients, so compare signatures only
+    for name in _public_methods(sync_cls):
+        assert inspect.signature(getattr(sync_cls, name)) == inspect.signature(getattr(async_cls, name)), name
+
+
+@pytest.mark.parametrize('raw', [False, True])
+@pytest.mark.parametrize('sync_cls, async_cls, method, args, kwargs', CALLS)
+def test_async_clients_send_the_same_requests(sync_cls, async_cls, method, args, kwargs, raw):
+    sync_transport, async_transport = RecordingTransport(), AsyncRecordingTransport()
+    sync_result = getattr(sync_cls(api_key='k', transport=sync_transport, raw=raw), method)(*args, **kwargs)
+
+    async def run():
+        async with async_cls(api_key='k', transport=async_transport, raw=raw) as client:
+            return await getattr(client, method)(*args, **kwargs)
+
+    async_result = asyncio.run(run())
+    assert async_transport.requests == sync_transport.requests
+    if raw and isinstance(sync_result, RawPayload):
+        assert isinstance(async_result, RawPayload) and async_result.content == sync_result.content
+    else:
+        assert async_result == sync_result
+
+
+def test_async_clients_raise_the_same_http_errors():
+    async def run():
+        async with AsyncCoinGeckoClient(api_key='k', transport=AsyncRecordingTransport(status=404)) as client:
+            await client.get_coin_info_by_contract('ethereum', '0xa')
+
+    with pytest.raises(requests.HTTPError):
+        CoinGeckoClient(api_key='k', transport=RecordingTransport(status=404)).get_coin_info_by_contract(
+            'ethereum', '0xa')
+    with pytest.raises(requests.HTTPError):
+        asyncio.run(run())
+
+
+def _timeframe(kwargs):
+    return json.loads(kwargs['data'])['timeframe']
+
+
+class FlowTransport(RecordingTransport):
+    """500 for the 1h timeframe, and (async only) a sub-request cancelled on its own for 6h"""
+
+    def _respond(self, kwargs):
+        if _timeframe(kwargs) == '1h':
+            self.requests.append(kwargs)
+            return HttpResponse(500, {}, b'down', kwargs['url'])
+        return super()._respond(kwargs)
+
+
+class AsyncFlowTransport(FlowTransport):
+    def __init__(self, block=None):
+        super().__init__()
+        self.block = block
+
+    async def request(self, **kwargs):
+        if _timeframe(kwargs) == '6h':
+            raise asyncio.CancelledError()
+        if self.block is not None:
+            await self.block.wait()
+        return self._respond(kwargs)
+
+    async def close(self):
+        pass
+
+
+def test_async_flow_intelligence_keeps_partial_results():
+    sync_result = NansenClient(api_key='k', transport=FlowTransport()).get_token_flow_intelligence('0xa', 'ethereum')
+
+    async def run():
+        async with AsyncNansenClient(api_key='k', transport=AsyncFlowTransport()) as client:
+            return await client.get_token_flow_intelligence('0xa', 'ethereum')
+
+    result = asyncio.run(run())
+    assert result['1h'] == sync_result['1h'] and '500' in result['1h']['error']
+    assert result['6h'] == {'error': 'CancelledError'}
+    assert result['5m'] == result['7d'] == sync_result['5m'] == {'data': [1]}
+
+
+def test_cancelling_async_flow_intelligence_cancels_it():
+    async def run():
+        client = AsyncNansenClient(api_key='k', transport=AsyncFlowTransport(block=asyncio.Event()))
+        task = asyncio.ensure_future(client.get_token_flow_intelligence('0xa', 'ethereum'))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await task
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(run())
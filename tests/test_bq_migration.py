@@ -0,0 +1,85 @@
+"""Snapshot table migration: verified copy, rename swap, the original never dropped first."""
+import pytest
+
+from data_handlers.bq_writer import SNAPSHOT_CLUSTER_FIELDS, SNAPSHOT_PARTITION_FIELD, migrate_snapshot_table
+
+TABLE = 'p.d.defillama_tvl'
+
+
+class FakeTable:
+    def __init__(self, rows, partitioned=False):
+        self.rows = rows
+        self.time_partitioning = type('P', (), {'field': SNAPSHOT_PARTITION_FIELD})() if partitioned else None
+        self.clustering_fields = SNAPSHOT_CLUSTER_FIELDS if partitioned else None
+
+
+class FakeJob:
+    def __init__(self, rows=()):
+        self.rows = rows
+
+    def result(self):
+        return iter(self.rows)
+
+
+class FakeBigQueryClient:
+    """Tables by ref; understands the CTAS, COUNT and RENAME statements the migration issues"""
+
+    def __init__(self, rows, copy_loses=0, fail_rename=None):
+        self.tables = {TABLE: FakeTable(rows)}
+        self.copy_loses = copy_loses
+        self.fail_rename = fail_rename
+        self.log = []
+
+    def get_table(self, ref):
+        return self.tables[ref]
+
+    def delete_table(self, ref, not_found_ok=False):
+        self.log.append(('delete', ref))
+        self.tables.pop(ref)
+
+    def query(self, sql):
+        ref = sql.split('`')[1]
+        if sql.startswith('CREATE OR REPLACE TABLE'):
+            source = sql.split('`')[3]
+            self.log.append(('create', ref))
+            self.tables[ref] = FakeTable(self.tables[source].rows - self.copy_loses, partitioned=True)
+        elif sql.startswith('SELECT COUNT'):
+            return FakeJob([{'n': self.tables[ref].rows}])
+        elif sql.startswith('ALTER TABLE'):
+            new_ref = f"{ref.rsplit('.', 1)[0]}.{sql.split('`')[3]}"
+            self.log.append(('rename', ref, new_ref))
+            if new_ref == self.fail_rename:
+                self.fail_rename = None
+                raise RuntimeError('rename failed')
+            self.tables[new_ref] = self.tables.pop(ref)
+        return FakeJob()
+
+
+def test_migration_swaps_in_a_verified_copy():
+    client = FakeBigQueryClient(rows=5)
+    assert migrate_snapshot_table(client, TABLE) == 'migrated'
+    assert client.log == [
+        ('create', f'{TABLE}__partitioned'),
+        ('rename', TABLE, f'{TABLE}__unpartitioned'),
+        ('rename', f'{TABLE}__partitioned', TABLE),
+        ('delete', f'{TABLE}__unpartitioned'),
+    ]
+    assert list(client.tables) == [TABLE]
+    assert client.tables[TABLE].rows == 5 and client.tables[TABLE].time_partitioning is not None
+    assert migrate_snapshot_table(client, TABLE) == 'already partitioned'
+
+
+def test_short_copy_leaves_the_original_untouched():
+    client = FakeBigQueryClient(rows=5, copy_loses=1)
+    with pytest.raises(RuntimeError):
+        migrate_snapshot_table(client, TABLE)
+    assert list(client.tables) == [TABLE]
+    assert client.tables[TABLE].rows == 5 and client.tables[TABLE].time_partitioning is None
+
+
+def test_failed_swap_restores_the_original():
+    client = FakeBigQueryClient(rows=5, fail_rename=TABLE)
+    with pytest.raises(RuntimeError):
+        migrate_snapshot_table(client, TABLE)
+    assert client.tables[TABLE].time_partitioning is None
+    assert not any(entry[0] == 'delete' and entry[1] == TABLE for entry in client.log)
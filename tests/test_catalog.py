@@ -0,0 +1,85 @@
+"""Snapshot catalog: record, latest per location, time-range queries and backfill from disk."""
+import sqlite3
+from datetime import datetime
+
+from data_handlers.catalog import SnapshotCatalog, to_catalog_timestamp
+
+TOKEN = ('defillama', 'eth', '0xa')
+
+
+def _catalog(tmp_path):
+    return SnapshotCatalog(str(tmp_path / 'catalog.sqlite'))
+
+
+def test_timestamps_are_normalized():
+    assert to_catalog_timestamp('20261016_143022') == '2026-10-16T14:30:22'
+    assert to_catalog_timestamp(datetime(2026, 10, 16, 14, 30, 22)) == '2026-10-16T14:30:22'
+    assert to_catalog_timestamp('2026-10-16T14:30:22') == '2026-10-16T14:30:22'
+    assert to_catalog_timestamp(None) is None
+
+
+def test_latest_is_per_user_and_location(tmp_path):
+    catalog = _catalog(tmp_path)
+    local = catalog.record(*TOKEN, 'tvl', '20261001_100000', size=10, local_path='a')
+    gcs = catalog.record(*TOKEN, 'tvl', '20261002_100000', size=10, gcs_uri='gs://b/x')
+    mine = catalog.record(*TOKEN, 'tvl', '20261003_100000', user_id='u1', size=10, local_path='b')
+
+    assert catalog.latest(*TOKEN, 'tvl')['id'] == gcs
+    assert catalog.latest(*TOKEN, 'tvl', location='local_path')['id'] == local
+    assert catalog.latest(*TOKEN, 'tvl', user_id='u1')['id'] == mine
+    assert catalog.latest(*TOKEN, 'fees') is None
+    assert catalog.get(local)['timestamp'] == '2026-10-01T10:00:00'
+
+
+def test_snapshots_in_range_oldest_first(tmp_path):
+    catalog = _catalog(tmp_path)
+    ids = [catalog.record(*TOKEN, 'tvl', f'2026100{day}_100000', size=1, local_path=str(day))
+           for day in (3, 1, 2, 4)]
+
+    assert [row['id'] for row in catalog.snapshots(*TOKEN, 'tvl')] == [ids[1], ids[2], ids[0], ids[3]]
+    rows = catalog.snapshots(*TOKEN, 'tvl', start='20261002_000000', end=datetime(2026, 10, 3, 10))
+    assert [row['id'] for row in rows] == [ids[2], ids[0]]
+
+
+def test_reference_needs_its_body_at_the_same_location(tmp_path):
+    catalog = _catalog(tmp_path)
+    body = catalog.record(*TOKEN, 'tvl', '20261001_100000', size=10, content_hash='h', local_path='a')
+    assert catalog.record(*TOKEN, 'tvl', '20261002_100000', size=0, local_path='b', ref_id=body) is None
+    ref = catalog.record(*TOKEN, 'tvl', '20261002_100000', size=0, content_hash='h', local_path='a', ref_id=body)
+    assert catalog.latest_body('defillama', 'tvl', 'h')['id'] == body
+    assert catalog.stats() == {'snapshots': 2, 'bytes': 10, 'local': 1, 'gcs': 0, 'bigquery': 0, 'unchanged': 1}
+    assert catalog.get(ref)['ref_id'] == body
+
+
+def test_latest_body_by_raw_hash_and_old_catalogs_are_migrated(tmp_path):
+    path = str(tmp_path / 'catalog.sqlite')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE snapshots (id INTEGER PRIMARY KEY, source TEXT, chain TEXT, address TEXT, "
+                 "user_id TEXT, endpoint TEXT, timestamp TEXT, bytes INTEGER, content_hash TEXT, "
+                 "local_path TEXT, gcs_uri TEXT, bq_table TEXT)")
+    conn.commit()
+    conn.close()
+    catalog = SnapshotCatalog(path)
+    body = catalog.record(*TOKEN, 'tvl', '20261001_100000', size=10, content_hash='h', raw_hash='r',
+                          local_path='a')
+    assert catalog.latest_body('defillama', 'tvl', raw_hash='r')['id'] == body
+    assert catalog.latest_body('defillama', 'tvl', raw_hash='other') is None
+
+
+def test_backfill_catalogs_files_once(tmp_path):
+    root = tmp_path / 'data'
+    token_dir = root / 'defillama' / 'eth' / '0xa'
+    (token_dir / 'u1').mkdir(parents=True)
+    (token_dir / 'tvl_20261001_100000.json.gz').write_bytes(b'x' * 7)
+    (token_dir / 'u1' / 'fees_20261002_100000.json').write_bytes(b'{}')
+    (token_dir / 'notes.json').write_bytes(b'{}')
+    (root / 'stray_20261001_100000.json').write_bytes(b'{}')
+
+    catalog = _catalog(tmp_path)
+    assert catalog.backfill_local(root) == 2
+    row = catalog.latest(*TOKEN, 'tvl')
+    assert (row['bytes'], row['timestamp'], row['user_id']) == (7, '2026-10-01T10:00:00', '')
+    assert catalog.latest(*TOKEN, 'fees', user_id='u1')['local_path'] == str(token_dir / 'u1' / 'fees_20261002_100000.json')
+
+    assert catalog.backfill_local(root) == 0
+    assert catalog.backfill_local(tmp_path / 'missing') == 0
@@ -0,0 +1,74 @@
+"""CDC candle saves: closed candles only, nothing rewritten, throttled off the render path; live chart rows."""
+from types import SimpleNamespace
+
+import pandas as pd
+
+from components import cdc_tracker
+from components.cdc_tracker import CandleSaver
+from data_handlers.timeseries import TimeSeriesStore
+
+MINUTE = 60 * 1000
+# Two days back, so every candle of these tests is closed by the wall clock (submit())
+START = int((pd.Timestamp.now(tz='UTC').floor('h') - pd.Timedelta(days=2)).timestamp() * 1000)
+
+
+def _candles(first, count):
+    return {'exchange': 'binance', 'timeframe': '1m',
+            'data': [[START + i * MINUTE, 1.0, 2.0, 0.5, 1.5 + i, 10.0] for i in range(first, first + count)]}
+
+
+def _saver(tmp_path, **kwargs):
+    store = TimeSeriesStore(tmp_path)
+    return store, CandleSaver(get_store=lambda: store, **kwargs)
+
+
+def _now(minutes):
+    """Epoch seconds `minutes` after START (candle i closes at START + i + 1 minutes)"""
+    return (START + minutes * MINUTE) / 1000
+
+
+def test_appends_only_new_closed_candles(tmp_path):
+    store, saver = _saver(tmp_path)
+    # Candles 0..4, the last one still open
+    assert saver.save('BTC/USDT', _candles(0, 5), now=_now(4.5)) == 4
+    path = store._partition_dir('ohlcv', 'cdc', 'binance', 'BTC/USDT') / 'data.parquet'
+    written = path.stat().st_mtime_ns
+
+    # Same window a refresh later: nothing new, no write
+    assert saver.save('BTC/USDT', _candles(0, 5), now=_now(4.9)) == 0
+    assert path.stat().st_mtime_ns == written
+
+    assert saver.save('BTC/USDT', _candles(2, 5), now=_now(6.5)) == 2
+    df = store.read('ohlcv', 'cdc', 'binance', 'BTC/USDT')
+    assert len(df) == 6 and df['close'].tolist() == [1.5 + i for i in range(6)]
+
+
+def test_old_candles_are_dropped_on_append(tmp_path):
+    store, saver = _saver(tmp_path, retention_days=1)
+    saver.save('BTC/USDT', _candles(0, 3), now=_now(3))
+    day_later = 24 * 60
+    assert saver.save('BTC/USDT', _candles(day_later, 2), now=_now(day_later + 2)) == 2
+    df = store.read('ohlcv', 'cdc', 'binance', 'BTC/USDT')
+    assert len(df) == 3  # candle 2 plus the two new ones
+
+
+def test_submit_is_throttled_per_symbol(tmp_path):
+    store, saver = _saver(tmp_path, interval=3600)
+    first = saver.submit('BTC/USDT', _candles(0, 3))
+    assert first is not None and first.result(5) == 3
+    assert saver.submit('BTC/USDT', _candles(0, 4)) is None
+    assert saver.submit('ETH/USDT', _candles(0, 3)).result(5) == 3
+    assert saver.submit('ETH/USDT', None) is None
+
+
+def test_chart_history_only_appends_live_rows(monkeypatch):
+    history = cdc_tracker._create_empty_history()
+    monkeypatch.setattr(cdc_tracker, 'st', SimpleNamespace(session_state=SimpleNamespace(cdc_chart_history=history)))
+    row = {'price': 100.0, 'imbalance': 1.0, 'cvd_5m': 2.0, 'cvd_1h': 3.0, 'cvd_12h': 4.0, 'cvd_24h': 5.0}
+    cdc_tracker.update_chart_history([
+        {'id': 'binance', **row, 'stale': False, 'status': 'live'},
+        {'id': 'bybit', **row, 'stale': True, 'status': 'stale'},
+        {'id': 'coinbase', 'status': 'timeout'},
+    ])
+    assert list(history['prices']) == ['binance']
+    assert list(history['cvd_1h']['binance']) == [3.0]
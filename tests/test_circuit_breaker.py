@@ -0,0 +1,99 @@
+"""Half-open probes must not leave a host's circuit breaker stuck."""
+import asyncio
+
+import pytest
+import requests
+
+from api_clients import retry
+from api_clients.http_transport import AsyncHttpTransport, HttpTransport
+from api_clients.retry import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, RetryPolicy
+
+
+class RaisingSession:
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        raise self.error
+
+
+def _half_open_breaker(monkeypatch, host):
+    breaker = CircuitBreaker(host, failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    monkeypatch.setitem(retry._breakers, host, breaker)
+    assert breaker.state == HALF_OPEN
+    return breaker
+
+
+def _transport(session):
+    transport = HttpTransport(retry_policy=RetryPolicy(max_attempts=1))
+    transport.get_session = lambda url, provider='DEFAULT': session
+    return transport
+
+
+def test_release_frees_probe_slot():
+    breaker = CircuitBreaker('example.test', failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()  # one probe at a time
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_probe_raising_request_exception_is_a_failure(monkeypatch):
+    host = 'chunked.example.test'
+    breaker = _half_open_breaker(monkeypatch, host)
+    transport = _transport(RaisingSession(requests.exceptions.ChunkedEncodingError('truncated')))
+
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        transport.request('GET', f"https://{host}/x")
+
+    assert breaker.failures == 2
+    assert breaker._state == OPEN
+    assert not breaker._probe_in_flight
+
+
+def test_probe_raising_other_error_releases_slot(monkeypatch):
+    host = 'crash.example.test'
+    breaker = _half_open_breaker(monkeypatch, host)
+    transport = _transport(RaisingSession(RuntimeError('limiter broke')))
+
+    with pytest.raises(RuntimeError):
+        transport.request('GET', f"https://{host}/x")
+
+    # No outcome recorded, but the next request may probe again
+    assert breaker.failures == 1
+    assert breaker.allow()
+
+
+def test_cancelled_async_probe_releases_slot(monkeypatch):
+    host = 'cancel.example.test'
+    breaker = _half_open_breaker(monkeypatch, host)
+    transport = AsyncHttpTransport(retry_policy=RetryPolicy(max_attempts=1))
+
+    async def send_once(*args, **kwargs):
+        raise asyncio.CancelledError()
+
+    monkeypatch.setattr(transport, '_get_session', lambda url, provider: None)
+    monkeypatch.setattr(transport, '_send_once', send_once)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(transport.request('GET', f"https://{host}/x"))
+
+    assert breaker.allow()
+
+
+def test_success_closes_breaker(monkeypatch):
+    host = 'ok.example.test'
+    breaker = _half_open_breaker(monkeypatch, host)
+
+    class OkSession:
+        def request(self, method, url, **kwargs):
+            response = requests.Response()
+            response.status_code = 200
+            return response
+
+    assert _transport(OkSession()).request('GET', f"https://{host}/x").status_code == 200
+    assert breaker.state == CLOSED
@@ -0,0 +1,58 @@
+"""Coin index: contract lookups per chain, incremental refresh, fetcher context without coin_info."""
+from data_handlers.coin_index import CoinIndex
+from services import coingecko_fetcher
+from services.coingecko_fetcher import CoinGeckoFetcher
+
+SOLANA_MINT = 'EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v'
+COINS = [
+    {'id': 'usd-coin', 'symbol': 'usdc', 'name': 'USDC', 'platforms': {
+        'ethereum': '0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48',
+        'polygon-pos': '0x3c499c542cef5e3811e1192ce70d8cc03d5c3359',
+        'solana': SOLANA_MINT, 'unsupported-chain': '0xdead'}},
+    {'id': 'bitcoin', 'symbol': 'btc', 'name': 'Bitcoin', 'platforms': {}},
+    {'id': 'abc', 'symbol': 'abc', 'name': 'ABC', 'platforms': {'ethereum': '0xABC', 'base': ''}},
+]
+
+
+def test_lookup_by_chain_and_contract(tmp_path):
+    index = CoinIndex(str(tmp_path / 'coins.sqlite'))
+    assert index.update_from_coins_list(COINS) == {'added': 4, 'updated': 0, 'removed': 0}
+
+    entry = index.lookup('Ethereum', '0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48')
+    assert entry == {'coingecko_id': 'usd-coin', 'symbol': 'USDC', 'name': 'USDC',
+                     'defillama_id': 'ethereum:0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48',
+                     'nansen_chain': 'ethereum'}
+    # CoinGecko platform ids map to the app's chain names
+    assert index.lookup('Polygon', '0x3C499C542CEF5E3811E1192CE70D8CC03D5C3359')['coingecko_id'] == 'usd-coin'
+    # Only EVM addresses are case-insensitive
+    assert index.lookup('Solana', SOLANA_MINT)['defillama_id'] == f'solana:{SOLANA_MINT}'
+    assert index.lookup('Solana', SOLANA_MINT.lower()) is None
+    assert index.lookup('Base', '0xabc') is None
+    assert index.lookup('Ethereum', '0xdead') is None
+    # Persistent across instances
+    assert CoinIndex(str(tmp_path / 'coins.sqlite')).stats()['coins'] == 4
+
+
+def test_refresh_writes_only_changes(tmp_path):
+    index = CoinIndex(str(tmp_path / 'coins.sqlite'))
+    index.update_from_coins_list(COINS)
+    changed = [dict(COINS[0], platforms={'ethereum': COINS[0]['platforms']['ethereum']}),
+               dict(COINS[2], symbol='abc2')]
+    assert index.update_from_coins_list(changed) == {'added': 0, 'updated': 1, 'removed': 2}
+    assert index.lookup('Ethereum', '0xabc')['symbol'] == 'ABC2'
+    assert index.lookup('Solana', SOLANA_MINT) is None
+    # An error payload leaves the index as it is
+    assert index.update_from_coins_list({'status': {'error_code': 429}}) == {'added': 0, 'updated': 0, 'removed': 0}
+    assert index.stats()['coins'] == 2
+
+
+def test_fetcher_context_comes_from_the_index(monkeypatch, tmp_path):
+    index = CoinIndex(str(tmp_path / 'coins.sqlite'))
+    index.update_from_coins_list(COINS)
+    monkeypatch.setattr(coingecko_fetcher, 'get_coin_index', lambda: index)
+    monkeypatch.setattr(CoinGeckoFetcher, 'log', lambda self, message, status='info': None)
+
+    fetcher = CoinGeckoFetcher('Ethereum', '0xABC', 'alice', {'coingecko': 'ethereum'}, '90')
+    assert fetcher.initial_context() == {'token_symbol': 'ABC', 'coin_id': 'abc'}
+    unknown = CoinGeckoFetcher('Ethereum', '0xfff', 'alice', {'coingecko': 'ethereum'}, '90')
+    assert unknown.initial_context() == {}
@@ -0,0 +1,44 @@
+"""Snapshot codecs: magic-byte round trips, zstd fallback and loads across mixed codecs."""
+import pytest
+
+from data_handlers import compression, storage
+
+BODY = b'{"tvl": [1, 2, 3], "name": "eth"}' * 20
+TOKEN = ('defillama', 'eth', '0xa')
+
+
+@pytest.mark.parametrize('codec, magic', [('gzip', compression.GZIP_MAGIC), ('zstd', compression.ZSTD_MAGIC)])
+def test_round_trip_is_detected_by_magic_bytes(codec, magic):
+    if codec == 'zstd' and compression._zstd() is None:
+        pytest.skip('zstandard not installed')
+    packed = compression.compress(BODY, compression.resolve_codec(codec))
+    assert packed.startswith(magic) and len(packed) < len(BODY)
+    assert compression.decompress(packed) == BODY
+
+
+def test_plain_bytes_pass_through():
+    assert compression.compress(BODY, 'none') == BODY
+    assert compression.decompress(BODY) == BODY
+    assert compression.extension('none') == '.json'
+
+
+def test_zstd_falls_back_to_gzip_without_zstandard(monkeypatch):
+    monkeypatch.setattr(compression, '_zstd', lambda: None)
+    assert compression.resolve_codec('zstd') == 'gzip'
+    assert compression.resolve_codec(None) == 'none'
+    with pytest.raises(ValueError):
+        compression.resolve_codec('brotli')
+    with pytest.raises(RuntimeError):
+        compression.decompress(compression.ZSTD_MAGIC + b'\x00' * 8)
+
+
+def test_snapshots_written_with_different_codecs_all_load(catalog, monkeypatch):
+    codecs = ['none', 'gzip'] + (['zstd'] if compression._zstd() is not None else [])
+    for value, codec in enumerate(codecs):
+        monkeypatch.setattr(storage, 'STORAGE_COMPRESSION', codec)
+        path = storage.save_json({'v': value}, *TOKEN, 'tvl', timestamp=f'2026101{value}_100000')['local']
+        assert path.endswith(compression.extension(codec))
+
+    rows = catalog.snapshots(*TOKEN, 'tvl')
+    assert [storage.load_snapshot_json(row['id']) for row in rows] == [{'v': v} for v in range(len(codecs))]
+    assert storage.load_latest_json(*TOKEN, 'tvl') == {'v': len(codecs) - 1}
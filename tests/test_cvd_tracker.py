@@ -0,0 +1,104 @@
+"""CVD windows over one trade log (eviction, late trades, brute-force cross-check) and trade-id dedupe."""
+import random
+from types import SimpleNamespace
+
+import pytest
+
+import orderbook_sync
+from orderbook_sync import BoundedDedupe, CVDTracker
+
+NOW = 1_800_000_000.0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=NOW)
+    monkeypatch.setattr(orderbook_sync, 'time', SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def _trade(trade_id, age, amount, side='buy'):
+    """A trade `age` seconds before NOW"""
+    return {'id': trade_id, 'timestamp': (NOW - age) * 1000, 'amount': amount, 'price': 100.0, 'side': side}
+
+
+def _cvds(tracker):
+    return {key: tracker.get_cvd(key) for key in tracker.windows}
+
+
+def test_running_sums_drop_trades_as_they_age_out(clock):
+    tracker = CVDTracker()
+    tracker.add_trades([_trade('a', 7200, 4.0), _trade('b', 600, 2.0, 'sell'), _trade('c', 60, 1.0)])
+    assert _cvds(tracker) == {'5m': 1.0, '1h': -1.0, '12h': 3.0, '24h': 3.0}
+
+    clock.now = NOW + 300
+    assert _cvds(tracker) == {'5m': 0.0, '1h': -1.0, '12h': 3.0, '24h': 3.0}
+    clock.now = NOW + 24 * 3600 - 7300
+    assert _cvds(tracker) == {'5m': 0.0, '1h': 0.0, '12h': 0.0, '24h': 3.0}
+    clock.now = NOW + 24 * 3600 - 500
+    assert _cvds(tracker) == {'5m': 0.0, '1h': 0.0, '12h': 0.0, '24h': 1.0}
+    clock.now = NOW + 24 * 3600
+    assert _cvds(tracker) == {'5m': 0.0, '1h': 0.0, '12h': 0.0, '24h': 0.0}
+    assert tracker._sums == {key: 0.0 for key in tracker.windows}
+
+
+def test_late_trades_join_only_the_windows_they_fall_in(clock):
+    tracker = CVDTracker()
+    tracker.add_trades([_trade('new', 10, 1.0)])
+    # Arrives after newer trades: older than 5 minutes, inside the hour
+    tracker.add_trades([_trade('late', 900, 3.0), _trade('stale', 2 * 24 * 3600, 9.0)])
+    assert _cvds(tracker) == {'5m': 1.0, '1h': 4.0, '12h': 4.0, '24h': 4.0}
+    assert tracker._times == sorted(tracker._times)
+    # Seen again in the next poll: not counted twice
+    tracker.add_trades([_trade('late', 900, 3.0), _trade('new', 10, 1.0)])
+    assert tracker.get_cvd('1h') == 4.0
+
+
+def test_matches_a_brute_force_recompute(clock, monkeypatch):
+    monkeypatch.setattr(CVDTracker, 'COMPACT_MIN', 16)
+    rng = random.Random(7)
+    tracker = CVDTracker()
+    trades = {}
+    for _ in range(600):
+        clock.now += rng.uniform(0, 900)
+        batch = []
+        for _ in range(rng.randint(0, 8)):
+            trade_id = str(rng.randint(0, 1500))
+            trade = trades.get(trade_id) or {
+                'id': trade_id, 'timestamp': (clock.now - rng.uniform(0, 2 * 3600)) * 1000,
+                'amount': round(rng.uniform(0.1, 5), 3), 'price': 100.0, 'side': rng.choice(['buy', 'sell'])}
+            batch.append(trade)
+        tracker.add_trades(batch)
+        # Repeated ids (the next poll returning the same trades) count once
+        for trade in batch:
+            trades.setdefault(trade['id'], trade)
+
+        for key, limit in tracker.windows.items():
+            expected = sum(t['amount'] if t['side'] == 'buy' else -t['amount'] for t in trades.values()
+                           if clock.now - t['timestamp'] / 1000 <= limit)
+            assert tracker.get_cvd(key) == pytest.approx(expected, abs=1e-9)
+    # The log was compacted along the way
+    assert len(tracker._times) < len(trades)
+
+
+def test_dedupe_evicts_the_oldest_key_at_capacity():
+    seen = BoundedDedupe(3)
+    assert [seen.add(key) for key in 'abc'] == [True, True, True]
+    assert seen.add('b') is False
+    assert seen.add('d') is True
+    assert len(seen) == 3 and 'a' not in seen and {'b', 'c', 'd'} <= set(seen._keys)
+    # An evicted key is new again, and takes the slot of the next oldest
+    assert seen.add('a') is True
+    assert 'b' not in seen and len(seen) == 3
+
+
+def test_tracker_drops_duplicate_trade_ids(clock):
+    tracker = CVDTracker()
+    tracker.add_trades([_trade('1', 30, 2.0), _trade('1', 30, 2.0), _trade('2', 20, 1.0, 'sell')])
+    tracker.add_trades([_trade('2', 20, 1.0, 'sell'), _trade('3', 10, 0.5)])
+    assert tracker.get_cvd('5m') == 1.5
+    assert len(tracker._times) == 3
+    # Trades without an id are keyed on timestamp, amount and price
+    anonymous = _trade(None, 5, 4.0)
+    tracker.add_trades([anonymous, dict(anonymous)])
+    assert tracker.get_cvd('5m') == 5.5
@@ -0,0 +1,89 @@
+"""Dune run_sql: every submit, status poll and result page goes through the DUNE bucket."""
+from types import SimpleNamespace
+
+import pytest
+from dune_client.models import ExecutionState, QueryFailedError
+
+from api_clients import dune_client
+from api_clients.dune_client import DuneClient
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.acquired = 0
+
+    def acquire(self):
+        self.acquired += 1
+
+
+class Page:
+    """Stands in for ResultsResponse: rows, metadata, next_offset and `+=`"""
+
+    def __init__(self, rows, next_offset=None):
+        self.execution_id = 'ex1'
+        self.state = ExecutionState.COMPLETED
+        self.result = SimpleNamespace(rows=rows, metadata=None)
+        self.next_offset = next_offset
+
+    def __add__(self, other):
+        self.result.rows = self.result.rows + other.result.rows
+        self.next_offset = other.next_offset
+        return self
+
+
+class FakeSdk:
+    def __init__(self, states, pages=None, error=None):
+        self.states = list(states)
+        self.pages = pages or {None: Page([{'a': 1}])}
+        self.error = error
+        self.calls = []
+
+    def execute_sql(self, query_sql, performance=None):
+        self.calls.append('execute')
+        return SimpleNamespace(execution_id='ex1')
+
+    def get_execution_status(self, job_id):
+        self.calls.append('status')
+        return SimpleNamespace(state=self.states.pop(0), error=self.error)
+
+    def get_execution_results(self, job_id, offset=None):
+        self.calls.append(('results', offset))
+        return self.pages[offset]
+
+    def cancel_execution(self, job_id):
+        self.calls.append('cancel')
+        return True
+
+
+@pytest.fixture
+def client(monkeypatch):
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(dune_client, 'time', SimpleNamespace(
+        monotonic=lambda: clock.now, sleep=lambda seconds: setattr(clock, 'now', clock.now + seconds)))
+    client = DuneClient(api_key='test')
+    client.limiter = CountingLimiter()
+    return client
+
+
+def test_each_poll_and_page_takes_a_token(client):
+    client.client = FakeSdk([ExecutionState.PENDING, ExecutionState.EXECUTING, ExecutionState.COMPLETED],
+                            pages={None: Page([{'a': 1}], next_offset=1), 1: Page([{'a': 2}])})
+    result = client.run_sql('select 1')
+    assert result['rows'] == [{'a': 1}, {'a': 2}]
+    assert client.client.calls == ['execute', 'status', 'status', 'status', ('results', None), ('results', 1)]
+    assert client.limiter.acquired == len(client.client.calls)
+
+
+def test_failed_execution_raises(client):
+    client.client = FakeSdk([ExecutionState.FAILED], error=SimpleNamespace(message='syntax error'))
+    with pytest.raises(QueryFailedError, match='syntax error'):
+        client.run_sql('selec 1')
+
+
+def test_timeout_cancels_the_execution(client):
+    client.client = FakeSdk([ExecutionState.EXECUTING] * 10)
+    with pytest.raises(TimeoutError):
+        client.run_sql('select 1', timeout=7)
+    # Two polls fit in 7 seconds at POLL_INTERVAL 3, then the execution is cancelled
+    assert client.client.calls == ['execute', 'status', 'status', 'status', 'cancel']
+    assert client.limiter.acquired == 5
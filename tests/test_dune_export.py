@@ -0,0 +1,44 @@
+"""Dune export schema inference and NDJSON serialization."""
+import io
+import json
+
+from data_handlers.storage import _infer_bq_schema, _write_dune_ndjson
+
+
+def _serialize(rows):
+    types = _infer_bq_schema(rows, chunk_rows=2)
+    out = io.BytesIO()
+    _write_dune_ndjson(rows, types, '2026-01-01T00:00:00', out, chunk_rows=2)
+    return types, [json.loads(line) for line in out.getvalue().decode('utf-8').splitlines()]
+
+
+def test_floats_keep_full_precision():
+    rows = [{'tiny': 1.23456789012345e-12, 'frac': 0.1234567890123},
+            {'tiny': None, 'frac': 2.0000000000000004}]
+    types, records = _serialize(rows)
+    assert types == {'tiny': 'FLOAT', 'frac': 'FLOAT'}
+    assert records[0]['tiny'] == 1.23456789012345e-12
+    assert records[0]['frac'] == 0.1234567890123
+    assert records[1] == {'_ingested_at': '2026-01-01T00:00:00', 'tiny': None, 'frac': 2.0000000000000004}
+
+
+def test_integers_wider_than_int64():
+    rows = [{'small': 1, 'wide': 10 ** 24, 'huge': 10 ** 40},
+            {'small': None, 'wide': None, 'huge': 5},
+            {'small': 2 ** 63 - 1, 'wide': 7, 'huge': None}]
+    types, records = _serialize(rows)
+    assert types == {'small': 'INTEGER', 'wide': 'NUMERIC', 'huge': 'STRING'}
+    assert [r['small'] for r in records] == [1, None, 2 ** 63 - 1]
+    assert [r['wide'] for r in records] == [str(10 ** 24), None, '7']
+    assert [r['huge'] for r in records] == [str(10 ** 40), '5', None]
+
+
+def test_mixed_and_nested_columns():
+    rows = [{'n': 1, 'x': {'a': 1}, 'b': True},
+            {'n': 1.5, 'x': 'text', 'b': None},
+            {'n': float('inf'), 'x': None, 'b': False}]
+    types, records = _serialize(rows)
+    assert types == {'n': 'FLOAT', 'x': 'STRING', 'b': 'BOOLEAN'}
+    assert [r['n'] for r in records] == [1.0, 1.5, None]
+    assert [r['x'] for r in records] == ["{'a': 1}", 'text', None]
+    assert [r['b'] for r in records] == [True, None, False]
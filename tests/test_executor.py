@@ -0,0 +1,68 @@
+"""DagExecutor: dependency order, skip propagation and per-provider concurrency caps."""
+import threading
+import time
+
+from services.executor import DagExecutor, EndpointTask
+
+
+def _task(key, log, returns=None, requires=(), provides=None, provider='A', skipped=None, run=None):
+    def default_run(inputs):
+        log.append((key, inputs))
+        return returns
+    return EndpointTask(key, provider, run or default_run, requires=requires,
+                        provides=provides if provides is not None else tuple(returns or ()),
+                        on_skip=(lambda: skipped.append(key)) if skipped is not None else None)
+
+
+def test_dependents_run_after_their_inputs_resolve():
+    log = []
+    tasks = [
+        _task('perp', log, requires=('token_symbol',)),
+        _task('coin_market_chart', log, requires=('coin_id',), provider='B'),
+        _task('coin_info', log, returns={'coin_id': 'abc', 'token_symbol': 'ABC'}, provider='B'),
+    ]
+    context = DagExecutor({'DEFAULT': 2}).run(tasks, {'chain': 'eth', 'unused': None})
+    assert context == {'chain': 'eth', 'coin_id': 'abc', 'token_symbol': 'ABC'}
+    order = [key for key, _ in log]
+    assert order[0] == 'coin_info' and set(order[1:]) == {'perp', 'coin_market_chart'}
+    assert dict(log)['perp'] == {'token_symbol': 'ABC'}
+
+
+def test_missing_inputs_skip_dependents_transitively():
+    log, skipped = [], []
+
+    def crash(inputs):
+        raise RuntimeError('boom')
+
+    tasks = [
+        # Contract not listed: coin_info resolves nothing
+        _task('coin_info', log, returns={'coin_id': None}, skipped=skipped),
+        _task('coin_tickers', log, returns={'exchange': 'x'}, requires=('coin_id',), skipped=skipped),
+        _task('exchange_volume', log, requires=('exchange',), skipped=skipped),
+        _task('protocol_tvl', log, requires=('protocol',), skipped=skipped),
+        _task('crashing', log, skipped=skipped, run=crash),
+        _task('tvl', log, skipped=skipped),
+    ]
+    context = DagExecutor({'DEFAULT': 1}).run(tasks)
+    assert context == {}
+    assert sorted(skipped) == ['coin_tickers', 'exchange_volume', 'protocol_tvl']
+    assert sorted(key for key, _ in log) == ['coin_info', 'tvl']
+
+
+def test_provider_caps_limit_concurrency():
+    lock = threading.Lock()
+    running, peak = {}, {}
+
+    def run(provider):
+        def fetch(inputs):
+            with lock:
+                running[provider] = running.get(provider, 0) + 1
+                peak[provider] = max(peak.get(provider, 0), running[provider])
+            time.sleep(0.02)
+            with lock:
+                running[provider] -= 1
+        return fetch
+
+    tasks = [EndpointTask(f'{p}{i}', p, run(p)) for p in ('NANSEN', 'COINGECKO') for i in range(6)]
+    DagExecutor({'NANSEN': 1, 'COINGECKO': 3}).run(tasks)
+    assert peak == {'NANSEN': 1, 'COINGECKO': 3}
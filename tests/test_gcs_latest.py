@@ -0,0 +1,81 @@
+"""Latest GCS snapshot lookup: catalog row, then _latest pointer, listing only as a fallback."""
+import gzip
+import json
+
+from google.api_core.exceptions import NotFound
+
+from data_handlers import storage
+
+TOKEN = ('defillama', 'eth', '0xa')
+PREFIX = 'defillama/eth/0xa/'
+
+
+class FakeBlob:
+    def __init__(self, bucket, name):
+        self.bucket, self.name = bucket, name
+
+    def download_as_bytes(self, raw_download=False):
+        self.bucket.downloads.append(self.name)
+        if self.name not in self.bucket.objects:
+            raise NotFound(self.name)
+        return self.bucket.objects[self.name]
+
+
+class FakeBucket:
+    name = 'b'
+
+    def __init__(self, listable=False):
+        self.objects = {}
+        self.downloads = []
+        self.listed = 0
+        self.listable = listable
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+    def list_blobs(self, prefix):
+        if not self.listable:
+            raise AssertionError('history listed')
+        self.listed += 1
+        return [FakeBlob(self, name) for name in self.objects if name.startswith(prefix)]
+
+    def put(self, name, value):
+        self.objects[name] = gzip.compress(json.dumps(value).encode())
+
+
+def _load(monkeypatch, bucket):
+    monkeypatch.setattr(storage, '_get_gcs_bucket', lambda: bucket)
+    return storage._load_gcs(*TOKEN, 'tvl')
+
+
+def test_catalog_row_is_read_without_listing(catalog, monkeypatch):
+    bucket = FakeBucket()
+    bucket.put(f'{PREFIX}tvl_20261016_100000.json.gz', {'v': 2})
+    catalog.record(*TOKEN, 'tvl', '20261016_100000', gcs_uri=f'gs://b/{PREFIX}tvl_20261016_100000.json.gz')
+
+    assert _load(monkeypatch, bucket) == {'v': 2}
+    assert bucket.downloads == [f'{PREFIX}tvl_20261016_100000.json.gz']
+
+
+def test_pointer_is_used_when_the_catalog_row_is_missing_or_stale(catalog, monkeypatch):
+    bucket = FakeBucket()
+    bucket.put(f'{PREFIX}tvl_20261016_110000.json.gz', {'v': 3})
+    bucket.objects[f'{PREFIX}_latest/tvl'] = f'{PREFIX}tvl_20261016_110000.json.gz\n'.encode()
+    assert _load(monkeypatch, bucket) == {'v': 3}
+
+    # A catalog row whose blob is gone (e.g. removed by another process) falls through to the pointer
+    catalog.record(*TOKEN, 'tvl', '20261016_100000', gcs_uri=f'gs://b/{PREFIX}tvl_20261016_100000.json.gz')
+    assert _load(monkeypatch, bucket) == {'v': 3}
+    # Rows of another bucket are skipped
+    catalog.record(*TOKEN, 'tvl', '20261016_120000', gcs_uri=f'gs://other/{PREFIX}tvl_20261016_120000.json.gz')
+    assert _load(monkeypatch, bucket) == {'v': 3}
+
+
+def test_history_is_listed_only_without_catalog_row_or_pointer(catalog, monkeypatch):
+    bucket = FakeBucket(listable=True)
+    bucket.put(f'{PREFIX}tvl_20261015_100000.json.gz', {'v': 1})
+    bucket.put(f'{PREFIX}tvl_20261016_100000.json.gz', {'v': 2})
+    bucket.put(f'{PREFIX}tvl_extra_20261017_100000.json.gz', {'v': 'other endpoint'})
+
+    assert _load(monkeypatch, bucket) == {'v': 2}
+    assert bucket.listed == 1
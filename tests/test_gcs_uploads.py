@@ -0,0 +1,119 @@
+"""GCS write path: cached bucket handle, parallel uploads and per-blob flush results."""
+import threading
+import time
+
+import pytest
+
+from data_handlers import storage
+from data_handlers.catalog import SnapshotCatalog
+from data_handlers.gcs_uploader import GcsUploader
+from data_handlers.write_batch import WriteBatch
+
+TOKEN = ('defillama', 'eth', '0xa')
+
+
+class FakeBlob:
+    def __init__(self, bucket, name):
+        self.bucket, self.name = bucket, name
+        self.content_encoding = None
+
+    def upload_from_string(self, content, content_type=None, if_generation_match=None):
+        self.bucket.upload(self.name, content)
+
+
+class FakeBucket:
+    """Stores blobs; uploads of names containing 'broken' fail, gate holds every upload"""
+    name = 'b'
+
+    def __init__(self, gate=None):
+        self.objects = {}
+        self.exists_calls = 0
+        self.gate = gate
+        self.running = self.peak = 0
+        self._lock = threading.Lock()
+
+    def exists(self):
+        self.exists_calls += 1
+        return True
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+    def get_blob(self, name):
+        return None
+
+    def upload(self, name, content):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            if self.gate is not None:
+                self.gate.wait(5)
+            if 'broken' in name:
+                raise RuntimeError('upload refused')
+            self.objects[name] = content
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+class FakeClient:
+    def __init__(self, bucket):
+        self._bucket = bucket
+
+    def bucket(self, name):
+        return self._bucket
+
+
+@pytest.fixture
+def gcs(monkeypatch, tmp_path):
+    bucket = FakeBucket()
+    catalog = SnapshotCatalog(str(tmp_path / 'catalog.sqlite'))
+    monkeypatch.setattr(storage, 'STORAGE_MODE', 'gcs')
+    monkeypatch.setattr(storage, 'STORAGE_DEDUPE', False)
+    monkeypatch.setattr(storage, 'get_catalog', lambda: catalog)
+    monkeypatch.setattr(storage, '_get_gcs_client', lambda: FakeClient(bucket))
+    monkeypatch.setattr(storage, '_gcs_bucket', None)
+    monkeypatch.setattr(storage, '_gcs_uploader', None)
+    return bucket, catalog
+
+
+def test_bucket_existence_is_checked_once(gcs):
+    bucket, _ = gcs
+    batch = WriteBatch()
+    for endpoint in ('tvl', 'fees', 'volume'):
+        storage.save_json({endpoint: 1}, *TOKEN, endpoint, timestamp='20261016_100000', batch=batch)
+    results = storage.flush_storage(timeout=5, batch=batch)['gcs']
+    assert len(results) == 3 and all(isinstance(r, str) for r in results.values())
+    assert bucket.exists_calls == 1
+    assert storage._get_gcs_bucket() is bucket
+
+
+def test_uploads_run_in_parallel():
+    gate = threading.Event()
+    bucket = FakeBucket(gate)
+    uploader = GcsUploader(lambda: bucket, workers=4)
+    futures = [uploader.submit(f'gs://b/{i}', str(i), b'{}') for i in range(4)]
+    deadline = time.monotonic() + 5
+    while bucket.running < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    gate.set()
+    assert bucket.peak == 4
+    assert uploader.flush(timeout=5) == {f'gs://b/{i}': f'gs://b/{i}' for i in range(4)}
+    assert all(f.done() for f in futures)
+
+
+def test_failed_upload_is_reported_and_leaves_the_catalog(gcs):
+    _, catalog = gcs
+    batch = WriteBatch()
+    good = storage.save_json({'v': 1}, *TOKEN, 'tvl', timestamp='20261016_100000', batch=batch)['gcs']
+    bad = storage.save_json({'v': 2}, *TOKEN, 'broken', timestamp='20261016_100000', batch=batch)['gcs']
+
+    results = storage.flush_storage(timeout=5, batch=batch)['gcs']
+    assert results == {good: good, bad: {'error': 'upload refused'}}
+    # The done callback may run just after flush() wakes up
+    deadline = time.monotonic() + 5
+    while catalog.latest(*TOKEN, 'broken')['gcs_uri'] is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert catalog.latest(*TOKEN, 'broken')['gcs_uri'] is None
+    assert catalog.latest(*TOKEN, 'tvl')['gcs_uri'] == good
@@ -0,0 +1,54 @@
+"""Shared transport: one pooled keep-alive session per host, reused by every client."""
+from api_clients import http_transport
+from api_clients.coingecko_client import CoinGeckoClient
+from api_clients.defillama_client import DefiLlamaClient
+from api_clients.http_transport import HttpResponse, HttpTransport, get_transport
+from api_clients.nansen_client import NansenClient
+from api_clients.validator_cache import ValidatorCache
+
+
+class RecordingSession:
+    def __init__(self, provider):
+        self.provider = provider
+        self.urls = []
+
+    def request(self, method, url, **kwargs):
+        self.urls.append(url)
+        return HttpResponse(200, {'content-type': 'application/json'}, b'{"ok": true}', url)
+
+
+def test_clients_share_the_process_wide_transport(monkeypatch):
+    monkeypatch.setattr(http_transport, '_transport', None)
+    transport = get_transport()
+    assert get_transport() is transport
+    assert DefiLlamaClient().transport is CoinGeckoClient().transport is NansenClient().transport is transport
+
+
+def test_one_session_per_host_sized_by_provider():
+    transport = HttpTransport(pool_sizes={'DEFILLAMA': 8, 'NANSEN': 2, 'DEFAULT': 4})
+    session = transport.get_session('https://api.llama.fi/protocols', 'DEFILLAMA')
+    assert transport.get_session('https://api.llama.fi/v2/chains', 'DEFILLAMA') is session
+    assert transport.get_session('https://coins.llama.fi/prices', 'DEFILLAMA') is not session
+    assert session.get_adapter('https://api.llama.fi/')._pool_maxsize == 8
+    nansen = transport.get_session('https://api.nansen.ai/api/v1/x', 'NANSEN')
+    assert nansen.get_adapter('https://api.nansen.ai/')._pool_maxsize == 2
+    transport.close()
+    assert transport._sessions == {}
+
+
+def test_requests_reuse_the_host_session(monkeypatch, tmp_path):
+    cache = ValidatorCache(str(tmp_path))
+    monkeypatch.setattr(http_transport, 'get_validator_cache', lambda: cache)
+    transport = HttpTransport()
+    created = []
+
+    def create_session(provider):
+        created.append(RecordingSession(provider))
+        return created[-1]
+
+    monkeypatch.setattr(transport, '_create_session', create_session)
+    client = DefiLlamaClient(transport=transport)
+    client.get_all_protocols()
+    client.get_all_chains()
+    client.get_current_prices(['ethereum:0xa'])
+    assert [(s.provider, len(s.urls)) for s in created] == [('DEFILLAMA', 2), ('DEFILLAMA', 1)]
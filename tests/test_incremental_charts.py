@@ -0,0 +1,195 @@
+"""Incremental chart fetches save the full window at the window's granularity."""
+import pandas as pd
+
+from data_handlers import timeseries
+from data_handlers.timeseries import TimeSeriesStore, resample
+from data_handlers import write_queue
+from services import base_fetcher
+from services.coingecko_fetcher import CoinGeckoFetcher
+from services.defillama_fetcher import DefiLlamaFetcher
+
+
+def _ms(ts):
+    return int(ts.timestamp() * 1000)
+
+
+def _market_chart(points):
+    return {'prices': [[_ms(t), p] for t, p in points],
+            'market_caps': [[_ms(t), p * 10] for t, p in points],
+            'total_volumes': [[_ms(t), p * 2] for t, p in points]}
+
+
+class FakeCoinGeckoClient:
+    def __init__(self, full, delta):
+        self.full, self.delta = full, delta
+        self.calls = []
+
+    def get_coin_market_chart(self, coin_id, days):
+        self.calls.append('full')
+        return self.full
+
+    def get_coin_market_chart_range(self, coin_id, from_timestamp, to_timestamp):
+        self.calls.append('range')
+        return self.delta
+
+
+def _store(monkeypatch, tmp_path):
+    store = TimeSeriesStore(tmp_path)
+    monkeypatch.setattr(base_fetcher, 'get_timeseries_store', lambda: store)
+    return store
+
+
+class InlineWriteQueue:
+    """Runs the write queue's writer on put(); written=False holds the writes back"""
+
+    def __init__(self):
+        self.written = True
+        self.held = []
+
+    def put(self, data, source, chain, address, endpoint_name, user_id=None, batch=None, coverage=None,
+            shared=False):
+        self.held.append((data, source, chain, address, endpoint_name, user_id, coverage))
+        if self.written:
+            self.drain()
+
+    def drain(self):
+        for data, source, chain, address, endpoint_name, user_id, coverage in self.held:
+            write_queue.write_snapshot(data, source, chain, address, endpoint_name, user_id, coverage=coverage)
+        self.held = []
+
+
+def _writes(monkeypatch, store):
+    queue = InlineWriteQueue()
+    monkeypatch.setattr(base_fetcher, 'get_write_queue', lambda: queue)
+    monkeypatch.setattr(write_queue, 'get_timeseries_store', lambda: store)
+    monkeypatch.setattr(write_queue, 'save_json', lambda *args, **kwargs: {})
+    return queue
+
+
+def test_second_user_gets_the_full_window_at_hourly_granularity(monkeypatch, tmp_path):
+    store = _store(monkeypatch, tmp_path)
+    _writes(monkeypatch, store)
+    now = pd.Timestamp.now(tz='UTC').floor('h')
+    hourly = [(now - pd.Timedelta(hours=h), 100.0 + h) for h in range(48, 0, -1)]
+    # Range endpoint for a short range: 5-minute points
+    five_min = [(now - pd.Timedelta(hours=1) + pd.Timedelta(minutes=5 * i), 200.0 + i) for i in range(20)]
+    client = FakeCoinGeckoClient(_market_chart(hourly), _market_chart(five_min))
+
+    first = CoinGeckoFetcher('Ethereum', '0xabc', 'alice', {'coingecko': 'ethereum'}, '90')
+    first.client = client
+    monkeypatch.setattr(CoinGeckoFetcher, 'log', lambda self, message, status='info': None)
+    first.save(first._fetch_coin_market_chart('token'), 'coingecko', 'coin_market_chart')
+
+    second = CoinGeckoFetcher('Ethereum', '0xabc', 'bob', {'coingecko': 'ethereum'}, '90')
+    second.client = client
+    snapshot = second._fetch_coin_market_chart('token')
+    assert client.calls == ['full', 'range']
+
+    times = [pd.Timestamp(t, unit='ms', tz='UTC') for t, _ in snapshot['prices']]
+    # Whole stored window, not only the delta
+    assert times[0] == hourly[0][0]
+    # Delta thinned to hourly points, plus its newest point
+    assert times[-3:] == [now - pd.Timedelta(hours=1), now, five_min[-1][0]]
+    assert snapshot['prices'][-1][1] == five_min[-1][1]
+    assert len(snapshot['prices']) == len(snapshot['market_caps']) == len(snapshot['total_volumes'])
+
+
+def test_price_chart_snapshot_keeps_coin_fields(monkeypatch, tmp_path):
+    store = _store(monkeypatch, tmp_path)
+    day = pd.Timestamp.now(tz='UTC').floor('D')
+    coin = 'ethereum:0xabc'
+    stored = {'coins': {coin: {'symbol': 'ABC', 'prices': [
+        {'timestamp': int((day - pd.Timedelta(days=d)).timestamp()), 'price': float(d)} for d in (3, 2)]}}}
+    store.append('price_chart', 'defillama', 'Ethereum', '0xabc', stored)
+    store.extend_coverage('price_chart', 'defillama', 'Ethereum', '0xabc', day - pd.Timedelta(days=3), '1D')
+    delta = {'coins': {coin: {'symbol': 'ABC', 'decimals': 18, 'prices': [
+        {'timestamp': int((day - pd.Timedelta(days=1)).timestamp()), 'price': 1.0},
+        {'timestamp': int(day.timestamp()), 'price': 0.5}]}}}
+
+    class FakeDefiLlamaClient:
+        def get_price_chart(self, coins, **params):
+            assert params.get('period') == '1d'
+            return delta
+
+    fetcher = DefiLlamaFetcher('Ethereum', '0xabc', 'bob', {'defillama': 'ethereum'}, days=3)
+    fetcher.client = FakeDefiLlamaClient()
+    snapshot = fetcher._fetch_price_chart([coin])
+    assert snapshot['coins'][coin]['symbol'] == 'ABC'
+    assert snapshot['coins'][coin]['decimals'] == 18
+    assert [p['price'] for p in snapshot['coins'][coin]['prices']] == [3.0, 2.0, 1.0, 0.5]
+
+
+def test_price_chart_window_is_bounded_to_the_requested_days(monkeypatch, tmp_path):
+    store = _store(monkeypatch, tmp_path)
+    day = pd.Timestamp.now(tz='UTC').floor('D')
+    coin = 'ethereum:0xabc'
+    stored = {'coins': {coin: {'symbol': 'ABC', 'prices': [
+        {'timestamp': int((day - pd.Timedelta(days=d)).timestamp()), 'price': float(d)} for d in (400, 30, 2)]}}}
+    store.append('price_chart', 'defillama', 'Ethereum', '0xabc', stored)
+    store.extend_coverage('price_chart', 'defillama', 'Ethereum', '0xabc', day - pd.Timedelta(days=400), '1D')
+    delta = {'coins': {coin: {'symbol': 'ABC', 'prices': [{'timestamp': int(day.timestamp()), 'price': 0.5}]}}}
+
+    class FakeDefiLlamaClient:
+        def get_price_chart(self, coins, **params):
+            return delta
+
+    fetcher = DefiLlamaFetcher('Ethereum', '0xabc', 'bob', {'defillama': 'ethereum'}, days=90)
+    fetcher.client = FakeDefiLlamaClient()
+    snapshot = fetcher._fetch_price_chart([coin])
+    assert [p['price'] for p in snapshot['coins'][coin]['prices']] == [30.0, 2.0, 0.5]
+
+
+def test_coverage_is_recorded_only_once_the_series_is_written(monkeypatch, tmp_path):
+    store = _store(monkeypatch, tmp_path)
+    queue = _writes(monkeypatch, store)
+    queue.written = False
+    now = pd.Timestamp.now(tz='UTC').floor('h')
+    client = FakeCoinGeckoClient(_market_chart([(now - pd.Timedelta(hours=1), 1.0), (now, 2.0)]), None)
+    monkeypatch.setattr(CoinGeckoFetcher, 'log', lambda self, message, status='info': None)
+    args = ('Ethereum', '0xabc', 'alice', {'coingecko': 'ethereum'}, '90')
+
+    first = CoinGeckoFetcher(*args)
+    first.client = client
+    first.save(first._fetch_coin_market_chart('token'), 'coingecko', 'coin_market_chart')
+    # The append is still queued: nothing to go incremental against
+    assert store.coverage_start('coin_market_chart', 'coingecko', 'Ethereum', '0xabc', '1h') is None
+
+    queue.drain()
+    assert store.coverage_start('coin_market_chart', 'coingecko', 'Ethereum', '0xabc', '1h') is not None
+    assert CoinGeckoFetcher(*args).stored_since('coin_market_chart', first._window_start(), '1h') == now
+
+
+def test_resample_keeps_first_point_per_bucket_and_newest():
+    start = pd.Timestamp('2026-01-01', tz='UTC')
+    df = pd.DataFrame({'timestamp': [start + pd.Timedelta(minutes=m) for m in (0, 30, 60, 95, 110)],
+                       'price': [1.0, 2.0, 3.0, 4.0, 5.0], 'market_cap': 0.0, 'total_volume': 0.0})
+    assert resample(df, '1h')['price'].tolist() == [1.0, 3.0, 5.0]
+    assert timeseries.market_chart_payload(resample(df, '1h'))['prices'][0] == [_ms(start), 1.0]
+
+
+def test_finer_window_is_not_built_from_coarser_stored_points(monkeypatch, tmp_path):
+    store = _store(monkeypatch, tmp_path)
+    _writes(monkeypatch, store)
+    monkeypatch.setattr(CoinGeckoFetcher, 'log', lambda self, message, status='info': None)
+    now = pd.Timestamp.now(tz='UTC').floor('h')
+    daily = [(now.floor('D') - pd.Timedelta(days=d), 50.0 + d) for d in range(400, 0, -1)]
+    hourly = [(now - pd.Timedelta(hours=h), 100.0 + h) for h in range(48, 0, -1)]
+    client = FakeCoinGeckoClient(_market_chart(daily), _market_chart(hourly))
+
+    def fetch(days, user):
+        fetcher = CoinGeckoFetcher('Ethereum', '0xabc', user, {'coingecko': 'ethereum'}, days)
+        fetcher.client = client
+        fetcher.save(fetcher._fetch_coin_market_chart('token'), 'coingecko', 'coin_market_chart')
+
+    fetch('max', 'alice')
+    # Daily points cover the window but are too coarse for an hourly one: full fetch
+    client.full = _market_chart(hourly)
+    fetch('90', 'bob')
+    assert client.calls == ['full', 'full']
+    # Hourly points are fine enough for the hourly window and the daily one
+    fetch('90', 'carol')
+    fetch('max', 'dave')
+    assert client.calls == ['full', 'full', 'range', 'range']
+    # 5-minute points are finer than anything stored
+    fetch('1', 'erin')
+    assert client.calls[-1] == 'full'
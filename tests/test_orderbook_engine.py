@@ -0,0 +1,86 @@
+"""Orderbook polling deadline, rows for venues without data, candle polls on the pool with a separate instance."""
+import threading
+
+from orderbook_sync import OrderbookEngineSync
+
+
+class FakeExchange:
+    def __init__(self, delay=0.0, fail=False):
+        self.markets = {'BTC/USDT': {}}
+        self.delay = delay
+        self.fail = fail
+        self.release = threading.Event()
+        self.calls = []
+
+    def fetch_order_book(self, symbol, limit=None):
+        self.calls.append('order_book')
+        if self.delay:
+            self.release.wait(self.delay)
+        if self.fail:
+            raise RuntimeError('down')
+        return {'bids': [[100.0, 1.0]], 'asks': [[101.0, 2.0]]}
+
+    def fetch_trades(self, symbol, limit=None):
+        return [{'id': '1', 'timestamp': 0, 'amount': 1.0, 'price': 100.5, 'side': 'buy'}]
+
+    def fetch_ohlcv(self, symbol, timeframe, limit=None):
+        self.calls.append('ohlcv')
+        return [[0, 1, 2, 0.5, 1.5, 10]]
+
+
+def _engine(exchanges):
+    engine = OrderbookEngineSync(list(exchanges), 'BTC/USDT', deadline=5)
+    engine.exchanges = dict(exchanges)
+    return engine
+
+
+def test_rows_for_venues_without_data():
+    slow, broken = FakeExchange(delay=5), FakeExchange(fail=True)
+    engine = _engine({'binance': FakeExchange(), 'bybit': slow, 'coinbase': broken})
+    rows = engine.fetch_all(deadline=0.2)
+    assert [(r['id'], r['status']) for r in rows] == [
+        ('binance', 'live'), ('bybit', 'timeout'), ('coinbase', 'error')]
+    assert rows[0]['price'] == 100.5
+    assert 'price' not in rows[1] and 'price' not in rows[2]
+
+    slow.release.set()
+    rows = engine.fetch_all(deadline=2)
+    assert [r['status'] for r in rows] == ['live', 'live', 'error']
+    engine.close()
+
+
+def test_late_venue_returns_last_good_row_as_stale():
+    venue = FakeExchange()
+    engine = _engine({'binance': venue})
+    assert engine.fetch_all(deadline=1)[0]['status'] == 'live'
+    venue.delay = 5
+    row = engine.fetch_all(deadline=0.1)[0]
+    assert row['status'] == 'stale' and row['stale'] and row['price'] == 100.5
+    venue.release.set()
+    engine.close()
+
+
+def test_candle_history_does_not_use_the_polling_instance():
+    polling, candles = FakeExchange(), FakeExchange()
+    engine = _engine({'binance': polling})
+    engine._candle_exchanges = {'binance': candles}
+    assert engine.fetch_candle_history()['exchange'] == 'binance'
+    assert polling.calls == [] and candles.calls == ['ohlcv']
+    engine.close()
+
+
+def test_late_candle_poll_returns_the_last_candles():
+    candles = FakeExchange()
+    engine = _engine({'binance': FakeExchange()})
+    engine._candle_exchanges = {'binance': candles}
+    assert engine.fetch_candles(deadline=1)['data'] == [[0, 1, 2, 0.5, 1.5, 10]]
+
+    release = threading.Event()
+    candles.fetch_ohlcv = lambda symbol, timeframe, limit=None: release.wait(5) and [[60000, 1, 1, 1, 1, 1]]
+    assert engine.fetch_candles(deadline=0.1)['data'] == [[0, 1, 2, 0.5, 1.5, 10]]
+    # Still running: not polled again
+    poll = engine._candle_poll
+    assert engine.fetch_candles(deadline=0) is not None and engine._candle_poll is poll
+    release.set()
+    assert engine.fetch_candles(deadline=1)['data'] == [[60000, 1, 1, 1, 1, 1]]
+    engine.close()
@@ -0,0 +1,96 @@
+"""TokenBucket feedback: header pacing, 429 Retry-After, additive recovery and quota windows."""
+import email.utils
+import time
+
+import pytest
+
+from api_clients.rate_limiter import MAX_PACING_WINDOW, TokenBucket, parse_retry_after
+
+
+def _bucket(rate_per_minute=120):
+    # 2 requests/s, 10 tokens of burst
+    return TokenBucket('test', rate_per_minute, burst_seconds=5)
+
+
+def _blocked_for(bucket):
+    return bucket.blocked_until - time.monotonic()
+
+
+def test_parse_retry_after_seconds_and_http_date():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('7') == 7.0
+    assert parse_retry_after('-3') == 0.0
+    assert parse_retry_after('not a date') is None
+    now = 1_800_000_000
+    assert parse_retry_after(email.utils.formatdate(now + 30, usegmt=True), now=now) == 30.0
+    assert parse_retry_after(email.utils.formatdate(now - 30, usegmt=True), now=now) == 0.0
+
+
+def test_remaining_is_spread_over_the_reset_window():
+    bucket = _bucket()
+    bucket.update_from_response({'X-RateLimit-Remaining': '30', 'X-RateLimit-Reset': '60'}, 200)
+    assert bucket.rate == pytest.approx(0.5)
+    assert bucket.tokens <= 10
+    bucket.update_from_response({'RateLimit-Remaining': '3', 'RateLimit-Reset': '60'}, 200)
+    assert bucket.tokens <= 3
+    # Never below a tenth of the configured rate
+    assert bucket.rate == pytest.approx(0.2)
+
+
+def test_reset_given_as_epoch_seconds():
+    bucket = _bucket()
+    bucket.update_from_response({'x-ratelimit-remaining': '30', 'x-ratelimit-reset': str(time.time() + 60)}, 200)
+    assert bucket.rate == pytest.approx(0.5, rel=0.05)
+
+
+def test_no_remaining_blocks_until_reset():
+    bucket = _bucket()
+    bucket.update_from_response({'x-ratelimit-remaining': '0', 'x-ratelimit-reset': '10'}, 200)
+    assert _blocked_for(bucket) == pytest.approx(10, abs=0.5)
+    assert bucket.reserve() >= 9.5
+
+
+@pytest.mark.parametrize('http_date', [False, True])
+def test_429_blocks_for_retry_after_and_halves_the_rate(http_date):
+    retry_after = email.utils.formatdate(time.time() + 20, usegmt=True) if http_date else '20'
+    bucket = _bucket()
+    bucket.update_from_response({'Retry-After': retry_after}, 429)
+    # HTTP dates have one-second resolution
+    assert _blocked_for(bucket) == pytest.approx(20, abs=1.5)
+    assert bucket.rate == pytest.approx(1.0)
+    assert bucket.tokens <= 0
+    assert bucket.reserve() >= 18.5
+    bucket.update_from_response({'Retry-After': '1'}, 429)
+    assert bucket.rate == pytest.approx(0.5)
+    # A shorter Retry-After does not shorten the pause
+    assert _blocked_for(bucket) > 18
+
+
+def test_429_without_retry_after_uses_reset_or_default():
+    bucket = _bucket()
+    bucket.update_from_response({'x-ratelimit-reset': '12'}, 429)
+    assert _blocked_for(bucket) == pytest.approx(12, abs=0.5)
+    bucket = _bucket()
+    bucket.update_from_response({}, 429)
+    assert _blocked_for(bucket) == pytest.approx(5, abs=0.5)
+
+
+def test_successful_responses_recover_the_rate_additively():
+    bucket = _bucket()
+    bucket.update_from_response({'Retry-After': '0'}, 429)
+    assert bucket.rate == pytest.approx(1.0)
+    bucket.update_from_response({}, 200)
+    assert bucket.rate == pytest.approx(1.1)
+    for _ in range(50):
+        bucket.update_from_response({}, 200)
+    assert bucket.rate == pytest.approx(2.0)
+
+
+def test_quota_windows_are_not_used_for_pacing():
+    bucket = _bucket()
+    tokens = bucket.tokens
+    for reset in (str(MAX_PACING_WINDOW + 1), '2592000', str(time.time() + 86400)):
+        bucket.update_from_response({'x-ratelimit-remaining': '5', 'x-ratelimit-reset': reset}, 200)
+        assert bucket.rate == pytest.approx(2.0)
+        assert bucket.tokens == pytest.approx(tokens, abs=0.5)
+        assert _blocked_for(bucket) <= 0
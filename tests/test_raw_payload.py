@@ -0,0 +1,39 @@
+"""RawPayload: lazy decode, read access like the decoded object, bytes stored as received."""
+import gzip
+import json
+
+from data_handlers import storage
+from data_handlers.raw_payload import RawPayload, decode_payload
+
+BODY = b'{"coins": {"ethereum:0xa": {"price": 1.5}}, "ids": [3, 1, 2]}'
+
+
+def test_decodes_once_on_first_read():
+    payload = RawPayload(BODY, None)
+    assert payload.content_type == 'application/json'
+    assert payload._decoded is False and payload.size == len(BODY)
+    assert payload['ids'] == [3, 1, 2]
+    decoded = payload.data
+    assert payload.data is decoded
+    assert payload.get('coins')['ethereum:0xa']['price'] == 1.5 and payload.get('missing', 0) == 0
+    assert len(payload) == 2 and list(payload) == ['coins', 'ids']
+    assert decode_payload(payload) is decoded and decode_payload({'a': 1}) == {'a': 1}
+
+
+def test_truthiness_and_size_label():
+    assert not RawPayload(b'') and RawPayload(b'[]')
+    assert RawPayload(b'x' * 10).size_label() == '10 B'
+    assert RawPayload(b'x' * 4300).size_label() == '4.2 KB'
+    assert RawPayload(b'x' * (3 * 1024 * 1024)).size_label() == '3.0 MB'
+
+
+def test_storage_keeps_the_received_bytes(catalog, monkeypatch):
+    monkeypatch.setattr(storage, 'STORAGE_COMPRESSION', 'gzip')
+
+    payload = RawPayload(BODY)
+    path = storage.save_json(payload, 'defillama', 'eth', '0xa', 'current_prices')['local']
+    with open(path, 'rb') as f:
+        assert gzip.decompress(f.read()) == BODY
+    assert storage.load_latest_json('defillama', 'eth', '0xa', 'current_prices') == json.loads(BODY)
+    # RawPayloads nested in a decoded object (e.g. per-timeframe responses) are decoded on encode
+    assert json.loads(storage._to_bytes({'1h': payload})) == {'1h': json.loads(BODY)}
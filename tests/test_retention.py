@@ -0,0 +1,134 @@
+"""Retention buckets, plan vs apply, archived snapshot loads and body hand-over in the catalog."""
+import os
+from datetime import datetime
+
+import pytest
+
+from data_handlers import storage
+from data_handlers.archive import ARCHIVE_SEP
+from data_handlers.catalog import SnapshotCatalog
+from data_handlers.retention import RetentionEngine, RetentionPolicy
+
+NOW = datetime(2026, 10, 16, 12, 0, 0)
+POLICIES = {'default': {'keep_all_days': 2, 'daily_days': 10, 'weekly_days': None}}
+TOKEN = ('defillama', 'eth', '0xa')
+
+
+def _save(value, timestamp, endpoint='tvl'):
+    return storage.save_json({'v': value}, *TOKEN, endpoint, timestamp=timestamp)
+
+
+def _rows(catalog, endpoint='tvl'):
+    return catalog.snapshots(*TOKEN, endpoint)
+
+
+def test_keep_buckets():
+    rows = [{'id': i, 'timestamp': ts} for i, ts in enumerate([
+        '2026-09-08T10:00:00', '2026-09-09T10:00:00',  # same ISO week
+        '2026-10-10T08:00:00', '2026-10-10T20:00:00',  # same day
+        '2026-10-15T10:00:00', '2026-10-16T06:00:00',  # within keep_all_days
+    ], start=1)]
+    assert RetentionPolicy(2, 10, None).keep(rows, NOW) == {2, 4, 5, 6}
+    assert RetentionPolicy(2, 10, 30).keep(rows, NOW) == {4, 5, 6}
+    assert RetentionPolicy(2, None).keep(rows, NOW) == {1, 2, 4, 5, 6}
+    # The newest row is kept whatever its age
+    assert RetentionPolicy(2, 10, 30).keep(rows[:2], NOW) == {2}
+
+
+def test_plan_changes_nothing_and_run_deletes_and_archives(catalog):
+    paths = [_save(v, ts)['local'] for v, ts in enumerate(
+        ['20260908_100000', '20260909_100000', '20261010_080000', '20261010_200000', '20261016_060000'], start=1)]
+    ids = [row['id'] for row in _rows(catalog)]
+    engine = RetentionEngine(catalog=catalog, policies=POLICIES)
+
+    plan, = engine.plan(NOW)
+    assert plan['drop'] == [ids[0], ids[2]]
+    assert sorted(plan['delete']['local_path']) == sorted([paths[0], paths[2]])
+    assert sorted(plan['archive']['local_path']) == sorted([paths[1], paths[3]])
+    report = engine.run(dry_run=True, now=NOW)
+    assert (report['dropped'], report['deleted'], report['archived']) == (2, 2, 2)
+    assert all(os.path.exists(p) for p in paths)
+    assert len(_rows(catalog)) == 5
+
+    report = engine.run(dry_run=False, now=NOW)
+    assert report['errors'] == []
+    assert [os.path.exists(p) for p in paths] == [False, False, False, False, True]
+    rows = {row['id']: row for row in _rows(catalog)}
+    assert sorted(rows) == [ids[1], ids[3], ids[4]]
+    assert rows[ids[1]]['local_path'].endswith(f"_archive/tvl_202609.zip{ARCHIVE_SEP}tvl_20260909_100000.json.gz")
+    assert rows[ids[4]]['local_path'] == paths[4]
+    assert storage.load_snapshot_json(ids[1]) == {'v': 2}
+    assert storage.load_snapshot_json(ids[3]) == {'v': 4}
+    # Nothing left to do on the next run
+    assert engine.run(dry_run=False, now=NOW)['details'] == []
+
+
+def test_latest_snapshot_loads_from_archive_segment(catalog):
+    _save(1, '20261001_100000')
+    _save(2, '20261005_100000')
+    RetentionEngine(catalog=catalog, policies=POLICIES).run(dry_run=False, now=NOW)
+
+    latest = storage.get_latest_snapshot(*TOKEN, 'tvl')
+    assert ARCHIVE_SEP in latest['local_path']
+    # The latest pointer names a file that is gone: the catalog resolves the segment member
+    assert storage._load_local(*TOKEN, 'tvl') == {'v': 2}
+    assert storage.load_latest_json(*TOKEN, 'tvl') == {'v': 2}
+
+
+def test_dropped_body_is_taken_over_by_its_kept_reference(catalog):
+    path = _save(1, '20260908_100000')['local']
+    assert _save(1, '20261016_060000')['unchanged'] is not None
+    body, ref = _rows(catalog)
+    engine = RetentionEngine(catalog=catalog, policies={'default': {**POLICIES['default'], 'weekly_days': 30}})
+
+    plan, = engine.plan(NOW)
+    assert plan['drop'] == [body['id']] and plan['delete'] == {}
+    engine.run(dry_run=False, now=NOW)
+    assert os.path.exists(path)
+    heir, = _rows(catalog)
+    assert heir['id'] == ref['id'] and heir['ref_id'] is None and heir['bytes'] == body['bytes']
+    assert storage.load_latest_json(*TOKEN, 'tvl') == {'v': 1}
+
+
+def test_forget_hands_body_to_oldest_reference(tmp_path):
+    catalog = SnapshotCatalog(str(tmp_path / 'catalog.sqlite'))
+    body = catalog.record(*TOKEN, 'tvl', '20261001_100000', size=10, local_path='a')
+    first = catalog.record(*TOKEN, 'tvl', '20261002_100000', size=0, local_path='a', ref_id=body)
+    second = catalog.record(*TOKEN, 'tvl', '20261003_100000', size=0, local_path='a', ref_id=body)
+
+    assert catalog.forget([body], {'local_path': ['a']}) == {}
+    assert catalog.get(body) is None
+    assert (catalog.get(first)['ref_id'], catalog.get(first)['bytes']) == (None, 10)
+    assert catalog.get(second)['ref_id'] == first
+    assert catalog.forget([first, second], {'local_path': ['a']}) == {'local_path': ['a']}
+
+
+def test_reference_recorded_after_plan_keeps_its_body(catalog):
+    old = _save(1, '20260908_100000')['local']
+    _save(2, '20261016_060000')
+    body, _ = _rows(catalog)
+    engine = RetentionEngine(catalog=catalog, policies={'default': {**POLICIES['default'], 'weekly_days': 30}})
+    plan, = engine.plan(NOW)
+    assert plan['delete'] == {'local_path': [old]}
+
+    # save_json dedupes against the body between plan() and apply
+    ref = catalog.record(*TOKEN, 'tvl', '20261016_070000', size=0, local_path=old, ref_id=body['id'])
+    engine._apply(plan)
+    assert os.path.exists(old)
+    assert catalog.get(ref)['ref_id'] is None
+
+    # Once the body row is gone, a reference to it is refused (save_json writes a new snapshot)
+    catalog.forget([ref])
+    assert catalog.record(*TOKEN, 'tvl', '20261016_080000', size=0, local_path=old, ref_id=body['id']) is None
+
+
+def test_save_writes_a_new_snapshot_when_its_body_was_dropped(catalog, monkeypatch):
+    _save(1, '20261015_100000')
+    stale = storage.get_latest_snapshot(*TOKEN, 'tvl')
+    catalog.forget([stale['id']])
+    # A lookup that still returns the dropped row (read before retention applied)
+    monkeypatch.setattr(storage, '_unchanged_snapshot', lambda *args: stale)
+
+    results = _save(1, '20261016_100000')
+    assert 'unchanged' not in results and os.path.exists(results['local'])
+    assert storage.load_latest_json(*TOKEN, 'tvl') == {'v': 1}
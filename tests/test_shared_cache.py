@@ -0,0 +1,70 @@
+"""Shared-cache endpoints: a hit fetches nothing and stores a catalog reference, not a new body."""
+import os
+
+from data_handlers import storage, write_queue
+from services import base_fetcher
+from services.coingecko_fetcher import CoinGeckoFetcher
+from services.response_cache import ResponseCache
+
+
+class InlineWriteQueue:
+    def put(self, data, *args, **kwargs):
+        write_queue.write_snapshot(data, *args, **{k: v for k, v in kwargs.items() if k != 'batch'})
+
+
+def test_cache_hit_for_another_token_stores_no_new_body(catalog, monkeypatch, tmp_path):
+    cache = ResponseCache()
+    monkeypatch.setattr(base_fetcher, 'get_response_cache', lambda: cache)
+    monkeypatch.setattr(base_fetcher, 'get_write_queue', lambda: InlineWriteQueue())
+    calls = []
+
+    def coins_list():
+        calls.append('coins_list')
+        return [{'id': 'abc', 'symbol': 'abc', 'platforms': {'ethereum': '0xa'}}]
+
+    for address, user in (('0xa', 'alice'), ('0xb', 'bob')):
+        fetcher = CoinGeckoFetcher('Ethereum', address, user, {'coingecko': 'ethereum'}, '90')
+        fetcher.save(fetcher.cached('coins_list', coins_list)(), 'coingecko', 'coins_list')
+
+    assert calls == ['coins_list']
+    body = catalog.latest('coingecko', 'Ethereum', '0xa', 'coins_list', 'alice')
+    ref = catalog.latest('coingecko', 'Ethereum', '0xb', 'coins_list', 'bob')
+    assert body['ref_id'] is None and body['bytes'] > 0
+    assert ref['ref_id'] == body['id'] and ref['bytes'] == 0 and ref['local_path'] == body['local_path']
+    stored = [name for _, _, files in os.walk(tmp_path / 'data') for name in files if name.endswith('.gz')]
+    assert len(stored) == 1
+    assert storage.load_latest_json('coingecko', 'Ethereum', '0xb', 'coins_list', 'bob') == coins_list()
+
+
+def test_reference_to_another_tokens_body_is_the_latest_snapshot(catalog):
+    storage.save_json({'v': 1}, 'coingecko', 'Ethereum', '0xa', 'coins_list', timestamp='20261016_100000', shared=True)
+    storage.save_json({'v': 2}, 'coingecko', 'Ethereum', '0xb', 'coins_list', timestamp='20261016_110000', shared=True)
+    results = storage.save_json({'v': 2}, 'coingecko', 'Ethereum', '0xa', 'coins_list',
+                                timestamp='20261016_120000', shared=True)
+    assert 'unchanged' in results
+    assert storage.load_latest_json('coingecko', 'Ethereum', '0xa', 'coins_list') == {'v': 2}
+
+
+def test_shared_reference_still_writes_this_users_bigquery_row(catalog, monkeypatch):
+    monkeypatch.setattr(storage, 'STORAGE_MODE', 'all')
+    monkeypatch.setattr(storage, '_gcs_uploader', None)
+    monkeypatch.setattr(storage, '_save_gcs', lambda data, source, chain, address, endpoint, timestamp, user_id,
+                        body: f'gs://b/{address}/{user_id}/{endpoint}_{timestamp}.json.gz')
+    rows = []
+
+    def save_bigquery(data, source, chain, address, endpoint, timestamp, user_id, snapshot_id, batch):
+        rows.append((address, user_id, snapshot_id))
+        return f'p.token_tracker_{user_id}.{endpoint}'
+
+    monkeypatch.setattr(storage, '_save_bigquery', save_bigquery)
+    storage.save_json({'v': 1}, 'coingecko', 'Ethereum', '0xa', 'coins_list', 'alice',
+                      timestamp='20261016_100000', shared=True)
+    body = catalog.latest('coingecko', 'Ethereum', '0xa', 'coins_list', 'alice')
+    catalog.set_location('bq_table', 'p.token_tracker_alice.coins_list', [body['id']])
+
+    results = storage.save_json({'v': 1}, 'coingecko', 'Ethereum', '0xb', 'coins_list', 'bob',
+                                timestamp='20261016_110000', shared=True)
+    ref = catalog.latest('coingecko', 'Ethereum', '0xb', 'coins_list', 'bob')
+    assert results['unchanged'] == body['id'] and results['bigquery'] == 'p.token_tracker_bob.coins_list'
+    assert ref['ref_id'] == body['id'] and ref['bq_table'] is None
+    assert rows == [('0xa', 'alice', body['id']), ('0xb', 'bob', ref['id'])]
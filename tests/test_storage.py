@@ -0,0 +1,69 @@
+"""save_json: content hashing, unchanged references, catalog sizes and latest pointers."""
+import json
+import os
+
+import pytest
+
+from data_handlers import storage
+from data_handlers.raw_payload import RawPayload
+
+TOKEN = ('defillama', 'eth', '0xa')
+
+
+def test_content_hash_ignores_key_order_and_payload_type():
+    raw = RawPayload(b'{"b": [1, 2], "a": {"y": 1, "x": "z"}}')
+    assert storage._content_hash(raw) == storage._content_hash({'a': {'x': 'z', 'y': 1}, 'b': [1, 2]})
+    assert storage._content_hash(raw) != storage._content_hash({'a': {'x': 'z', 'y': 2}, 'b': [1, 2]})
+    assert storage._content_hash(RawPayload(b'not json')) == storage._content_hash(RawPayload(b'not json'))
+
+
+def test_same_content_as_raw_payload_is_saved_as_a_reference(catalog):
+    first = storage.save_json({'b': 1, 'a': 2}, *TOKEN, 'tvl', timestamp='20261016_100000')
+    second = storage.save_json(RawPayload(b'{"a":2,"b":1}'), *TOKEN, 'tvl', timestamp='20261016_110000')
+    body, ref = catalog.snapshots(*TOKEN, 'tvl')
+    assert second['unchanged'] == body['id'] and second['local'] == first['local']
+    assert (ref['ref_id'], ref['bytes'], ref['content_hash']) == (body['id'], 0, body['content_hash'])
+    assert storage.load_latest_json(*TOKEN, 'tvl') == {'b': 1, 'a': 2}
+
+
+def test_same_raw_bytes_are_matched_without_hashing_canonical_json(catalog, monkeypatch):
+    hashed = []
+    content_hash = storage._content_hash
+    monkeypatch.setattr(storage, '_content_hash', lambda data: hashed.append(data) or content_hash(data))
+    storage.save_json(RawPayload(b'{"a":2,"b":1}'), *TOKEN, 'tvl', timestamp='20261016_100000')
+    assert len(hashed) == 1
+    second = storage.save_json(RawPayload(b'{"a":2,"b":1}'), *TOKEN, 'tvl', timestamp='20261016_110000')
+    assert len(hashed) == 1
+    body, ref = catalog.snapshots(*TOKEN, 'tvl')
+    assert second['unchanged'] == body['id']
+    assert (ref['raw_hash'], ref['content_hash']) == (body['raw_hash'], body['content_hash'])
+
+    # Different bytes, same JSON: the canonical hash still matches
+    third = storage.save_json(RawPayload(b'{"b": 1, "a": 2}'), *TOKEN, 'tvl', timestamp='20261016_120000')
+    assert len(hashed) == 2 and third['unchanged'] == body['id']
+
+
+@pytest.mark.parametrize('codec', ['none', 'gzip'])
+def test_catalog_size_is_the_stored_size(catalog, monkeypatch, codec):
+    monkeypatch.setattr(storage, 'STORAGE_COMPRESSION', codec)
+    data = {'prices': [[i, i * 1.5] for i in range(50)]}
+    path = storage.save_json(data, *TOKEN, 'price_chart', timestamp='20261016_100000')['local']
+    row = catalog.latest(*TOKEN, 'price_chart')
+    assert row['bytes'] == os.path.getsize(path)
+    if codec == 'none':
+        with open(path) as f:
+            assert json.load(f) == data
+
+
+def test_latest_pointer_never_moves_back_to_an_older_snapshot(catalog):
+    newer = storage.save_json({'v': 2}, *TOKEN, 'tvl', timestamp='20261016_110000')['local']
+    # A writer that took longer finishes the older snapshot last
+    storage.save_json({'v': 1}, *TOKEN, 'tvl', timestamp='20261016_100000')
+    directory = storage._local_directory(*TOKEN)
+    assert storage._latest_local_file(directory, 'tvl') == directory / os.path.basename(newer)
+    assert storage._load_local(*TOKEN, 'tvl') == {'v': 2}
+
+    # A pointer whose newer target is gone is replaced
+    os.remove(newer)
+    storage.save_json({'v': 3}, *TOKEN, 'tvl', timestamp='20261016_090000')
+    assert (directory / storage.LATEST_DIR / 'tvl').read_text().endswith('20261016_090000.json.gz')
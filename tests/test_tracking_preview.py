@@ -0,0 +1,40 @@
+"""The endpoint preview shows only the current user's fetched window of a shared series."""
+import pandas as pd
+
+from components import tracking_log
+from data_handlers.timeseries import TimeSeriesStore
+
+
+def _setup(monkeypatch, tmp_path, snapshots):
+    store = TimeSeriesStore(tmp_path)
+    now = pd.Timestamp.now(tz='UTC').floor('D')
+    days = [now - pd.Timedelta(days=d) for d in (200, 60, 10, 0)]
+    store.append('chain_tvl', 'defillama', 'Ethereum', '0xabc',
+                 [{'date': int(t.timestamp()), 'tvl': float(i)} for i, t in enumerate(days)])
+    monkeypatch.setattr(tracking_log, 'get_timeseries_store', lambda: store)
+    monkeypatch.setattr(tracking_log, 'get_latest_snapshot',
+                        lambda source, chain, address, key, user_id: snapshots.get(user_id))
+    return days
+
+
+def _catalog_time(ts):
+    """Catalog timestamps are naive local time"""
+    return ts.to_pydatetime().astimezone().replace(tzinfo=None).strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def test_preview_is_scoped_to_user_snapshot_and_period(monkeypatch, tmp_path):
+    now = pd.Timestamp.now(tz='UTC').floor('D')
+    # alice fetched 5 days ago; a later fetch by someone else added today's point
+    snapshots = {'alice': {'timestamp': _catalog_time(now - pd.Timedelta(days=5))}}
+    days = _setup(monkeypatch, tmp_path, snapshots)
+
+    df = tracking_log.load_preview_series('defillama', 'chain_tvl', 'Ethereum', '0xabc', 'alice', '3 months')
+    assert df['timestamp'].tolist() == [days[1], days[2]]
+
+    df = tracking_log.load_preview_series('defillama', 'chain_tvl', 'Ethereum', '0xabc', 'alice', 'All')
+    assert df['timestamp'].tolist() == days[:3]
+
+
+def test_preview_without_user_snapshot_falls_back(monkeypatch, tmp_path):
+    _setup(monkeypatch, tmp_path, {})
+    assert tracking_log.load_preview_series('defillama', 'chain_tvl', 'Ethereum', '0xabc', 'bob', 'All') is None
@@ -0,0 +1,109 @@
+"""Conditional GETs: validators sent back, 304 served from disk as a 200, counters, atomic entries."""
+import os
+import threading
+
+import pytest
+
+from api_clients import http_transport
+from api_clients.defillama_client import DefiLlamaClient
+from api_clients.http_transport import HttpResponse, HttpTransport
+from api_clients.validator_cache import ValidatorCache
+
+URL = 'https://api.llama.fi/protocols'
+
+
+class ConditionalServer:
+    """Answers 304 when the request's If-None-Match matches the current ETag"""
+
+    def __init__(self, body, etag='"v1"'):
+        self.body, self.etag = body, etag
+        self.requests = []
+
+    def request(self, method, url, headers=None, **kwargs):
+        headers = headers or {}
+        self.requests.append(headers)
+        if self.etag and headers.get('If-None-Match') == self.etag:
+            return HttpResponse(304, {'ETag': self.etag}, b'', url, 'Not Modified')
+        validators = {'ETag': self.etag} if self.etag else {}
+        return HttpResponse(200, {'content-type': 'application/json', **validators}, self.body, url, 'OK')
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    cache = ValidatorCache(str(tmp_path))
+    monkeypatch.setattr(http_transport, 'get_validator_cache', lambda: cache)
+    return cache
+
+
+def _transport(server):
+    transport = HttpTransport()
+    transport.get_session = lambda url, provider='DEFAULT': server
+    return transport
+
+
+def test_304_is_served_from_disk_as_200(cache):
+    server = ConditionalServer(b'[{"name": "aave"}]')
+    client = DefiLlamaClient(transport=_transport(server), raw=True)
+
+    first = client.get_all_protocols()
+    second = client.get_all_protocols()
+    assert 'If-None-Match' not in server.requests[0]
+    assert server.requests[1]['If-None-Match'] == '"v1"'
+    assert second.content == first.content and second[0] == {'name': 'aave'}
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'bytes_saved': len(first.content),
+                             'bytes_downloaded': len(first.content)}
+
+    response = _transport(server).request('GET', URL, conditional=True)
+    assert (response.status_code, response.headers['X-Validator-Cache']) == (200, 'hit')
+
+
+def test_changed_resource_replaces_the_stored_body(cache):
+    server = ConditionalServer(b'[1]')
+    transport = _transport(server)
+    transport.request('GET', URL, conditional=True)
+    server.body, server.etag = b'[1, 2]', '"v2"'
+
+    assert transport.request('GET', URL, conditional=True).content == b'[1, 2]'
+    assert transport.request('GET', URL, conditional=True).content == b'[1, 2]'
+    assert server.requests[2]['If-None-Match'] == '"v2"'
+    assert cache.stats()['hits'] == 1
+
+
+def test_responses_without_validators_or_params_are_kept_apart(cache, tmp_path):
+    server = ConditionalServer(b'[1]', etag=None)
+    transport = _transport(server)
+    transport.request('GET', URL, conditional=True)
+    transport.request('GET', URL, conditional=True)
+    assert all('If-None-Match' not in headers for headers in server.requests)
+    assert os.listdir(tmp_path) == []
+
+    server.etag = '"v1"'
+    transport.request('GET', URL, params={'page': 1}, conditional=True)
+    # Another query string is another resource: no validators sent
+    transport.request('GET', URL, params={'page': 2}, conditional=True)
+    assert 'If-None-Match' not in server.requests[-1]
+    # Key is hashed: the URL never lands on disk in clear text
+    assert not any('llama' in name for name in os.listdir(tmp_path))
+
+
+def test_concurrent_stores_never_pair_an_etag_with_another_body(cache, tmp_path):
+    key = cache._key('GET', URL, None)
+    torn = []
+
+    def write(version):
+        for _ in range(200):
+            cache._store(key, f'body {version}'.encode() * 1000, {'etag': f'"v{version}"'})
+
+    def read():
+        for _ in range(500):
+            entry = cache._read(key)
+            if entry and entry[1] != f'body {entry[0]["etag"][2:-1]}'.encode() * 1000:
+                torn.append(entry[0])
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(4)] + [threading.Thread(target=read)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert torn == []
+    assert os.listdir(tmp_path) == [key + '.entry']
@@ -0,0 +1,184 @@
+"""Write queue spilling, per-fetch (WriteBatch) flushes and GCS latest pointers."""
+import threading
+from concurrent.futures import Future
+
+from google.api_core.exceptions import PreconditionFailed
+
+from data_handlers.bq_writer import BigQueryBatchWriter
+from data_handlers.gcs_uploader import GcsUploader
+from data_handlers.storage import _to_bytes
+from data_handlers.write_batch import WriteBatch
+from data_handlers.write_queue import SPILL_SUFFIX, WriteQueue
+
+
+class GatedWriter:
+    """Records written snapshots; blocks until released"""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.written = []
+
+    def __call__(self, data, source, chain, address, endpoint_name, user_id=None, timestamp=None, batch=None,
+                 coverage=None, shared=False):
+        self.started.set()
+        self.release.wait(5)
+        if endpoint_name == 'broken':
+            raise RuntimeError('boom')
+        self.written.append((endpoint_name, _to_bytes(data)))
+
+
+def test_put_spills_only_when_full(tmp_path):
+    writer = GatedWriter()
+    wq = WriteQueue(writer=writer, workers=1, max_pending=2, spill_dir=tmp_path)
+    batch = WriteBatch()
+    wq.put({'i': 0}, 'src', 'eth', '0xa', 'ep0', batch=batch)
+    assert writer.started.wait(5)
+    for i in range(1, 5):
+        wq.put({'i': i}, 'src', 'eth', '0xa', f"ep{i}", batch=batch)
+    # One being written, two held in memory, the rest journaled
+    assert len(list(tmp_path.glob(f"*{SPILL_SUFFIX}"))) == 2
+
+    writer.release.set()
+    assert wq.flush(timeout=5, batch=batch) == {'written': 5, 'failed': 0, 'pending': 0}
+    assert sorted(name for name, _ in writer.written) == [f"ep{i}" for i in range(5)]
+    assert list(tmp_path.glob(f"*{SPILL_SUFFIX}")) == []
+
+
+def test_failed_write_is_journaled(tmp_path):
+    writer = GatedWriter()
+    writer.release.set()
+    wq = WriteQueue(writer=writer, workers=1, max_pending=4, spill_dir=tmp_path)
+    batch = WriteBatch()
+    wq.put({'a': 1}, 'src', 'eth', '0xa', 'broken', batch=batch)
+    assert wq.flush(timeout=5, batch=batch) == {'written': 0, 'failed': 1, 'pending': 0}
+    assert len(list(tmp_path.glob(f"*{SPILL_SUFFIX}"))) == 1
+
+
+def test_close_journals_unwritten_and_replay_writes_them(tmp_path):
+    writer = GatedWriter()
+    wq = WriteQueue(writer=writer, workers=1, max_pending=8, spill_dir=tmp_path)
+    for i in range(3):
+        wq.put({'i': i}, 'src', 'eth', '0xa', f"ep{i}")
+    assert wq.close(timeout=0.1) == 3
+    assert len(list(tmp_path.glob(f"*{SPILL_SUFFIX}"))) == 3
+
+    replayed = GatedWriter()
+    replayed.release.set()
+    wq2 = WriteQueue(writer=replayed, workers=2, spill_dir=tmp_path)
+    assert wq2.replay() == 3
+    assert wq2.flush(timeout=5)['written'] == 3
+    assert sorted(body for _, body in replayed.written) == [b'{"i": 0}', b'{"i": 1}', b'{"i": 2}']
+
+
+def test_batches_only_wait_for_their_own_snapshots(tmp_path):
+    writer = GatedWriter()
+    wq = WriteQueue(writer=writer, workers=2, max_pending=8, spill_dir=tmp_path)
+    mine, other = WriteBatch(), WriteBatch()
+    wq.put({'a': 1}, 'src', 'eth', '0xa', 'other', batch=other)
+    writer.release.set()
+    wq.put({'b': 2}, 'src', 'eth', '0xb', 'mine', batch=mine)
+    assert wq.flush(timeout=5, batch=mine) == {'written': 1, 'failed': 0, 'pending': 0}
+    assert wq.flush(timeout=5, batch=other) == {'written': 1, 'failed': 0, 'pending': 0}
+
+
+def test_gcs_flush_reports_only_the_batch_uploads():
+    uploader = GcsUploader(get_bucket=None)
+    mine, other = Future(), Future()
+    mine.set_result('gs://b/mine')
+    other.set_result('gs://b/other')
+    with uploader._lock:
+        uploader._pending = {'gs://b/mine': mine, 'gs://b/other': other}
+    assert uploader.flush(uploads={'gs://b/mine': mine}) == {'gs://b/mine': 'gs://b/mine'}
+    assert uploader.future('gs://b/other') is other
+
+
+class FakeBlob:
+    def __init__(self, bucket, name):
+        self.bucket, self.name = bucket, name
+        self.generation = bucket.objects.get(name, (None, 0))[1]
+
+    def download_as_text(self):
+        return self.bucket.objects[self.name][0]
+
+    def upload_from_string(self, content, content_type=None, if_generation_match=None):
+        if self.bucket.race and self.bucket.race[0] == self.name:
+            # Another upload moves the pointer between our read and write
+            (_, content_first), self.bucket.race = self.bucket.race, None
+            FakeBlob(self.bucket, self.name).upload_from_string(content_first)
+        current = self.bucket.objects.get(self.name, (None, 0))[1]
+        if if_generation_match is not None and if_generation_match != current:
+            raise PreconditionFailed('generation mismatch')
+        self.bucket.objects[self.name] = (content, current + 1)
+
+
+class FakeBucket:
+    name = 'b'
+
+    def __init__(self):
+        self.objects = {}  # name -> (content, generation)
+        self.race = None  # (name, content) another writer stores right before our next write of name
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+    def get_blob(self, name):
+        return FakeBlob(self, name) if name in self.objects else None
+
+
+def test_gcs_latest_pointer_only_moves_forward():
+    bucket = FakeBucket()
+    uploader = GcsUploader(get_bucket=lambda: bucket)
+    for name in ('t/tvl_20261016_110000.json.gz', 't/tvl_20261016_100000.json.gz'):
+        uploader.submit(f'gs://b/{name}', name, b'{}', pointer_path='t/_latest/tvl').result(5)
+    assert bucket.objects['t/_latest/tvl'][0] == 't/tvl_20261016_110000.json.gz'
+
+    # A concurrent move to a newer snapshot wins over ours (retried, then left alone)
+    bucket.race = ('t/_latest/tvl', 't/tvl_20261016_130000.json.gz')
+    uploader.submit('gs://b/t/tvl_20261016_120000.json.gz', 't/tvl_20261016_120000.json.gz', b'{}',
+                    pointer_path='t/_latest/tvl').result(5)
+    assert bucket.objects['t/_latest/tvl'][0] == 't/tvl_20261016_130000.json.gz'
+
+
+class FakeBigQueryWriter(BigQueryBatchWriter):
+    def __init__(self, fail=False, flush_interval=None):
+        super().__init__(get_client=None, flush_interval=flush_interval)
+        self.fail = fail
+        self.loads = []
+
+    def _load(self, table_ref, rows):
+        if self.fail:
+            raise RuntimeError('quota exceeded')
+        self.loads.append((table_ref, rows))
+
+
+def test_bigquery_flush_rows_reports_only_the_batch_rows():
+    writer = FakeBigQueryWriter()
+    batch = WriteBatch()
+    writer.add('p.d.t', {'id': 'other'})
+    batch.add_row('p.d.t', writer.add('p.d.t', {'id': 'mine'}))
+    # Another fetch's flush loads the table first
+    writer.flush()
+    batch.add_row('p.d.u', writer.add('p.d.u', {'id': 'mine2'}))
+    writer.add('p.d.v', {'id': 'other2'})
+    assert writer.flush_rows(batch.rows) == {'p.d.t': 1, 'p.d.u': 1}
+    assert writer.pending() == 1
+
+
+def test_bigquery_flush_rows_reports_failed_loads():
+    writer = FakeBigQueryWriter(fail=True)
+    batch = WriteBatch()
+    batch.add_row('p.d.t', writer.add('p.d.t', {'id': 'mine'}))
+    assert writer.flush_rows(batch.rows) == {'p.d.t': {'error': 'quota exceeded'}}
+
+
+def test_bigquery_rows_nobody_flushes_load_on_timer_and_close():
+    writer = FakeBigQueryWriter(flush_interval=0.05)
+    row = writer.add('p.d.t', {'id': 'profiler'})
+    assert row.result(5) == 'p.d.t'
+    assert writer.loads == [('p.d.t', [{'id': 'profiler'}])]
+
+    writer = FakeBigQueryWriter(flush_interval=3600)
+    writer.add('p.d.t', {'id': 'at-exit'})
+    assert writer.close() == {'p.d.t': 1}
+    assert writer.pending() == 0